@@ -0,0 +1,49 @@
+"""Benchmarks of tool execution through StripeAPI."""
+
+import pytest
+import stripe
+
+from stripe_agent_toolkit.configuration import is_tool_allowed
+from stripe_agent_toolkit.serialization import serialize
+from stripe_agent_toolkit.tools import tools
+
+from .data import PRODUCTS
+
+pytestmark = pytest.mark.benchmark(group="api")
+
+
+def bench_run_write(benchmark, stripe_api):
+    benchmark(stripe_api.run, "create_customer", name="Test User")
+
+
+def bench_run_list(benchmark, stripe_api):
+    benchmark(stripe_api.run, "list_products", limit=100)
+
+
+def bench_run_list_unprojected(benchmark, stripe_api):
+    stripe_api._projections = {}
+    benchmark(stripe_api.run, "list_products", limit=100)
+
+
+def bench_serialize_json(benchmark):
+    benchmark(serialize, PRODUCTS)
+
+
+def bench_serialize_table(benchmark):
+    benchmark(serialize, PRODUCTS, "table")
+
+
+def bench_serialize_stripe_objects(benchmark):
+    products = [
+        stripe.Product.construct_from(product, "sk_test")
+        for product in PRODUCTS
+    ]
+    benchmark(serialize, products)
+
+
+def bench_is_tool_allowed(benchmark, configuration):
+    benchmark(
+        lambda: [
+            tool for tool in tools if is_tool_allowed(tool, configuration)
+        ]
+    )
@@ -0,0 +1,28 @@
+"""Benchmarks of the CrewAI adapter."""
+
+import pytest
+
+pytest.importorskip("crewai_tools")
+
+pytestmark = pytest.mark.benchmark(group="crewai")
+
+from stripe_agent_toolkit.crewai.toolkit import StripeAgentToolkit  # noqa: E402
+
+
+def bench_toolkit_construction(benchmark, configuration):
+    benchmark(StripeAgentToolkit, "sk_test_123", configuration)
+
+
+def bench_toolkit_with_account(benchmark, configuration):
+    toolkit = StripeAgentToolkit("sk_test_123", configuration)
+    benchmark(toolkit.with_account, "acct_123")
+
+
+def bench_schema_generation(benchmark, configuration):
+    toolkit = StripeAgentToolkit("sk_test_123", configuration)
+    benchmark(
+        lambda: [
+            tool.args_schema.model_json_schema()
+            for tool in toolkit.get_tools()
+        ]
+    )
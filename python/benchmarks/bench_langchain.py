@@ -0,0 +1,24 @@
+"""Benchmarks of the LangChain adapter."""
+
+import pytest
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from stripe_agent_toolkit.langchain.toolkit import StripeAgentToolkit
+
+pytestmark = pytest.mark.benchmark(group="langchain")
+
+
+def bench_toolkit_construction(benchmark, configuration):
+    benchmark(StripeAgentToolkit, "sk_test_123", configuration)
+
+
+def bench_toolkit_with_account(benchmark, configuration):
+    toolkit = StripeAgentToolkit("sk_test_123", configuration)
+    benchmark(toolkit.with_account, "acct_123")
+
+
+def bench_schema_generation(benchmark, configuration):
+    toolkit = StripeAgentToolkit("sk_test_123", configuration)
+    benchmark(
+        lambda: [convert_to_openai_tool(tool) for tool in toolkit.get_tools()]
+    )
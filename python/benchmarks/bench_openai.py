@@ -0,0 +1,24 @@
+"""Benchmarks of the OpenAI Agent SDK adapter."""
+
+import pytest
+
+from stripe_agent_toolkit.openai.tool import params_json_schema
+from stripe_agent_toolkit.openai.toolkit import StripeAgentToolkit
+from stripe_agent_toolkit.tools import tools
+
+pytestmark = pytest.mark.benchmark(group="openai")
+
+
+def bench_toolkit_construction(benchmark, configuration):
+    benchmark(StripeAgentToolkit, "sk_test_123", configuration)
+
+
+def bench_toolkit_with_account(benchmark, configuration):
+    toolkit = StripeAgentToolkit("sk_test_123", configuration)
+    benchmark(toolkit.with_account, "acct_123")
+
+
+def bench_schema_generation(benchmark):
+    # Bypass the per-process cache to measure the generation itself.
+    generate = params_json_schema.__wrapped__
+    benchmark(lambda: [generate(tool["args_schema"]) for tool in tools])
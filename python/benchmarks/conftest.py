@@ -0,0 +1,70 @@
+"""Fixtures shared by the pytest-benchmark suite.
+
+Run the suite with ``make benchmark`` to save a new baseline under
+``benchmarks/baselines``, or ``make benchmark-compare`` to compare against
+the latest saved one. Nothing here talks to Stripe.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+import stripe
+
+from stripe_agent_toolkit.api import StripeAPI
+from stripe_agent_toolkit.tools import tools
+
+from .data import PRODUCTS
+
+
+def _all_actions() -> dict:
+    actions: dict = {}
+    for tool in tools:
+        for resource, permissions in tool["actions"].items():
+            actions.setdefault(resource, {}).update(
+                dict.fromkeys(permissions, True)
+            )
+    return actions
+
+
+@pytest.fixture(scope="session")
+def configuration():
+    """A configuration that enables every tool."""
+    return {"actions": _all_actions()}
+
+
+class _FakeService:
+    def __init__(self, result):
+        self._result = result
+
+    def create(self, params, options):
+        return self._result
+
+    def list(self, params, options):
+        return self._result
+
+
+@pytest.fixture(scope="session")
+def fake_client():
+    """A stand-in for ``StripeClient`` answering with canned objects."""
+    customer = stripe.Customer.construct_from({"id": "cus_123"}, "sk_test")
+    products = stripe.ListObject.construct_from(
+        {
+            "object": "list",
+            "data": PRODUCTS,
+            "has_more": False,
+            "url": "/v1/products",
+        },
+        "sk_test",
+    )
+    return SimpleNamespace(
+        customers=_FakeService(customer),
+        products=_FakeService(products),
+    )
+
+
+@pytest.fixture
+def stripe_api(fake_client):
+    """A StripeAPI whose calls are answered by ``fake_client``."""
+    api = StripeAPI(secret_key="sk_test_123", context=None)
+    api._stripe_client = fake_client
+    return api
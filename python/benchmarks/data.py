@@ -0,0 +1,15 @@
+"""Canned Stripe data used by the benchmarks."""
+
+PRODUCTS = [
+    {
+        "id": "prod_%014d" % i,
+        "object": "product",
+        "name": "Product %d" % i,
+        "description": "A product for benchmarking",
+        "active": True,
+        "default_price": "price_%014d" % i,
+        "images": [],
+        "metadata": {"sku": str(i)},
+    }
+    for i in range(100)
+]
@@ -0,0 +1,74 @@
+"""Compare the token counts of the list formats for the same results.
+
+Run with ``python -m benchmarks.list_formats``. Tokens are counted with
+tiktoken's ``o200k_base`` encoding when it can be loaded, and estimated
+from words and punctuation otherwise.
+"""
+
+import re
+
+from stripe_agent_toolkit.projection import DEFAULT_PROJECTIONS, project
+from stripe_agent_toolkit.serialization import serialize
+
+
+def _count_tokens():
+    try:
+        import tiktoken
+
+        encoding = tiktoken.get_encoding("o200k_base")
+    except Exception:
+        pattern = re.compile(r"\w+|[^\w\s]")
+        return "estimated", lambda text: len(pattern.findall(text))
+    return "o200k_base", lambda text: len(encoding.encode(text))
+
+
+def _products(n: int) -> list:
+    return [
+        {
+            "id": "prod_%014d" % i,
+            "name": "Product %d" % i,
+            "description": "A product for benchmarking",
+            "active": True,
+            "default_price": "price_%014d" % i,
+        }
+        for i in range(n)
+    ]
+
+
+def _invoices(n: int) -> list:
+    return [
+        {
+            "id": "in_%014d" % i,
+            "customer": "cus_%014d" % i,
+            "status": "open",
+            "currency": "usd",
+            "total": 1000 + i,
+            "amount_due": 1000 + i,
+            "due_date": 1700000000,
+            "hosted_invoice_url": "https://invoice.stripe.com/i/%d" % i,
+        }
+        for i in range(n)
+    ]
+
+
+def main():
+    encoding, count = _count_tokens()
+    print("tokens (%s)" % encoding)
+    print("%-26s %8s %8s %8s" % ("", "json", "columns", "table"))
+    for method, rows in (
+        ("list_products", _products(100)),
+        ("list_invoices", _invoices(100)),
+    ):
+        data = project(rows, DEFAULT_PROJECTIONS[method])
+        counts = [
+            count(serialize(data, list_format))
+            for list_format in ("json", "columns", "table")
+        ]
+        print(
+            "%-26s %8d %8d %8d"
+            % ("%s, %d rows" % (method, len(rows)), *counts)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,422 @@
+"""Simulate many concurrent agents calling one StripeAPI instance.
+
+Run with ``python -m benchmarks.load``. Each agent picks tools from a
+weighted mix and calls ``StripeAPI.arun`` (or ``StripeAPI.run`` on a thread
+pool with ``--threads``) in a loop, optionally paced to a target request
+rate across all agents. By default the calls go to a
+:class:`~stripe_agent_toolkit.testing.FakeStripeServer` running in a child
+process, so that serving requests does not compete with the agents for the
+GIL; pass ``--api-base`` to use another stand-in endpoint instead.
+
+The report covers throughput, p50/p95/p99 latency and errors per tool,
+event loop lag and peak memory::
+
+    python -m benchmarks.load --agents 500 --rate 1000 --duration 30 \\
+        --mix list_products=50,list_invoices=20,create_customer=30
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from stripe_agent_toolkit.api import StripeAPI
+from stripe_agent_toolkit.clients import StripeClientRegistry
+
+# Roughly 70% list calls and 30% creates.
+DEFAULT_MIX = {
+    "list_products": 25,
+    "list_prices": 15,
+    "list_invoices": 15,
+    "list_payment_intents": 10,
+    "list_customers": 5,
+    "create_customer": 10,
+    "create_product": 5,
+    "create_price": 5,
+    "create_invoice_item": 5,
+    "create_payment_link": 5,
+}
+
+
+def _arguments(seed: Dict[str, str]) -> Dict[str, Callable[[int], dict]]:
+    """Argument factories per tool, given the IDs of seeded objects."""
+    return {
+        "list_products": lambda i: {"limit": 10},
+        "list_prices": lambda i: {"product": seed["product"], "limit": 10},
+        "list_invoices": lambda i: {"customer": seed["customer"]},
+        "list_payment_intents": lambda i: {"limit": 10},
+        "list_customers": lambda i: {"limit": 10},
+        "retrieve_balance": lambda i: {},
+        "create_customer": lambda i: {
+            "name": "Agent customer %d" % i,
+            "email": "customer%d@example.com" % i,
+        },
+        "create_product": lambda i: {"name": "Agent product %d" % i},
+        "create_price": lambda i: {
+            "product": seed["product"],
+            "unit_amount": 100 + i % 900,
+            "currency": "usd",
+        },
+        "create_invoice_item": lambda i: {
+            "customer": seed["customer"],
+            "price": seed["price"],
+            "invoice": seed["invoice"],
+        },
+        "create_payment_link": lambda i: {
+            "price": seed["price"],
+            "quantity": 1 + i % 3,
+        },
+        "create_billing_portal_session": lambda i: {
+            "customer": seed["customer"],
+        },
+    }
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """Parse ``tool=weight,...`` into a mix."""
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def _parse_latency(value: str):
+    low, _, high = value.partition(",")
+    return (float(low), float(high)) if high else float(low)
+
+
+def percentile(values: List[float], q: float) -> float:
+    """The nearest-rank ``q`` percentile of sorted ``values``."""
+    if not values:
+        return float("nan")
+    index = max(0, min(len(values) - 1, round(q / 100 * len(values)) - 1))
+    return values[index]
+
+
+def _peak_rss_mib() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in kilobytes on Linux and in bytes on macOS.
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _serve(queue, latency, error_rate, rate_limit_rate) -> None:
+    from stripe_agent_toolkit.testing import FakeStripe, FakeStripeServer
+
+    fake = FakeStripe(
+        latency=latency,
+        error_rate=error_rate,
+        rate_limit_rate=rate_limit_rate,
+    )
+    server = FakeStripeServer(fake).start()
+    queue.put(server.url)
+    while True:
+        time.sleep(3600)
+
+
+def start_fake(
+    latency=0.0, error_rate: float = 0.0, rate_limit_rate: float = 0.0
+) -> Tuple[multiprocessing.Process, str]:
+    """Start a fake Stripe server in a child process and return its URL."""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(
+        target=_serve,
+        args=(queue, latency, error_rate, rate_limit_rate),
+        daemon=True,
+    )
+    process.start()
+    return process, queue.get(timeout=30)
+
+
+class _Pacer:
+    """Spaces calls from every agent to a target rate per second."""
+
+    def __init__(self, rate: Optional[float]):
+        self._interval = 1 / rate if rate else 0.0
+        self._next = 0.0
+
+    async def wait(self) -> None:
+        if not self._interval:
+            return
+        now = time.perf_counter()
+        slot = max(now, self._next)
+        self._next = slot + self._interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class LoadGenerator:
+    """Drives ``agents`` concurrent loops of tool calls against ``api``."""
+
+    def __init__(
+        self,
+        api: StripeAPI,
+        mix: Dict[str, float],
+        agents: int,
+        duration: float,
+        warmup: float = 0.0,
+        rate: Optional[float] = None,
+        threads: bool = False,
+        lag_interval: float = 0.05,
+        seed: Optional[int] = None,
+    ):
+        self.api = api
+        self.mix = mix
+        self.agents = agents
+        self.duration = duration
+        self.warmup = warmup
+        self.threads = threads
+        self.lag_interval = lag_interval
+        self._pacer = _Pacer(rate)
+        self._random = random.Random(seed)
+        self._latencies: Dict[str, List[float]] = defaultdict(list)
+        self._errors: Dict[str, int] = defaultdict(int)
+        self._lags: List[float] = []
+        self._calls = 0
+
+    async def _seed(self) -> Dict[str, str]:
+        customer = json.loads(
+            await self.api.arun("create_customer", name="Load test")
+        )
+        product = json.loads(
+            await self.api.arun("create_product", name="Load test")
+        )
+        price = json.loads(
+            await self.api.arun(
+                "create_price",
+                product=product["id"],
+                unit_amount=1000,
+                currency="usd",
+            )
+        )
+        invoice = json.loads(
+            await self.api.arun("create_invoice", customer=customer["id"])
+        )
+        return {
+            "customer": customer["id"],
+            "product": product["id"],
+            "price": price["id"],
+            "invoice": invoice["id"],
+        }
+
+    async def _agent(
+        self,
+        arguments: Dict[str, Callable[[int], dict]],
+        start: float,
+        executor: Optional[ThreadPoolExecutor],
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        tools, weights = zip(*self.mix.items())
+        end = start + self.warmup + self.duration
+        while True:
+            await self._pacer.wait()
+            began = time.perf_counter()
+            if began >= end:
+                return
+            method = self._random.choices(tools, weights)[0]
+            kwargs = arguments[method](self._calls)
+            self._calls += 1
+            failed = False
+            try:
+                if executor is not None:
+                    await loop.run_in_executor(
+                        executor, lambda: self.api.run(method, **kwargs)
+                    )
+                else:
+                    await self.api.arun(method, **kwargs)
+            except Exception:
+                failed = True
+            finished = time.perf_counter()
+            if began >= start + self.warmup:
+                self._latencies[method].append(finished - began)
+                self._errors[method] += failed
+
+    async def _monitor_lag(self, stop: asyncio.Event) -> None:
+        # The overshoot of a short sleep is how long the loop was blocked.
+        while not stop.is_set():
+            began = time.perf_counter()
+            await asyncio.sleep(self.lag_interval)
+            self._lags.append(time.perf_counter() - began - self.lag_interval)
+
+    async def run(self) -> dict:
+        """Run the load and return the report."""
+        unknown = set(self.mix) - set(_arguments({}))
+        if unknown:
+            raise ValueError("Unsupported tools: %s" % ", ".join(unknown))
+
+        arguments = _arguments(await self._seed())
+        executor = (
+            ThreadPoolExecutor(max_workers=self.agents)
+            if self.threads
+            else None
+        )
+        stop = asyncio.Event()
+        monitor = asyncio.create_task(self._monitor_lag(stop))
+        start = time.perf_counter()
+        try:
+            await asyncio.gather(
+                *(
+                    self._agent(arguments, start, executor)
+                    for _ in range(self.agents)
+                )
+            )
+        finally:
+            stop.set()
+            await monitor
+            if executor is not None:
+                executor.shutdown()
+        elapsed = time.perf_counter() - start - self.warmup
+        return self._report(max(elapsed, 1e-9))
+
+    def _report(self, elapsed: float) -> dict:
+        tools = {}
+        for method, latencies in sorted(self._latencies.items()):
+            latencies.sort()
+            tools[method] = {
+                "calls": len(latencies),
+                "errors": self._errors[method],
+                "p50_ms": percentile(latencies, 50) * 1000,
+                "p95_ms": percentile(latencies, 95) * 1000,
+                "p99_ms": percentile(latencies, 99) * 1000,
+            }
+        lags = sorted(self._lags)
+        calls = sum(tool["calls"] for tool in tools.values())
+        return {
+            "agents": self.agents,
+            "duration_s": elapsed,
+            "calls": calls,
+            "errors": sum(tool["errors"] for tool in tools.values()),
+            "throughput_per_s": calls / elapsed,
+            "tools": tools,
+            "event_loop_lag_ms": {
+                "p50": percentile(lags, 50) * 1000,
+                "p99": percentile(lags, 99) * 1000,
+                "max": (lags[-1] if lags else float("nan")) * 1000,
+            },
+            "peak_rss_mib": _peak_rss_mib(),
+        }
+
+
+def format_report(report: dict) -> str:
+    lines = [
+        "%d agents, %.1f s: %d calls, %d errors, %.1f calls/s"
+        % (
+            report["agents"],
+            report["duration_s"],
+            report["calls"],
+            report["errors"],
+            report["throughput_per_s"],
+        ),
+        "",
+        "%-30s %8s %7s %9s %9s %9s"
+        % ("tool", "calls", "errors", "p50 ms", "p95 ms", "p99 ms"),
+    ]
+    for method, tool in report["tools"].items():
+        lines.append(
+            "%-30s %8d %7d %9.2f %9.2f %9.2f"
+            % (
+                method,
+                tool["calls"],
+                tool["errors"],
+                tool["p50_ms"],
+                tool["p95_ms"],
+                tool["p99_ms"],
+            )
+        )
+    lag = report["event_loop_lag_ms"]
+    lines += [
+        "",
+        "event loop lag: p50 %.2f ms, p99 %.2f ms, max %.2f ms"
+        % (lag["p50"], lag["p99"], lag["max"]),
+    ]
+    if report["peak_rss_mib"] is not None:
+        lines.append("peak RSS: %.1f MiB" % report["peak_rss_mib"])
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.load", description=__doc__.split("\n")[0]
+    )
+    parser.add_argument("--agents", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument(
+        "--rate",
+        type=float,
+        help="target calls per second across agents (default: unpaced)",
+    )
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=DEFAULT_MIX,
+        help="weighted tools, such as list_products=70,create_customer=30",
+    )
+    parser.add_argument(
+        "--threads",
+        action="store_true",
+        help="call StripeAPI.run on a thread per agent instead of arun",
+    )
+    parser.add_argument(
+        "--api-base", help="stand-in Stripe endpoint to use instead"
+    )
+    parser.add_argument(
+        "--stripe-latency",
+        type=_parse_latency,
+        default=(0.02, 0.08),
+        help="latency of the fake server in seconds, or a min,max range",
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    process = None
+    api_base = args.api_base
+    if api_base is None:
+        process, api_base = start_fake(
+            args.stripe_latency, args.error_rate, args.rate_limit_rate
+        )
+    try:
+        api = StripeAPI(
+            secret_key="sk_test_load",
+            context=None,
+            registry=StripeClientRegistry(),
+            configuration={"api_base": api_base},
+        )
+        report = asyncio.run(
+            LoadGenerator(
+                api,
+                args.mix,
+                agents=args.agents,
+                duration=args.duration,
+                warmup=args.warmup,
+                rate=args.rate,
+                threads=args.threads,
+                seed=args.seed,
+            ).run()
+        )
+    finally:
+        if process is not None:
+            process.terminate()
+
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
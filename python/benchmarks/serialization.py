@@ -0,0 +1,86 @@
+"""Compare the decoded and raw serialization paths of a list tool.
+
+Run with ``python -m benchmarks.serialization``. Each path starts from the
+same response body Stripe would send and ends with the tool result string.
+"""
+
+import json
+import timeit
+
+from stripe import StripeClient
+from stripe._stripe_response import StripeResponse
+
+from stripe_agent_toolkit.projection import DEFAULT_PROJECTIONS, project
+from stripe_agent_toolkit.serialization import serialize_raw
+
+FIELDS = DEFAULT_PROJECTIONS["list_invoices"]
+NUMBER = 200
+
+
+def _invoice(i: int) -> dict:
+    return {
+        "id": "in_%d" % i,
+        "object": "invoice",
+        "customer": "cus_%d" % i,
+        "status": "open",
+        "currency": "usd",
+        "total": 1000 + i,
+        "amount_due": 1000 + i,
+        "due_date": 1700000000,
+        "hosted_invoice_url": "https://invoice.stripe.com/i/%d" % i,
+        "metadata": {"order": str(i)},
+        "lines": {
+            "object": "list",
+            "data": [
+                {
+                    "id": "il_%d_%d" % (i, line),
+                    "object": "line_item",
+                    "amount": 500,
+                    "description": "Line %d" % line,
+                    "period": {"start": 1700000000, "end": 1702592000},
+                }
+                for line in range(2)
+            ],
+            "has_more": False,
+            "url": "/v1/invoices/in_%d/lines" % i,
+        },
+    }
+
+
+BODY = json.dumps(
+    {
+        "object": "list",
+        "data": [_invoice(i) for i in range(100)],
+        "has_more": True,
+        "url": "/v1/invoices",
+    }
+)
+
+client = StripeClient("sk_test_123")
+
+
+def decoded(fields):
+    """The default path: decode into StripeObjects, then json.dumps."""
+    response = StripeResponse(BODY, 200, {})
+    invoices = client.deserialize(response, api_mode="V1")
+    return json.dumps(project(invoices.data, fields))
+
+
+def raw(fields):
+    """The raw path: project the parsed body and re-encode it."""
+    return serialize_raw(StripeResponse(BODY, 200, {}), fields)
+
+
+def main():
+    print("list_invoices, 100 invoices, %d bytes" % len(BODY))
+    for label, fields in (("projected", FIELDS), ("unprojected", None)):
+        for path in (decoded, raw):
+            seconds = timeit.timeit(lambda: path(fields), number=NUMBER)
+            print(
+                "%-12s %-8s %8.3f ms/call"
+                % (label, path.__name__, seconds / NUMBER * 1000)
+            )
+
+
+if __name__ == "__main__":
+    main()
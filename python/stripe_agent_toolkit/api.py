@@ -2,50 +2,196 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
-import stripe
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 from pydantic import BaseModel
 
-from .configuration import Context
-
-from .functions import (
-    create_customer,
-    list_customers,
-    create_product,
-    list_products,
-    create_price,
-    list_prices,
-    create_payment_link,
-    list_invoices,
-    create_invoice,
-    create_invoice_item,
-    finalize_invoice,
-    retrieve_balance,
-    create_refund,
-    list_payment_intents,
-    create_billing_portal_session,
+from .cache import CacheKey, ToolCache, is_negative_result
+from .cassette import Cassette
+from .clients import StripeClientRegistry, default_registry, key_id
+from .configuration import Configuration, Context, Pagination
+from .dispatch import ToolHandler, get_handler
+from .metering import MeterEvent, MeterEventStream, is_duplicate
+from .pagination import projected
+from .projection import DEFAULT_PROJECTIONS, project
+from .ratelimit import RateLimiter
+from .retries import (
+    RetryPolicy,
+    idempotency_key,
+    is_retryable,
+    new_idempotency_key,
 )
+from .routing import current_route
+from .serialization import serialize, serialize_raw
+from .singleflight import SingleFlight, default_single_flight
+
+if TYPE_CHECKING:
+    from stripe import StripeClient
+
+_BUDGET_ARGUMENTS = ("max_items", "max_bytes")
+
+_PAGINATION_ARGUMENTS = ("page_token",) + _BUDGET_ARGUMENTS
+
+
+def _without_pagination(arguments: dict) -> dict:
+    return {
+        name: value
+        for name, value in arguments.items()
+        if name not in _PAGINATION_ARGUMENTS
+    }
+
+
+def _check_concurrency(max_concurrency: int) -> None:
+    # A zero limit would hang arun_many and fail run_many obscurely.
+    if max_concurrency < 1:
+        raise ValueError(
+            "Invalid max_concurrency %r: must be at least 1" % max_concurrency
+        )
+
+
+def _meter_event_chunks(events: List[MeterEvent]):
+    size = MeterEventStream.max_events
+    for i in range(0, len(events), size):
+        yield events[i : i + size]
+
+
+def _replay_params(params: dict) -> dict:
+    # The identifier and timestamp are stamped anew on every run, so a
+    # recording could never replay if they were part of the cassette key.
+    return {
+        name: value
+        for name, value in params.items()
+        if name not in ("identifier", "timestamp")
+    }
+
+
+def _fail_rest(
+    outcomes: List[Optional[Exception]],
+    events: List[MeterEvent],
+    error: Exception,
+) -> List[Optional[Exception]]:
+    return outcomes + [error] * (len(events) - len(outcomes))
 
 
 class StripeAPI(BaseModel):
     """ "Wrapper for Stripe API"""
 
     _context: Context
+    _secret_key: str
+    _stripe_client: Optional[StripeClient]
+    _registry: StripeClientRegistry
+    _pagination: Pagination
+    _cache: Optional[ToolCache]
+    _key_id: str
+    _single_flight: SingleFlight
+    _rate_limiter: Optional[RateLimiter]
+    _retry: RetryPolicy
+    _projections: Dict[str, Optional[List[str]]]
+    _serialization: str
+    _list_format: str
+    _api_base: Optional[str]
+    _cassette: Optional[Cassette]
+    _meter_event_stream: Optional[MeterEventStream]
 
-    def __init__(self, secret_key: str, context: Optional[Context]):
+    def __init__(
+        self,
+        secret_key: str,
+        context: Optional[Context],
+        registry: Optional[StripeClientRegistry] = None,
+        configuration: Optional[Configuration] = None,
+    ):
         super().__init__()
 
         self._context = context if context is not None else Context()
-
-        stripe.api_key = secret_key
-        stripe.set_app_info(
-            "stripe-agent-toolkit-python",
-            version="0.6.1",
-            url="https://github.com/stripe/agent-toolkit",
+        self._pagination = (configuration or {}).get("pagination") or {}
+        self._cache = (configuration or {}).get("cache")
+        self._key_id = key_id(secret_key)
+        # Shared by every instance so identical reads coalesce across
+        # toolkits built for the same key.
+        self._single_flight = default_single_flight
+        self._rate_limiter = (configuration or {}).get("rate_limiter")
+        retry = (configuration or {}).get("retry") or {}
+        self._retry = RetryPolicy(
+            **{k: v for k, v in retry.items() if v is not None}
+        )
+        self._projections = {
+            **DEFAULT_PROJECTIONS,
+            **((configuration or {}).get("projections") or {}),
+        }
+        self._serialization = (configuration or {}).get(
+            "serialization"
+        ) or "objects"
+        self._list_format = (configuration or {}).get("list_format") or "json"
+        self._api_base = (configuration or {}).get("api_base")
+        self._cassette = (configuration or {}).get("cassette")
+        self._meter_event_stream = (
+            MeterEventStream()
+            if (configuration or {}).get("meter_event_stream")
+            else None
         )
 
-    def create_meter_event(self, event: str, customer: str, value: Optional[str] = None) -> str:
+        self._registry = registry if registry is not None else default_registry
+        self._secret_key = secret_key
+        self._stripe_client = None
+
+    @property
+    def _client(self) -> StripeClient:
+        # Created on first use so that building a toolkit does not import
+        # the Stripe SDK.
+        if self._stripe_client is None:
+            self._stripe_client = self._registry.get(
+                self._secret_key, self._api_base
+            )
+        return self._stripe_client
+
+    def bind(self, context: Context) -> "StripeAPI":
+        """A view of this instance with ``context`` merged into its own.
+
+        The view shares the client, cache, rate limiter and the rest of the
+        configuration, so it is cheap enough to create per request.
+        """
+        api = self.model_copy()
+        api._context = Context(**{**self._context, **context})
+        return api
+
+    def _routed(self) -> "StripeAPI":
+        """This instance, or a view of it following the current route."""
+        route = current_route()
+        if route is None:
+            return self
+        api = self.bind(route.context)
+        if route.secret_key is not None:
+            api = api.with_secret_key(route.secret_key)
+        return api
+
+    def with_secret_key(self, secret_key: str) -> "StripeAPI":
+        """A view of this instance making its calls with ``secret_key``."""
+        api = self.model_copy()
+        api._secret_key = secret_key
+        api._stripe_client = None
+        api._key_id = key_id(secret_key)
+        return api
+
+    def _meter_event_params(
+        self,
+        event: str,
+        customer: str,
+        value: Optional[str] = None,
+        identifier: Optional[str] = None,
+        timestamp: Optional[int] = None,
+    ) -> dict:
         meter_event_data: dict = {
             "event_name": event,
             "payload": {
@@ -54,52 +200,538 @@ class StripeAPI(BaseModel):
         }
         if value is not None:
             meter_event_data["payload"]["value"] = value
+        if identifier is not None:
+            meter_event_data["identifier"] = identifier
+        if timestamp is not None:
+            meter_event_data["timestamp"] = timestamp
+
+        return meter_event_data
+
+    def _event_params(self, event: MeterEvent) -> dict:
+        return self._meter_event_params(
+            event.event_name,
+            event.customer,
+            event.value,
+            event.identifier,
+            event.timestamp,
+        )
 
+    def _request_options(self) -> dict:
+        options: dict = {}
         if self._context.get("account") is not None:
             account = self._context.get("account")
             if account is not None:
-                meter_event_data["stripe_account"] = account
+                options["stripe_account"] = account
 
-        stripe.billing.MeterEvent.create(**meter_event_data)
+        return options
 
-    def run(self, method: str, *args, **kwargs) -> str:
-        if method == "create_customer":
-            return json.dumps(create_customer(self._context, *args, **kwargs))
-        elif method == "list_customers":
-            return json.dumps(list_customers(self._context, *args, **kwargs))
-        elif method == "create_product":
-            return json.dumps(create_product(self._context, *args, **kwargs))
-        elif method == "list_products":
-            return json.dumps(list_products(self._context, *args, **kwargs))
-        elif method == "create_price":
-            return json.dumps(create_price(self._context, *args, **kwargs))
-        elif method == "list_prices":
-            return json.dumps(list_prices(self._context, *args, **kwargs))
-        elif method == "create_payment_link":
-            return json.dumps(
-                create_payment_link(self._context, *args, **kwargs)
+    def _create_meter_event(self, params: dict) -> None:
+        def create():
+            self._client.billing.meter_events.create(
+                params, self._request_options()
+            )
+
+        if self._cassette is None:
+            return create()
+        self._cassette.call(
+            self._cassette_key("create_meter_event", _replay_params(params)),
+            create,
+        )
+
+    async def _create_meter_event_async(self, params: dict) -> None:
+        async def create():
+            await self._client.billing.meter_events.create_async(
+                params, self._request_options()
+            )
+
+        if self._cassette is None:
+            return await create()
+        await self._cassette.call_async(
+            self._cassette_key("create_meter_event", _replay_params(params)),
+            create,
+        )
+
+    def create_meter_event(
+        self,
+        event: str,
+        customer: str,
+        value: Optional[str] = None,
+        identifier: Optional[str] = None,
+        timestamp: Optional[int] = None,
+    ) -> None:
+        api = self._routed()
+        api._create_meter_event(
+            api._meter_event_params(
+                event, customer, value, identifier, timestamp
             )
-        elif method == "list_invoices":
-            return json.dumps(list_invoices(self._context, *args, **kwargs))
-        elif method == "create_invoice":
-            return json.dumps(create_invoice(self._context, *args, **kwargs))
-        elif method == "create_invoice_item":
-            return json.dumps(
-                create_invoice_item(self._context, *args, **kwargs)
+        )
+
+    async def create_meter_event_async(
+        self,
+        event: str,
+        customer: str,
+        value: Optional[str] = None,
+        identifier: Optional[str] = None,
+        timestamp: Optional[int] = None,
+    ) -> None:
+        api = self._routed()
+        await api._create_meter_event_async(
+            api._meter_event_params(
+                event, customer, value, identifier, timestamp
             )
-        elif method == "finalize_invoice":
-            return json.dumps(finalize_invoice(self._context, *args, **kwargs))
-        elif method == "retrieve_balance":
-            return json.dumps(retrieve_balance(self._context, *args, **kwargs))
-        elif method == "create_refund":
-            return json.dumps(create_refund(self._context, *args, **kwargs))
-        elif method == "list_payment_intents":
-            return json.dumps(
-                list_payment_intents(self._context, *args, **kwargs)
+        )
+
+    @property
+    def account(self) -> Optional[str]:
+        """The connected account calls made here act on, if any.
+
+        Follows the current route, like the calls themselves.
+        """
+        return self._routed()._context.get("account")
+
+    @property
+    def secret_key(self) -> str:
+        """The secret key calls made here use.
+
+        Follows the current route, like the calls themselves.
+        """
+        return self._routed()._secret_key
+
+    @property
+    def uses_meter_event_stream(self) -> bool:
+        """Whether meter events are sent on the v2 meter event stream."""
+        return (
+            self._meter_event_stream is not None
+            and self._meter_event_stream.available
+        )
+
+    def _stream_chunk(self, chunk: List[MeterEvent]) -> None:
+        def create():
+            self._meter_event_stream.send(
+                self._client,
+                (self._key_id, self._context.get("account")),
+                [event.v2_params() for event in chunk],
+                self._request_options(),
+            )
+
+        if self._cassette is None:
+            return create()
+        self._cassette.call(
+            self._cassette_key(
+                "create_meter_events",
+                [_replay_params(event.v2_params()) for event in chunk],
+            ),
+            create,
+        )
+
+    async def _stream_chunk_async(self, chunk: List[MeterEvent]) -> None:
+        async def create():
+            await self._meter_event_stream.send_async(
+                self._client,
+                (self._key_id, self._context.get("account")),
+                [event.v2_params() for event in chunk],
+                self._request_options(),
+            )
+
+        if self._cassette is None:
+            return await create()
+        await self._cassette.call_async(
+            self._cassette_key(
+                "create_meter_events",
+                [_replay_params(event.v2_params()) for event in chunk],
+            ),
+            create,
+        )
+
+    def _stream_failed(self, error: Exception) -> None:
+        # A request rejected as invalid is resent one event at a time, so
+        # that only the invalid events fail; any other error means the
+        # stream is unusable with this key.
+        if getattr(error, "http_status", None) != 400:
+            self._meter_event_stream.available = False
+
+    def create_meter_events(
+        self, events: List[MeterEvent]
+    ) -> List[Optional[Exception]]:
+        """Send several meter events at once, returning what became of each.
+
+        With the ``meter_event_stream`` option, they are sent on the v2
+        high-throughput meter event stream, up to 100 per request. Without
+        it, or once the stream fails with a non-transient error, each one
+        is created with the v1 API, as are the events of a stream request
+        rejected as invalid. Events are sent for the account of this
+        instance, whatever their ``account``.
+
+        The result holds ``None`` for each event Stripe accepted, or
+        already had, and the error of each one it did not. After a
+        transient error, the events not sent yet get that error too, so
+        that they can be retried together.
+        """
+        api = self._routed()
+        outcomes: List[Optional[Exception]] = []
+        for chunk in _meter_event_chunks(events):
+            if api.uses_meter_event_stream:
+                try:
+                    api._stream_chunk(chunk)
+                except Exception as e:
+                    if is_retryable(e):
+                        return _fail_rest(outcomes, events, e)
+                    api._stream_failed(e)
+                else:
+                    outcomes.extend([None] * len(chunk))
+                    continue
+            for event in chunk:
+                try:
+                    api._create_meter_event(api._event_params(event))
+                except Exception as e:
+                    if is_retryable(e):
+                        return _fail_rest(outcomes, events, e)
+                    outcomes.append(None if is_duplicate(e) else e)
+                else:
+                    outcomes.append(None)
+        return outcomes
+
+    async def create_meter_events_async(
+        self, events: List[MeterEvent]
+    ) -> List[Optional[Exception]]:
+        """Asynchronous counterpart of :meth:`create_meter_events`."""
+        api = self._routed()
+        outcomes: List[Optional[Exception]] = []
+        for chunk in _meter_event_chunks(events):
+            if api.uses_meter_event_stream:
+                try:
+                    await api._stream_chunk_async(chunk)
+                except Exception as e:
+                    if is_retryable(e):
+                        return _fail_rest(outcomes, events, e)
+                    api._stream_failed(e)
+                else:
+                    outcomes.extend([None] * len(chunk))
+                    continue
+            for event in chunk:
+                try:
+                    await api._create_meter_event_async(
+                        api._event_params(event)
+                    )
+                except Exception as e:
+                    if is_retryable(e):
+                        return _fail_rest(outcomes, events, e)
+                    outcomes.append(None if is_duplicate(e) else e)
+                else:
+                    outcomes.append(None)
+        return outcomes
+
+    def _arguments(self, handler: ToolHandler, kwargs: dict) -> dict:
+        # Budgets are not part of the tool schemas, which the model sees,
+        # but callers of run may set them per call over the configured ones.
+        budgets = {}
+        if handler.paginated:
+            budgets = {
+                budget: kwargs.pop(budget)
+                for budget in _BUDGET_ARGUMENTS
+                if budget in kwargs
+            }
+        arguments = handler.validator(kwargs)
+        if handler.paginated:
+            for budget, value in {**self._pagination, **budgets}.items():
+                if value is not None:
+                    arguments.setdefault(budget, value)
+        return arguments
+
+    def _read_key(
+        self, handler: ToolHandler, args: tuple, arguments: dict
+    ) -> CacheKey:
+        return (
+            self._key_id,
+            self._context.get("account"),
+            handler.resource or handler.method,
+            handler.method,
+            json.dumps(
+                [
+                    args,
+                    arguments,
+                    self._projections.get(handler.method),
+                    self._serialization,
+                    self._list_format,
+                ],
+                sort_keys=True,
+                default=str,
+            ),
+        )
+
+    def _cassette_key(self, method: str, *arguments: Any) -> str:
+        # Not keyed by secret key, so that a recording replays with any key.
+        return json.dumps(
+            [
+                self._context.get("account"),
+                method,
+                *arguments,
+                self._projections.get(method),
+                self._serialization,
+                self._list_format,
+            ],
+            sort_keys=True,
+            default=str,
+        )
+
+    def _cached(self, key: CacheKey) -> Optional[str]:
+        if self._cache is None:
+            return None
+        value = self._cache.get(key)
+        if value is not None and not isinstance(value, str):
+            raise value
+        return value
+
+    def _generation(self, key: CacheKey) -> Optional[int]:
+        if self._cache is None:
+            return None
+        return self._cache.generation(key)
+
+    def _store(
+        self,
+        key: CacheKey,
+        generation: Optional[int],
+        value: Union[str, Exception],
+    ) -> None:
+        if self._cache is None:
+            return
+        if isinstance(value, str) or is_negative_result(value):
+            # Skipped if a write invalidated the key since the read began.
+            self._cache.set(key, value, generation)
+
+    def _invalidate(self, handler: ToolHandler) -> None:
+        if self._cache is None or handler.resource is None:
+            return
+        self._cache.invalidate(
+            self._key_id, self._context.get("account"), handler.resource
+        )
+
+    def _slot(self, handler: ToolHandler):
+        if self._rate_limiter is None:
+            return nullcontext()
+        return self._rate_limiter.slot(
+            self._key_id,
+            self._context.get("account"),
+            "read" if handler.read_only else "write",
+        )
+
+    def _uses_raw(self, handler: ToolHandler, arguments: dict) -> bool:
+        # Paginated windows are assembled from decoded pages, so only
+        # single-request calls can skip decoding.
+        return (
+            self._serialization == "raw"
+            and handler.raw_function is not None
+            and not any(
+                arguments.get(name) is not None
+                for name in _PAGINATION_ARGUMENTS
             )
-        elif method == "create_billing_portal_session":
-            return json.dumps(
-                create_billing_portal_session(self._context, *args, **kwargs)
+        )
+
+    def _serialize(self, handler: ToolHandler, result, raw: bool) -> str:
+        fields = self._projections.get(handler.method)
+        list_format = self._list_format if handler.paginated else "json"
+        if raw:
+            return serialize_raw(result, fields, list_format)
+        return serialize(
+            project(result, fields), list_format, handler.serializer, fields
+        )
+
+    def _idempotency_key(self, handler: ToolHandler) -> Optional[str]:
+        # One key per logical write, reused by every retry of it, so Stripe
+        # applies the write at most once.
+        if handler.read_only:
+            return None
+        return new_idempotency_key(handler.method)
+
+    def _call(self, handler: ToolHandler, args: tuple, arguments: dict) -> str:
+        key = self._idempotency_key(handler)
+        raw = self._uses_raw(handler, arguments)
+        function = handler.raw_function if raw else handler.function
+        if raw:
+            arguments = _without_pagination(arguments)
+
+        fields = self._projections.get(handler.method)
+
+        def attempt():
+            with self._slot(handler), idempotency_key(key), projected(fields):
+                return function(
+                    self._client, self._context, *args, **arguments
+                )
+
+        return self._serialize(handler, self._retry.call(attempt), raw)
+
+    async def _call_async(
+        self, handler: ToolHandler, args: tuple, arguments: dict
+    ) -> str:
+        key = self._idempotency_key(handler)
+        raw = self._uses_raw(handler, arguments)
+        function = (
+            handler.raw_async_function if raw else handler.async_function
+        )
+        if raw:
+            arguments = _without_pagination(arguments)
+
+        fields = self._projections.get(handler.method)
+
+        async def attempt():
+            async with self._slot(handler):
+                with idempotency_key(key), projected(fields):
+                    return await function(
+                        self._client, self._context, *args, **arguments
+                    )
+
+        return self._serialize(
+            handler, await self._retry.call_async(attempt), raw
+        )
+
+    def _read(
+        self,
+        handler: ToolHandler,
+        key: CacheKey,
+        generation: Optional[int],
+        args: tuple,
+        arguments: dict,
+    ) -> str:
+        try:
+            result = self._call(handler, args, arguments)
+        except Exception as e:
+            self._store(key, generation, e)
+            raise
+        self._store(key, generation, result)
+        return result
+
+    async def _read_async(
+        self,
+        handler: ToolHandler,
+        key: CacheKey,
+        generation: Optional[int],
+        args: tuple,
+        arguments: dict,
+    ) -> str:
+        try:
+            result = await self._call_async(handler, args, arguments)
+        except Exception as e:
+            self._store(key, generation, e)
+            raise
+        self._store(key, generation, result)
+        return result
+
+    def run(self, method: str, *args, **kwargs) -> str:
+        return self._routed()._run(method, *args, **kwargs)
+
+    async def arun(self, method: str, *args, **kwargs) -> str:
+        return await self._routed()._arun(method, *args, **kwargs)
+
+    def _run(self, method: str, *args, **kwargs) -> str:
+        handler = get_handler(method)
+        arguments = self._arguments(handler, kwargs)
+        if self._cassette is None:
+            return self._execute(handler, args, arguments)
+        return self._cassette.call(
+            self._cassette_key(method, args, arguments),
+            lambda: self._execute(handler, args, arguments),
+        )
+
+    async def _arun(self, method: str, *args, **kwargs) -> str:
+        handler = get_handler(method)
+        arguments = self._arguments(handler, kwargs)
+        if self._cassette is None:
+            return await self._aexecute(handler, args, arguments)
+        return await self._cassette.call_async(
+            self._cassette_key(method, args, arguments),
+            lambda: self._aexecute(handler, args, arguments),
+        )
+
+    def _execute(
+        self, handler: ToolHandler, args: tuple, arguments: dict
+    ) -> str:
+        if not handler.read_only:
+            try:
+                return self._call(handler, args, arguments)
+            finally:
+                # A write that failed may still have reached Stripe.
+                self._invalidate(handler)
+
+        key = self._read_key(handler, args, arguments)
+        generation = self._generation(key)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        # Keyed by generation too, so that a read arriving after a write
+        # does not join one that started before it.
+        return self._single_flight.do(
+            (key, generation),
+            lambda: self._read(handler, key, generation, args, arguments),
+        )
+
+    async def _aexecute(
+        self, handler: ToolHandler, args: tuple, arguments: dict
+    ) -> str:
+        if not handler.read_only:
+            try:
+                return await self._call_async(handler, args, arguments)
+            finally:
+                self._invalidate(handler)
+
+        key = self._read_key(handler, args, arguments)
+        generation = self._generation(key)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        return await self._single_flight.do_async(
+            (key, generation),
+            lambda: self._read_async(
+                handler, key, generation, args, arguments
+            ),
+        )
+
+    def _run_item(self, method: str, kwargs: Dict[str, Any]):
+        try:
+            return self.run(method, **kwargs)
+        except Exception as e:
+            return e
+
+    def run_many(
+        self,
+        calls: Iterable[Tuple[str, Dict[str, Any]]],
+        max_concurrency: int = 8,
+    ) -> List[Union[str, Exception]]:
+        """Run independent ``(method, kwargs)`` calls concurrently.
+
+        At most ``max_concurrency`` calls are in flight at once. Results come
+        back in the order of ``calls``; a call that failed is represented by
+        the exception it raised rather than failing the whole batch.
+        """
+        _check_concurrency(max_concurrency)
+        calls = list(calls)
+        if not calls:
+            return []
+        # Worker threads do not inherit the caller's route, so resolve it
+        # here once for the whole batch.
+        api = self._routed()
+        with ThreadPoolExecutor(
+            max_workers=min(max_concurrency, len(calls))
+        ) as executor:
+            return list(executor.map(lambda call: api._run_item(*call), calls))
+
+    async def arun_many(
+        self,
+        calls: Iterable[Tuple[str, Dict[str, Any]]],
+        max_concurrency: int = 8,
+    ) -> List[Union[str, Exception]]:
+        """Asynchronous counterpart of :meth:`run_many`."""
+        _check_concurrency(max_concurrency)
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run_item(method: str, kwargs: Dict[str, Any]):
+            async with semaphore:
+                try:
+                    return await self.arun(method, **kwargs)
+                except Exception as e:
+                    return e
+
+        return list(
+            await asyncio.gather(
+                *(run_item(method, kwargs) for method, kwargs in calls)
             )
-        else:
-            raise ValueError("Invalid method " + method)
+        )
@@ -0,0 +1,219 @@
+"""Read-through cache for the read-only tools."""
+
+from __future__ import annotations
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Set, Tuple, Union
+
+if TYPE_CHECKING:
+    from stripe import StripeError
+
+# (key id, connected account, resource, method, arguments)
+CacheKey = Tuple[str, Optional[str], str, str, str]
+
+# Seconds a cached read of each resource stays fresh.
+DEFAULT_TTLS: Dict[str, float] = {
+    "products": 300,
+    "prices": 300,
+    "customers": 60,
+    "invoices": 30,
+    "payment_intents": 30,
+    "balance": 10,
+}
+
+# Writes to a resource that also change what reads of other resources
+# return, beyond the resource itself.
+DEPENDENT_RESOURCES: Dict[str, Tuple[str, ...]] = {
+    "invoice_items": ("invoices",),
+    "refunds": ("balance", "payment_intents"),
+}
+
+
+def is_negative_result(error: Exception) -> bool:
+    """Whether ``error`` is a stable "not found" answer worth caching."""
+    from stripe import StripeError
+
+    return (
+        isinstance(error, StripeError)
+        and getattr(error, "code", None) == "resource_missing"
+    )
+
+
+class ToolCache(ABC):
+    """Interface for caches that can sit in front of the read-only tools.
+
+    Values are the serialized tool results, or the ``StripeError`` a read
+    failed with when that failure is a negative result.
+
+    Each (key id, account, resource) group has a generation that
+    :meth:`invalidate` bumps. A read notes the generation of its key before
+    calling Stripe and passes it to :meth:`set`, which drops the value if a
+    write invalidated the group in the meantime.
+    """
+
+    @abstractmethod
+    def get(self, key: CacheKey) -> Optional[Union[str, StripeError]]:
+        """Return the cached value for ``key``, or ``None`` on a miss."""
+
+    @abstractmethod
+    def generation(self, key: CacheKey) -> int:
+        """The current generation of the group ``key`` belongs to."""
+
+    @abstractmethod
+    def set(
+        self,
+        key: CacheKey,
+        value: Union[str, StripeError],
+        generation: Optional[int] = None,
+    ) -> None:
+        """Cache ``value`` under ``key``.
+
+        Nothing is cached if ``generation`` is given and the group of
+        ``key`` has been invalidated since.
+        """
+
+    @abstractmethod
+    def invalidate(
+        self, key_id: str, account: Optional[str], resource: str
+    ) -> None:
+        """Drop every entry affected by a write to ``resource``."""
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "size")
+
+    def __init__(
+        self, value: Union[str, StripeError], expires_at: float, size: int
+    ):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+
+
+class TTLCache(ToolCache):
+    """In-memory cache with per-resource TTLs and LRU eviction.
+
+    Entries are evicted least recently used first once their combined size
+    goes over ``max_bytes``. Hits and misses are counted per resource and
+    reported by :meth:`stats`.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 16 * 1024 * 1024,
+        ttls: Optional[Dict[str, float]] = None,
+        default_ttl: float = 30,
+        negative_ttl: float = 30,
+    ):
+        self._max_bytes = max_bytes
+        self._ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self._default_ttl = default_ttl
+        self._negative_ttl = negative_ttl
+        self._entries: OrderedDict[CacheKey, _Entry] = OrderedDict()
+        self._groups: Dict[Tuple[str, Optional[str], str], Set[CacheKey]] = {}
+        self._generations: Dict[Tuple[str, Optional[str], str], int] = {}
+        self._size = 0
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, resource: str, counter: str) -> None:
+        stats = self._stats.setdefault(
+            resource, {"hits": 0, "misses": 0, "evictions": 0}
+        )
+        stats[counter] += 1
+
+    def _remove(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key)
+        self._size -= entry.size
+        group = self._groups.get(key[:3])
+        if group is not None:
+            group.discard(key)
+            if not group:
+                del self._groups[key[:3]]
+
+    def get(self, key: CacheKey) -> Optional[Union[str, StripeError]]:
+        resource = key[2]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self._count(resource, "misses")
+                return None
+            self._entries.move_to_end(key)
+            self._count(resource, "hits")
+            return entry.value
+
+    def generation(self, key: CacheKey) -> int:
+        with self._lock:
+            return self._generations.get(key[:3], 0)
+
+    def set(
+        self,
+        key: CacheKey,
+        value: Union[str, StripeError],
+        generation: Optional[int] = None,
+    ) -> None:
+        resource = key[2]
+        if isinstance(value, str):
+            ttl = self._ttls.get(resource, self._default_ttl)
+            size = len(value)
+        else:
+            ttl = self._negative_ttl
+            size = len(str(value))
+        if ttl <= 0 or size > self._max_bytes:
+            return
+
+        with self._lock:
+            if (
+                generation is not None
+                and self._generations.get(key[:3], 0) != generation
+            ):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(value, time.monotonic() + ttl, size)
+            self._groups.setdefault(key[:3], set()).add(key)
+            self._size += size
+            while self._size > self._max_bytes:
+                oldest = next(iter(self._entries))
+                self._count(oldest[2], "evictions")
+                self._remove(oldest)
+
+    def invalidate(
+        self, key_id: str, account: Optional[str], resource: str
+    ) -> None:
+        resources: Iterable[str] = (resource,) + DEPENDENT_RESOURCES.get(
+            resource, ()
+        )
+        with self._lock:
+            for affected in resources:
+                group_key = (key_id, account, affected)
+                self._generations[group_key] = (
+                    self._generations.get(group_key, 0) + 1
+                )
+                group = self._groups.get(group_key)
+                for key in list(group or ()):
+                    self._remove(key)
+
+    def clear(self) -> None:
+        """Drop every entry, keeping the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._groups.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Hit, miss and eviction counters per resource."""
+        with self._lock:
+            return {
+                resource: dict(counters)
+                for resource, counters in self._stats.items()
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,241 @@
+"""Record and replay of tool calls, for fast deterministic runs.
+
+A cassette file holds one record per call, followed by an index sorted by
+call key and a fixed-size footer::
+
+    record:  payload, zlib-compressed when that makes it smaller
+    index:   (digest, occurrence, offset, length, kind) per record
+    footer:  index offset, record count, magic
+
+In replay mode the file is memory-mapped and the index is binary searched
+in place, so opening a cassette does not read it and lookups do not touch
+the network.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import struct
+import threading
+import zlib
+from typing import Any, Awaitable, Callable, Dict, List, Literal, Optional
+
+_MAGIC = b"SATCAS01"
+# digest, occurrence, offset, length, kind
+_ENTRY = struct.Struct("<16sIQIB")
+# index offset, record count, magic
+_FOOTER = struct.Struct("<QI8s")
+
+_STRING, _NONE, _ERROR = 0, 1, 2
+_COMPRESSED = 0x80
+
+
+class CassetteMiss(LookupError):
+    """A call in replay mode that the cassette has no recording of."""
+
+
+class ReplayedError(Exception):
+    """A recorded failure that is not a Stripe error."""
+
+
+def _digest(key: str) -> bytes:
+    return hashlib.sha256(key.encode()).digest()[:16]
+
+
+def _encode_error(error: Exception) -> dict:
+    return {
+        "type": type(error).__name__,
+        "message": getattr(error, "user_message", None) or str(error),
+        "http_status": getattr(error, "http_status", None),
+        "code": getattr(error, "code", None),
+        "param": getattr(error, "param", None),
+    }
+
+
+def _decode_error(data: dict) -> Exception:
+    import stripe
+
+    cls = getattr(stripe, data["type"], None)
+    if not (isinstance(cls, type) and issubclass(cls, stripe.StripeError)):
+        return ReplayedError("%s: %s" % (data["type"], data["message"]))
+    # Subclasses take different constructor arguments, so initialize the
+    # common attributes directly.
+    error = cls.__new__(cls)
+    stripe.StripeError.__init__(
+        error,
+        data["message"],
+        http_status=data["http_status"],
+        code=data["code"],
+    )
+    if data["param"] is not None:
+        error.param = data["param"]
+    return error
+
+
+class Cassette:
+    """A file of recorded tool call results.
+
+    In ``"record"`` mode every call runs normally and its result, or the
+    error it raised, is appended to ``path``; call :meth:`close` (or use
+    the cassette as a context manager) to write the index. In ``"replay"``
+    mode calls are answered from ``path`` and a call with no recording
+    raises :class:`CassetteMiss`.
+
+    Calls are keyed by method and normalized arguments. A key called
+    several times replays its recordings in order and then repeats the
+    last one, so reads before and after a write return what they did when
+    recorded.
+    """
+
+    def __init__(self, path: str, mode: Literal["record", "replay"]):
+        if mode not in ("record", "replay"):
+            raise ValueError("Invalid cassette mode: %s" % mode)
+        self.path = path
+        self.mode = mode
+        self._occurrences: Dict[bytes, int] = {}
+        self._lock = threading.Lock()
+        self._entries: List[tuple] = []
+        self._file: Any = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._count = 0
+        self._index = 0
+        if mode == "record":
+            self._file = open(path, "wb")
+        else:
+            self._open()
+
+    def _open(self) -> None:
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < _FOOTER.size:
+            raise ValueError("Not a cassette: %s" % self.path)
+        self._index, self._count, magic = _FOOTER.unpack_from(
+            self._mmap, len(self._mmap) - _FOOTER.size
+        )
+        if magic != _MAGIC:
+            raise ValueError("Not a cassette: %s" % self.path)
+
+    def __len__(self) -> int:
+        return len(self._entries) if self.mode == "record" else self._count
+
+    # Calls
+
+    def _next_occurrence(self, digest: bytes) -> int:
+        with self._lock:
+            occurrence = self._occurrences.get(digest, 0)
+            self._occurrences[digest] = occurrence + 1
+            return occurrence
+
+    def call(self, key: str, function: Callable[[], Any]) -> Any:
+        """The result of ``function``, recorded or replayed under ``key``."""
+        digest = _digest(key)
+        occurrence = self._next_occurrence(digest)
+        if self.mode == "replay":
+            return self._replay(key, digest, occurrence)
+        try:
+            result = function()
+        except Exception as e:
+            self._record(digest, occurrence, e)
+            raise
+        self._record(digest, occurrence, result)
+        return result
+
+    async def call_async(
+        self, key: str, function: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Asynchronous counterpart of :meth:`call`."""
+        digest = _digest(key)
+        occurrence = self._next_occurrence(digest)
+        if self.mode == "replay":
+            return self._replay(key, digest, occurrence)
+        try:
+            result = await function()
+        except Exception as e:
+            self._record(digest, occurrence, e)
+            raise
+        self._record(digest, occurrence, result)
+        return result
+
+    # Recording
+
+    def _record(self, digest: bytes, occurrence: int, result: Any) -> None:
+        if isinstance(result, Exception):
+            kind = _ERROR
+            payload = json.dumps(_encode_error(result)).encode()
+        elif result is None:
+            kind, payload = _NONE, b""
+        else:
+            kind, payload = _STRING, result.encode()
+        compressed = zlib.compress(payload)
+        if len(compressed) < len(payload):
+            kind, payload = kind | _COMPRESSED, compressed
+
+        with self._lock:
+            if self._file is None:
+                raise ValueError("The cassette is closed.")
+            offset = self._file.tell()
+            self._file.write(payload)
+            self._entries.append(
+                (digest, occurrence, offset, len(payload), kind)
+            )
+
+    def close(self) -> None:
+        """Write the index of a recording, or unmap a replayed cassette."""
+        with self._lock:
+            if self._file is not None:
+                index = self._file.tell()
+                for entry in sorted(self._entries):
+                    self._file.write(_ENTRY.pack(*entry))
+                self._file.write(
+                    _FOOTER.pack(index, len(self._entries), _MAGIC)
+                )
+                self._file.close()
+                self._file = None
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+
+    def __enter__(self) -> "Cassette":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    # Replay
+
+    def _entry(self, i: int) -> tuple:
+        return _ENTRY.unpack_from(self._mmap, self._index + i * _ENTRY.size)
+
+    def _find(self, digest: bytes, occurrence: int) -> Optional[tuple]:
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._entry(middle)[:2] < (digest, occurrence):
+                low = middle + 1
+            else:
+                high = middle
+        # Past the last recording of the key, repeat the last one.
+        if low < self._count and self._entry(low)[0] == digest:
+            return self._entry(low)
+        if low > 0 and self._entry(low - 1)[0] == digest:
+            return self._entry(low - 1)
+        return None
+
+    def _replay(self, key: str, digest: bytes, occurrence: int) -> Any:
+        if self._mmap is None:
+            raise ValueError("The cassette is closed.")
+        entry = self._find(digest, occurrence)
+        if entry is None:
+            raise CassetteMiss("No recording for %s" % key)
+        _, _, offset, length, kind = entry
+        payload = self._mmap[offset : offset + length]
+        if kind & _COMPRESSED:
+            payload = zlib.decompress(payload)
+        kind &= ~_COMPRESSED
+        if kind == _NONE:
+            return None
+        if kind == _ERROR:
+            raise _decode_error(json.loads(payload))
+        return payload.decode()
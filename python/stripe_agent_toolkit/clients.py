@@ -0,0 +1,86 @@
+"""Registry of per-key Stripe clients."""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional, Tuple
+
+if TYPE_CHECKING:
+    from stripe import StripeClient
+
+
+def key_id(secret_key: str) -> str:
+    """Identifies ``secret_key`` in shared state without storing it."""
+    return hashlib.sha256(secret_key.encode()).hexdigest()[:16]
+
+
+def _create_client(
+    secret_key: str, api_base: Optional[str] = None
+) -> StripeClient:
+    # Imported on first use, as the Stripe SDK is slow to import.
+    import stripe
+
+    # stripe-python only supports app info globally. The value is the same
+    # for every client, so setting it here is safe across tenants.
+    stripe.set_app_info(
+        "stripe-agent-toolkit-python",
+        version="0.6.1",
+        url="https://github.com/stripe/agent-toolkit",
+    )
+    if api_base is None:
+        return stripe.StripeClient(secret_key)
+    return stripe.StripeClient(
+        secret_key,
+        base_addresses={"api": api_base, "meter_events": api_base},
+    )
+
+
+class StripeClientRegistry:
+    """Reuses one ``StripeClient`` per secret key and API base.
+
+    Each client owns its own HTTP connection pool, so toolkits created for
+    the same key share warm keep-alive connections. When more than
+    ``max_clients`` keys are in use, the least recently used client is
+    dropped from the registry; instances that still hold it keep working.
+    """
+
+    def __init__(self, max_clients: int = 256):
+        self._max_clients = max_clients
+        self._clients: OrderedDict[Tuple[str, Optional[str]], StripeClient] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(
+        self, secret_key: str, api_base: Optional[str] = None
+    ) -> StripeClient:
+        """Get the client for ``secret_key``, creating it if needed.
+
+        ``api_base`` overrides the URL of the Stripe API, for example to
+        point the client at :class:`stripe_agent_toolkit.testing.FakeStripe`.
+        """
+        key = (secret_key, api_base)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                return client
+
+            client = _create_client(secret_key, api_base)
+            self._clients[key] = client
+            while len(self._clients) > self._max_clients:
+                self._clients.popitem(last=False)
+            return client
+
+    def clear(self) -> None:
+        """Drop every client from the registry."""
+        with self._lock:
+            self._clients.clear()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+
+default_registry = StripeClientRegistry()
@@ -1,6 +1,10 @@
-from typing import Literal, Optional
+from typing import Dict, List, Literal, Optional
 from typing_extensions import TypedDict
 
+from .cache import ToolCache
+from .cassette import Cassette
+from .ratelimit import RateLimiter
+
 # Define Object type
 Object = Literal[
     "customers",
@@ -46,10 +50,34 @@ class Context(TypedDict, total=False):
     account: Optional[str]
 
 
+# Define Pagination type
+class Pagination(TypedDict, total=False):
+    max_items: Optional[int]
+    max_bytes: Optional[int]
+
+
+# Define Retry type
+class Retry(TypedDict, total=False):
+    max_attempts: Optional[int]
+    base_delay: Optional[float]
+    max_delay: Optional[float]
+    deadline: Optional[float]
+
+
 # Define Configuration type
 class Configuration(TypedDict, total=False):
     actions: Optional[Actions]
     context: Optional[Context]
+    pagination: Optional[Pagination]
+    cache: Optional[ToolCache]
+    rate_limiter: Optional[RateLimiter]
+    retry: Optional[Retry]
+    projections: Optional[Dict[str, Optional[List[str]]]]
+    serialization: Optional[Literal["objects", "raw"]]
+    list_format: Optional[Literal["json", "table", "columns"]]
+    api_base: Optional[str]
+    cassette: Optional[Cassette]
+    meter_event_stream: Optional[bool]
 
 
 def is_tool_allowed(tool, configuration):
@@ -0,0 +1,28 @@
+"""Metering of CrewAI runs."""
+
+from typing import Any
+
+from ..metering import BillingMeter
+
+
+class BillingCallback:
+    """Records CrewAI runs with a meter.
+
+    Call it with the ``CrewOutput`` returned by ``Crew.kickoff`` to record
+    the kickoff with the crew's token usage; it returns the output it was
+    given. It can also be passed as the ``task_callback`` of a ``Crew`` to
+    record each task as an outcome, as task outputs carry no token usage.
+    Recording only queues meter events, so callbacks never wait on Stripe.
+    """
+
+    def __init__(self, meter: BillingMeter):
+        self.meter = meter
+
+    def __call__(self, output: Any) -> Any:
+        # Crew outputs have a UsageMetrics, task outputs do not.
+        usage = getattr(output, "token_usage", None)
+        self.meter.record(
+            getattr(usage, "prompt_tokens", None),
+            getattr(usage, "completion_tokens", None),
+        )
+        return output
@@ -28,3 +28,11 @@ class StripeTool(BaseTool):
     ) -> str:
         """Use the Stripe API to run an operation."""
         return self.stripe_api.run(self.method, *args, **kwargs)
+
+    async def _arun(
+        self,
+        *args: Any,
+        **kwargs: Any,
+    ) -> str:
+        """Use the Stripe API to run an operation without blocking."""
+        return await self.stripe_api.arun(self.method, *args, **kwargs)
@@ -1,16 +1,19 @@
 """Stripe Agent Toolkit."""
 
-from typing import List, Optional
+import copy
+from typing import Dict, List, Optional, Union
 from pydantic import PrivateAttr
 
 from ..api import StripeAPI
-from ..tools import tools
-from ..configuration import Configuration, is_tool_allowed
+from ..configuration import Configuration, Context
+from ..metering import BillingMeter, MeterEventEmitter, UsageAggregator
+from .callbacks import BillingCallback
 from .tool import StripeTool
 
 
 class StripeAgentToolkit:
     _tools: List = PrivateAttr(default=[])
+    _stripe_api: StripeAPI = PrivateAttr(default=None)
 
     def __init__(
         self, secret_key: str, configuration: Optional[Configuration] = None
@@ -19,23 +22,79 @@ class StripeAgentToolkit:
 
         context = configuration.get("context") if configuration else None
 
-        stripe_api = StripeAPI(secret_key=secret_key, context=context)
+        self._stripe_api = StripeAPI(
+            secret_key=secret_key,
+            context=context,
+            configuration=configuration,
+        )
 
-        filtered_tools = [
-            tool for tool in tools if is_tool_allowed(tool, configuration)
-        ]
+        # Imported here so that importing the toolkit does not build every
+        # tool schema.
+        from ..tools import configured_tools
+
+        filtered_tools = configured_tools(configuration)
 
         self._tools = [
             StripeTool(
                 name=tool["method"],
                 description=tool["description"],
                 method=tool["method"],
-                stripe_api=stripe_api,
+                stripe_api=self._stripe_api,
                 args_schema=tool.get("args_schema", None),
             )
             for tool in filtered_tools
         ]
 
+        # Shared by every billing callback of the toolkit and of its views.
+        self._meter_event_emitter = MeterEventEmitter(self._stripe_api)
+
     def get_tools(self) -> List:
         """Get the tools in the toolkit."""
         return self._tools
+
+    def bind(self, context: Context) -> "StripeAgentToolkit":
+        """A lightweight view of the toolkit with ``context`` applied.
+
+        The view shares the tool catalog, schemas and client with this
+        toolkit, so it is cheap enough to create per request.
+        """
+        toolkit = copy.copy(self)
+        toolkit._stripe_api = self._stripe_api.bind(context)
+        toolkit._tools = [
+            tool.model_copy(update={"stripe_api": toolkit._stripe_api})
+            for tool in self._tools
+        ]
+        return toolkit
+
+    def with_account(self, account: str) -> "StripeAgentToolkit":
+        """A view of the toolkit acting on the connected ``account``."""
+        return self.bind({"account": account})
+
+    @property
+    def meter_event_emitter(self) -> MeterEventEmitter:
+        """The emitter sending the meter events of the billing callbacks."""
+        return self._meter_event_emitter
+
+    def billing_callback(
+        self,
+        type: Optional[str] = None,
+        customer: Optional[str] = None,
+        meter: Optional[str] = None,
+        meters: Optional[Dict[str, str]] = None,
+        emitter: Optional[Union[MeterEventEmitter, UsageAggregator]] = None,
+    ) -> BillingCallback:
+        """A callback metering runs like the OpenAI ``billing_hook``.
+
+        Pass ``emitter`` to share one emitter, such as the
+        ``meter_event_emitter`` of another toolkit, across frameworks.
+        """
+        return BillingCallback(
+            BillingMeter(
+                emitter or self._meter_event_emitter,
+                type,
+                customer,
+                meter,
+                meters,
+                self._stripe_api,
+            )
+        )
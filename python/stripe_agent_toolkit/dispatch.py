@@ -0,0 +1,110 @@
+"""Table-driven dispatch from tool method names to Stripe functions."""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Type
+
+from pydantic import BaseModel, ConfigDict
+
+
+@dataclass(frozen=True)
+class ToolHandler:
+    """Everything needed to execute one tool method."""
+
+    method: str
+    function: Callable[..., Any]
+    async_function: Callable[..., Any]
+    validator: Callable[[Dict[str, Any]], Dict[str, Any]]
+    serializer: Callable[[Any], str]
+    paginated: bool = False
+    resource: Optional[str] = None
+    read_only: bool = False
+    raw_function: Optional[Callable[..., Any]] = None
+    raw_async_function: Optional[Callable[..., Any]] = None
+
+
+def _make_validator(
+    args_schema: Optional[Type[BaseModel]],
+) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    if args_schema is None:
+        return dict
+
+    # The schemas ignore unknown arguments, which would let a misspelled
+    # one through silently, so validate with a copy that rejects them.
+    strict_schema = type(
+        args_schema.__name__,
+        (args_schema,),
+        {
+            "__module__": args_schema.__module__,
+            "model_config": ConfigDict(extra="forbid"),
+        },
+    )
+    validate = strict_schema.model_validate
+
+    def validator(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        # Only forward the arguments the caller actually set so the
+        # function defaults still apply.
+        return validate(kwargs).model_dump(exclude_unset=True)
+
+    return validator
+
+
+def build_handlers(tool_list: List[Dict]) -> Dict[str, ToolHandler]:
+    """Build the dispatch table for ``tool_list``.
+
+    Every tool must have a matching function and ``_async`` counterpart in
+    ``functions.py``; a missing one fails here rather than at call time.
+    ``_raw`` variants, returning the undecoded response, are optional.
+    """
+    from . import functions
+
+    handlers: Dict[str, ToolHandler] = {}
+    for tool in tool_list:
+        method = tool["method"]
+        args_schema = tool.get("args_schema")
+        paginated = (
+            args_schema is not None
+            and "page_token" in args_schema.model_fields
+        )
+        actions = tool.get("actions", {})
+        permissions = [
+            permission
+            for resource_permissions in actions.values()
+            for permission in resource_permissions
+        ]
+        read_only = bool(permissions) and all(
+            permission == "read" for permission in permissions
+        )
+        handlers[method] = ToolHandler(
+            method=method,
+            function=getattr(functions, method),
+            async_function=getattr(functions, method + "_async"),
+            validator=_make_validator(args_schema),
+            serializer=json.dumps,
+            paginated=paginated,
+            resource=next(iter(actions), None),
+            read_only=read_only,
+            raw_function=getattr(functions, method + "_raw", None),
+            raw_async_function=getattr(functions, method + "_raw_async", None),
+        )
+    return handlers
+
+
+# Built on first use, so that the functions and schemas are only imported
+# once a tool actually runs.
+_handlers: Optional[Dict[str, ToolHandler]] = None
+
+
+def get_handler(method: str) -> ToolHandler:
+    """Look up the handler for ``method``."""
+    global _handlers
+    if _handlers is None:
+        from .tools import tools
+
+        _handlers = build_handlers(tools)
+    handler = _handlers.get(method)
+    if handler is None:
+        raise ValueError("Invalid method " + method)
+    return handler
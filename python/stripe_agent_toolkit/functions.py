@@ -1,9 +1,39 @@
-import stripe
-from typing import Optional
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional
 from .configuration import Context
+from .pagination import is_paginated, paginate, paginate_async
+from .retries import current_idempotency_key
+
+if TYPE_CHECKING:
+    from stripe import StripeClient
+
+
+def _request_options(context: Context) -> dict:
+    """Per-request options derived from the toolkit context."""
+    options: dict = {}
+    account = context.get("account")
+    if account is not None:
+        options["stripe_account"] = account
+    key = current_idempotency_key()
+    if key is not None:
+        options["idempotency_key"] = key
+    return options
+
+
+def _create_customer_params(name: str, email: Optional[str] = None) -> dict:
+    customer_data: dict = {"name": name}
+    if email:
+        customer_data["email"] = email
+    return customer_data
 
 
-def create_customer(context: Context, name: str, email: Optional[str] = None):
+def create_customer(
+    client: StripeClient,
+    context: Context,
+    name: str,
+    email: Optional[str] = None,
+):
     """
     Create a customer.
 
@@ -14,22 +44,48 @@ def create_customer(context: Context, name: str, email: Optional[str] = None):
     Returns:
         stripe.Customer: The created customer.
     """
-    customer_data: dict = {"name": name}
+    customer = client.customers.create(
+        _create_customer_params(name, email), _request_options(context)
+    )
+    return {"id": customer.id}
+
+
+async def create_customer_async(
+    client: StripeClient,
+    context: Context,
+    name: str,
+    email: Optional[str] = None,
+):
+    """Asynchronous counterpart of :func:`create_customer`."""
+    customer = await client.customers.create_async(
+        _create_customer_params(name, email), _request_options(context)
+    )
+    return {"id": customer.id}
+
+
+def _list_customers_params(
+    email: Optional[str] = None, limit: Optional[int] = None
+) -> dict:
+    customer_data: dict = {}
     if email:
         customer_data["email"] = email
-    if context.get("account") is not None:
-        account = context.get("account")
-        if account is not None:
-            customer_data["stripe_account"] = account
+    if limit:
+        customer_data["limit"] = limit
+    return customer_data
 
-    customer = stripe.Customer.create(**customer_data)
+
+def _customer_summary(customer) -> dict:
     return {"id": customer.id}
 
 
 def list_customers(
+    client: StripeClient,
     context: Context,
     email: Optional[str] = None,
     limit: Optional[int] = None,
+    page_token: Optional[str] = None,
+    max_items: Optional[int] = None,
+    max_bytes: Optional[int] = None,
 ):
     """
     List Customers.
@@ -37,26 +93,73 @@ def list_customers(
     Parameters:
         email (str, optional): The email address of the customer.
         limit (int, optional): The number of customers to return.
+        page_token (str, optional): A token from a previous call to resume
+            listing from.
+        max_items (int, optional): Stop after this many customers.
+        max_bytes (int, optional): Stop before the serialized customers
+            exceed this many bytes.
 
     Returns:
         stripe.ListObject: A list of customers.
+        When any pagination argument is set, a dict with ``data`` and
+        ``next_page_token`` instead.
     """
-    customer_data: dict = {}
-    if email:
-        customer_data["email"] = email
-    if limit:
-        customer_data["limit"] = limit
-    if context.get("account") is not None:
-        account = context.get("account")
-        if account is not None:
-            customer_data["stripe_account"] = account
-
-    customers = stripe.Customer.list(**customer_data)
-    return [{"id": customer.id} for customer in customers.data]
+    params = _list_customers_params(email, limit)
+    if is_paginated(page_token, max_items, max_bytes):
+        return paginate(
+            client.customers.list,
+            params,
+            _request_options(context),
+            page_token,
+            max_items,
+            max_bytes,
+            transform=_customer_summary,
+        )
+    customers = client.customers.list(params, _request_options(context))
+    return [_customer_summary(obj) for obj in customers.data]
+
+
+async def list_customers_async(
+    client: StripeClient,
+    context: Context,
+    email: Optional[str] = None,
+    limit: Optional[int] = None,
+    page_token: Optional[str] = None,
+    max_items: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+):
+    """Asynchronous counterpart of :func:`list_customers`."""
+    params = _list_customers_params(email, limit)
+    if is_paginated(page_token, max_items, max_bytes):
+        return await paginate_async(
+            client.customers.list_async,
+            params,
+            _request_options(context),
+            page_token,
+            max_items,
+            max_bytes,
+            transform=_customer_summary,
+        )
+    customers = await client.customers.list_async(
+        params, _request_options(context)
+    )
+    return [_customer_summary(obj) for obj in customers.data]
+
+
+def _create_product_params(
+    name: str, description: Optional[str] = None
+) -> dict:
+    product_data: dict = {"name": name}
+    if description:
+        product_data["description"] = description
+    return product_data
 
 
 def create_product(
-    context: Context, name: str, description: Optional[str] = None
+    client: StripeClient,
+    context: Context,
+    name: str,
+    description: Optional[str] = None,
 ):
     """
     Create a product.
@@ -68,39 +171,139 @@ def create_product(
     Returns:
         stripe.Product: The created product.
     """
-    product_data: dict = {"name": name}
-    if description:
-        product_data["description"] = description
-    if context.get("account") is not None:
-        account = context.get("account")
-        if account is not None:
-            product_data["stripe_account"] = account
+    return client.products.create(
+        _create_product_params(name, description),
+        _request_options(context),
+    )
+
+
+async def create_product_async(
+    client: StripeClient,
+    context: Context,
+    name: str,
+    description: Optional[str] = None,
+):
+    """Asynchronous counterpart of :func:`create_product`."""
+    return await client.products.create_async(
+        _create_product_params(name, description),
+        _request_options(context),
+    )
 
-    return stripe.Product.create(**product_data)
 
+def _list_products_params(limit: Optional[int] = None) -> dict:
+    product_data: dict = {}
+    if limit:
+        product_data["limit"] = limit
+    return product_data
 
-def list_products(context: Context, limit: Optional[int] = None):
+
+def list_products(
+    client: StripeClient,
+    context: Context,
+    limit: Optional[int] = None,
+    page_token: Optional[str] = None,
+    max_items: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+):
     """
     List Products.
     Parameters:
         limit (int, optional): The number of products to return.
+        page_token (str, optional): A token from a previous call to resume
+            listing from.
+        max_items (int, optional): Stop after this many products.
+        max_bytes (int, optional): Stop before the serialized products
+            exceed this many bytes.
 
     Returns:
         stripe.ListObject: A list of products.
+        When any pagination argument is set, a dict with ``data`` and
+        ``next_page_token`` instead.
     """
-    product_data: dict = {}
-    if limit:
-        product_data["limit"] = limit
-    if context.get("account") is not None:
-        account = context.get("account")
-        if account is not None:
-            product_data["stripe_account"] = account
+    params = _list_products_params(limit)
+    if is_paginated(page_token, max_items, max_bytes):
+        return paginate(
+            client.products.list,
+            params,
+            _request_options(context),
+            page_token,
+            max_items,
+            max_bytes,
+        )
+    return client.products.list(params, _request_options(context)).data
+
+
+async def list_products_async(
+    client: StripeClient,
+    context: Context,
+    limit: Optional[int] = None,
+    page_token: Optional[str] = None,
+    max_items: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+):
+    """Asynchronous counterpart of :func:`list_products`."""
+    params = _list_products_params(limit)
+    if is_paginated(page_token, max_items, max_bytes):
+        return await paginate_async(
+            client.products.list_async,
+            params,
+            _request_options(context),
+            page_token,
+            max_items,
+            max_bytes,
+        )
+    products = await client.products.list_async(
+        params, _request_options(context)
+    )
+    return products.data
+
+
+def list_products_raw(
+    client: StripeClient,
+    context: Context,
+    limit: Optional[int] = None,
+):
+    """Like :func:`list_products`, but returns the undecoded response.
 
-    return stripe.Product.list(**product_data).data
+    Returns:
+        stripe.StripeResponse: The list of products as sent by Stripe.
+    """
+    return client.raw_request(
+        "get",
+        "/v1/products",
+        **_list_products_params(limit),
+        **_request_options(context),
+    )
+
+
+async def list_products_raw_async(
+    client: StripeClient,
+    context: Context,
+    limit: Optional[int] = None,
+):
+    """Asynchronous counterpart of :func:`list_products_raw`."""
+    return await client.raw_request_async(
+        "get",
+        "/v1/products",
+        **_list_products_params(limit),
+        **_request_options(context),
+    )
+
+
+def _create_price_params(product: str, currency: str, unit_amount: int):
+    return {
+        "product": product,
+        "currency": currency,
+        "unit_amount": unit_amount,
+    }
 
 
 def create_price(
-    context: Context, product: str, currency: str, unit_amount: int
+    client: StripeClient,
+    context: Context,
+    product: str,
+    currency: str,
+    unit_amount: int,
 ):
     """
     Create a price.
@@ -113,23 +316,45 @@ def create_price(
     Returns:
         stripe.Price: The created price.
     """
-    price_data: dict = {
-        "product": product,
-        "currency": currency,
-        "unit_amount": unit_amount,
-    }
-    if context.get("account") is not None:
-        account = context.get("account")
-        if account is not None:
-            price_data["stripe_account"] = account
+    return client.prices.create(
+        _create_price_params(product, currency, unit_amount),
+        _request_options(context),
+    )
+
+
+async def create_price_async(
+    client: StripeClient,
+    context: Context,
+    product: str,
+    currency: str,
+    unit_amount: int,
+):
+    """Asynchronous counterpart of :func:`create_price`."""
+    return await client.prices.create_async(
+        _create_price_params(product, currency, unit_amount),
+        _request_options(context),
+    )
 
-    return stripe.Price.create(**price_data)
+
+def _list_prices_params(
+    product: Optional[str] = None, limit: Optional[int] = None
+) -> dict:
+    prices_data: dict = {}
+    if product:
+        prices_data["product"] = product
+    if limit:
+        prices_data["limit"] = limit
+    return prices_data
 
 
 def list_prices(
+    client: StripeClient,
     context: Context,
     product: Optional[str] = None,
     limit: Optional[int] = None,
+    page_token: Optional[str] = None,
+    max_items: Optional[int] = None,
+    max_bytes: Optional[int] = None,
 ):
     """
     List Prices.
@@ -137,24 +362,97 @@ def list_prices(
     Parameters:
         product (str, optional): The ID of the product to list prices for.
         limit (int, optional): The number of prices to return.
+        page_token (str, optional): A token from a previous call to resume
+            listing from.
+        max_items (int, optional): Stop after this many prices.
+        max_bytes (int, optional): Stop before the serialized prices
+            exceed this many bytes.
 
     Returns:
         stripe.ListObject: A list of prices.
+        When any pagination argument is set, a dict with ``data`` and
+        ``next_page_token`` instead.
     """
-    prices_data: dict = {}
-    if product:
-        prices_data["product"] = product
-    if limit:
-        prices_data["limit"] = limit
-    if context.get("account") is not None:
-        account = context.get("account")
-        if account is not None:
-            prices_data["stripe_account"] = account
+    params = _list_prices_params(product, limit)
+    if is_paginated(page_token, max_items, max_bytes):
+        return paginate(
+            client.prices.list,
+            params,
+            _request_options(context),
+            page_token,
+            max_items,
+            max_bytes,
+        )
+    return client.prices.list(params, _request_options(context)).data
+
+
+async def list_prices_async(
+    client: StripeClient,
+    context: Context,
+    product: Optional[str] = None,
+    limit: Optional[int] = None,
+    page_token: Optional[str] = None,
+    max_items: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+):
+    """Asynchronous counterpart of :func:`list_prices`."""
+    params = _list_prices_params(product, limit)
+    if is_paginated(page_token, max_items, max_bytes):
+        return await paginate_async(
+            client.prices.list_async,
+            params,
+            _request_options(context),
+            page_token,
+            max_items,
+            max_bytes,
+        )
+    prices = await client.prices.list_async(params, _request_options(context))
+    return prices.data
+
+
+def list_prices_raw(
+    client: StripeClient,
+    context: Context,
+    product: Optional[str] = None,
+    limit: Optional[int] = None,
+):
+    """Like :func:`list_prices`, but returns the undecoded response.
 
-    return stripe.Price.list(**prices_data).data
+    Returns:
+        stripe.StripeResponse: The list of prices as sent by Stripe.
+    """
+    return client.raw_request(
+        "get",
+        "/v1/prices",
+        **_list_prices_params(product, limit),
+        **_request_options(context),
+    )
 
 
-def create_payment_link(context: Context, price: str, quantity: int):
+async def list_prices_raw_async(
+    client: StripeClient,
+    context: Context,
+    product: Optional[str] = None,
+    limit: Optional[int] = None,
+):
+    """Asynchronous counterpart of :func:`list_prices_raw`."""
+    return await client.raw_request_async(
+        "get",
+        "/v1/prices",
+        **_list_prices_params(product, limit),
+        **_request_options(context),
+    )
+
+
+def _create_payment_link_params(price: str, quantity: int) -> dict:
+    return {
+        "line_items": [{"price": price, "quantity": quantity}],
+    }
+
+
+def create_payment_link(
+    client: StripeClient, context: Context, price: str, quantity: int
+):
     """
     Create a payment link.
 
@@ -165,23 +463,45 @@ def create_payment_link(context: Context, price: str, quantity: int):
     Returns:
         stripe.PaymentLink: The created payment link.
     """
-    payment_link_data: dict = {
-        "line_items": [{"price": price, "quantity": quantity}],
-    }
-    if context.get("account") is not None:
-        account = context.get("account")
-        if account is not None:
-            payment_link_data["stripe_account"] = account
+    payment_link = client.payment_links.create(
+        _create_payment_link_params(price, quantity),
+        _request_options(context),
+    )
 
-    payment_link = stripe.PaymentLink.create(**payment_link_data)
+    return {"id": payment_link.id, "url": payment_link.url}
+
+
+async def create_payment_link_async(
+    client: StripeClient, context: Context, price: str, quantity: int
+):
+    """Asynchronous counterpart of :func:`create_payment_link`."""
+    payment_link = await client.payment_links.create_async(
+        _create_payment_link_params(price, quantity),
+        _request_options(context),
+    )
 
     return {"id": payment_link.id, "url": payment_link.url}
 
 
+def _list_invoices_params(
+    customer: Optional[str] = None, limit: Optional[int] = None
+) -> dict:
+    invoice_data: dict = {}
+    if customer:
+        invoice_data["customer"] = customer
+    if limit:
+        invoice_data["limit"] = limit
+    return invoice_data
+
+
 def list_invoices(
+    client: StripeClient,
     context: Context,
     customer: Optional[str] = None,
     limit: Optional[int] = None,
+    page_token: Optional[str] = None,
+    max_items: Optional[int] = None,
+    max_bytes: Optional[int] = None,
 ):
     """
     List invoices.
@@ -189,24 +509,113 @@ def list_invoices(
     Parameters:
         customer (str, optional): The ID of the customer.
         limit (int, optional): The number of invoices to return.
+        page_token (str, optional): A token from a previous call to resume
+            listing from.
+        max_items (int, optional): Stop after this many invoices.
+        max_bytes (int, optional): Stop before the serialized invoices
+            exceed this many bytes.
 
     Returns:
         stripe.ListObject: A list of invoices.
+        When any pagination argument is set, a dict with ``data`` and
+        ``next_page_token`` instead.
     """
-    invoice_data: dict = {}
-    if customer:
-        invoice_data["customer"] = customer
-    if limit:
-        invoice_data["limit"] = limit
-    if context.get("account") is not None:
-        account = context.get("account")
-        if account is not None:
-            invoice_data["stripe_account"] = account
+    params = _list_invoices_params(customer, limit)
+    if is_paginated(page_token, max_items, max_bytes):
+        return paginate(
+            client.invoices.list,
+            params,
+            _request_options(context),
+            page_token,
+            max_items,
+            max_bytes,
+        )
+    return client.invoices.list(params, _request_options(context)).data
+
+
+async def list_invoices_async(
+    client: StripeClient,
+    context: Context,
+    customer: Optional[str] = None,
+    limit: Optional[int] = None,
+    page_token: Optional[str] = None,
+    max_items: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+):
+    """Asynchronous counterpart of :func:`list_invoices`."""
+    params = _list_invoices_params(customer, limit)
+    if is_paginated(page_token, max_items, max_bytes):
+        return await paginate_async(
+            client.invoices.list_async,
+            params,
+            _request_options(context),
+            page_token,
+            max_items,
+            max_bytes,
+        )
+    invoices = await client.invoices.list_async(
+        params, _request_options(context)
+    )
+    return invoices.data
+
+
+def list_invoices_raw(
+    client: StripeClient,
+    context: Context,
+    customer: Optional[str] = None,
+    limit: Optional[int] = None,
+):
+    """Like :func:`list_invoices`, but returns the undecoded response.
+
+    Returns:
+        stripe.StripeResponse: The list of invoices as sent by Stripe.
+    """
+    return client.raw_request(
+        "get",
+        "/v1/invoices",
+        **_list_invoices_params(customer, limit),
+        **_request_options(context),
+    )
+
+
+async def list_invoices_raw_async(
+    client: StripeClient,
+    context: Context,
+    customer: Optional[str] = None,
+    limit: Optional[int] = None,
+):
+    """Asynchronous counterpart of :func:`list_invoices_raw`."""
+    return await client.raw_request_async(
+        "get",
+        "/v1/invoices",
+        **_list_invoices_params(customer, limit),
+        **_request_options(context),
+    )
+
+
+def _create_invoice_params(customer: str, days_until_due: int = 30) -> dict:
+    return {
+        "customer": customer,
+        "collection_method": "send_invoice",
+        "days_until_due": days_until_due,
+    }
 
-    return stripe.Invoice.list(**invoice_data).data
+
+def _invoice_summary(invoice) -> dict:
+    return {
+        "id": invoice.id,
+        "hosted_invoice_url": invoice.hosted_invoice_url,
+        "customer": invoice.customer,
+        "status": invoice.status,
+    }
 
 
-def create_invoice(context: Context, customer: str, days_until_due: int = 30):
+def create_invoice(
+    client: StripeClient,
+    context: Context,
+    customer: str,
+    days_until_due: int = 30,
+):
     """
     Create an invoice.
 
@@ -218,28 +627,43 @@ def create_invoice(context: Context, customer: str, days_until_due: int = 30):
     Returns:
         stripe.Invoice: The created invoice.
     """
-    invoice_data: dict = {
-        "customer": customer,
-        "collection_method": "send_invoice",
-        "days_until_due": days_until_due,
-    }
-    if context.get("account") is not None:
-        account = context.get("account")
-        if account is not None:
-            invoice_data["stripe_account"] = account
+    invoice = client.invoices.create(
+        _create_invoice_params(customer, days_until_due),
+        _request_options(context),
+    )
+
+    return _invoice_summary(invoice)
+
+
+async def create_invoice_async(
+    client: StripeClient,
+    context: Context,
+    customer: str,
+    days_until_due: int = 30,
+):
+    """Asynchronous counterpart of :func:`create_invoice`."""
+    invoice = await client.invoices.create_async(
+        _create_invoice_params(customer, days_until_due),
+        _request_options(context),
+    )
 
-    invoice = stripe.Invoice.create(**invoice_data)
+    return _invoice_summary(invoice)
 
+
+def _create_invoice_item_params(customer: str, price: str, invoice: str):
     return {
-        "id": invoice.id,
-        "hosted_invoice_url": invoice.hosted_invoice_url,
-        "customer": invoice.customer,
-        "status": invoice.status,
+        "customer": customer,
+        "price": price,
+        "invoice": invoice,
     }
 
 
 def create_invoice_item(
-    context: Context, customer: str, price: str, invoice: str
+    client: StripeClient,
+    context: Context,
+    customer: str,
+    price: str,
+    invoice: str,
 ):
     """
     Create an invoice item.
@@ -252,22 +676,31 @@ def create_invoice_item(
     Returns:
         stripe.InvoiceItem: The created invoice item.
     """
-    invoice_item_data: dict = {
-        "customer": customer,
-        "price": price,
-        "invoice": invoice,
-    }
-    if context.get("account") is not None:
-        account = context.get("account")
-        if account is not None:
-            invoice_item_data["stripe_account"] = account
+    invoice_item = client.invoice_items.create(
+        _create_invoice_item_params(customer, price, invoice),
+        _request_options(context),
+    )
 
-    invoice_item = stripe.InvoiceItem.create(**invoice_item_data)
+    return {"id": invoice_item.id, "invoice": invoice_item.invoice}
+
+
+async def create_invoice_item_async(
+    client: StripeClient,
+    context: Context,
+    customer: str,
+    price: str,
+    invoice: str,
+):
+    """Asynchronous counterpart of :func:`create_invoice_item`."""
+    invoice_item = await client.invoice_items.create_async(
+        _create_invoice_item_params(customer, price, invoice),
+        _request_options(context),
+    )
 
     return {"id": invoice_item.id, "invoice": invoice_item.invoice}
 
 
-def finalize_invoice(context: Context, invoice: str):
+def finalize_invoice(client: StripeClient, context: Context, invoice: str):
     """
     Finalize an invoice.
 
@@ -277,23 +710,26 @@ def finalize_invoice(context: Context, invoice: str):
     Returns:
         stripe.Invoice: The finalized invoice.
     """
-    invoice_data: dict = {"invoice": invoice}
-    if context.get("account") is not None:
-        account = context.get("account")
-        if account is not None:
-            invoice_data["stripe_account"] = account
+    invoice_object = client.invoices.finalize_invoice(
+        invoice, {}, _request_options(context)
+    )
 
-    invoice_object = stripe.Invoice.finalize_invoice(**invoice_data)
+    return _invoice_summary(invoice_object)
 
-    return {
-        "id": invoice_object.id,
-        "hosted_invoice_url": invoice_object.hosted_invoice_url,
-        "customer": invoice_object.customer,
-        "status": invoice_object.status,
-    }
+
+async def finalize_invoice_async(
+    client: StripeClient, context: Context, invoice: str
+):
+    """Asynchronous counterpart of :func:`finalize_invoice`."""
+    invoice_object = await client.invoices.finalize_invoice_async(
+        invoice, {}, _request_options(context)
+    )
+
+    return _invoice_summary(invoice_object)
 
 
 def retrieve_balance(
+    client: StripeClient,
     context: Context,
 ):
     """
@@ -302,88 +738,254 @@ def retrieve_balance(
     Returns:
         stripe.Balance: The balance.
     """
-    balance_data: dict = {}
-    if context.get("account") is not None:
-        account = context.get("account")
-        if account is not None:
-            balance_data["stripe_account"] = account
+    return client.balance.retrieve({}, _request_options(context))
 
-    return stripe.Balance.retrieve(**balance_data)
 
-
-def create_refund(
-    context: Context, payment_intent: str, amount: Optional[int] = None
+async def retrieve_balance_async(
+    client: StripeClient,
+    context: Context,
 ):
-    """
-    Create a refund.
+    """Asynchronous counterpart of :func:`retrieve_balance`."""
+    return await client.balance.retrieve_async({}, _request_options(context))
 
-    Parameters:
-        payment_intent (str): The ID of the payment intent.
-        amount (int, optional): The amount to refund in cents.
+
+def retrieve_balance_raw(
+    client: StripeClient,
+    context: Context,
+):
+    """Like :func:`retrieve_balance`, but returns the undecoded response.
 
     Returns:
-        stripe.Refund: The created refund.
+        stripe.StripeResponse: The balance as sent by Stripe.
     """
+    return client.raw_request(
+        "get",
+        "/v1/balance",
+        **_request_options(context),
+    )
+
+
+async def retrieve_balance_raw_async(
+    client: StripeClient,
+    context: Context,
+):
+    """Asynchronous counterpart of :func:`retrieve_balance_raw`."""
+    return await client.raw_request_async(
+        "get",
+        "/v1/balance",
+        **_request_options(context),
+    )
+
+
+def _create_refund_params(
+    payment_intent: str, amount: Optional[int] = None
+) -> dict:
     refund_data: dict = {
         "payment_intent": payment_intent,
     }
     if amount:
         refund_data["amount"] = amount
-        if context.get("account") is not None:
-            account = context.get("account")
-            if account is not None:
-                refund_data["stripe_account"] = account
+    return refund_data
 
-    return stripe.Refund.create(**refund_data)
 
-def list_payment_intents(context: Context, customer: Optional[str] = None, limit: Optional[int] = None):
+def create_refund(
+    client: StripeClient,
+    context: Context,
+    payment_intent: str,
+    amount: Optional[int] = None,
+):
     """
-    List payment intents.
+    Create a refund.
 
     Parameters:
-        customer (str, optional): The ID of the customer to list payment intents for.
-        limit (int, optional): The number of payment intents to return.
+        payment_intent (str): The ID of the payment intent.
+        amount (int, optional): The amount to refund in cents.
 
     Returns:
-        stripe.ListObject: A list of payment intents.
+        stripe.Refund: The created refund.
     """
+    return client.refunds.create(
+        _create_refund_params(payment_intent, amount),
+        _request_options(context),
+    )
+
+
+async def create_refund_async(
+    client: StripeClient,
+    context: Context,
+    payment_intent: str,
+    amount: Optional[int] = None,
+):
+    """Asynchronous counterpart of :func:`create_refund`."""
+    return await client.refunds.create_async(
+        _create_refund_params(payment_intent, amount),
+        _request_options(context),
+    )
+
+
+def _list_payment_intents_params(
+    customer: Optional[str] = None, limit: Optional[int] = None
+) -> dict:
     payment_intent_data: dict = {}
     if customer:
         payment_intent_data["customer"] = customer
     if limit:
         payment_intent_data["limit"] = limit
-    if context.get("account") is not None:
-        account = context.get("account")
-        if account is not None:
-            payment_intent_data["stripe_account"] = account
+    return payment_intent_data
 
-    return stripe.PaymentIntent.list(**payment_intent_data).data
 
-def create_billing_portal_session(context: Context, customer: str, return_url: Optional[str] = None):
+def list_payment_intents(
+    client: StripeClient,
+    context: Context,
+    customer: Optional[str] = None,
+    limit: Optional[int] = None,
+    page_token: Optional[str] = None,
+    max_items: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+):
     """
-    Creates a session of the customer portal.
+    List payment intents.
 
     Parameters:
-        customer (str): The ID of the customer to list payment intents for.
-        return_url (str, optional): The URL to return to after the session is complete.
+        customer (str, optional): The ID of the customer to list payment intents for.
+        limit (int, optional): The number of payment intents to return.
+        page_token (str, optional): A token from a previous call to resume
+            listing from.
+        max_items (int, optional): Stop after this many payment intents.
+        max_bytes (int, optional): Stop before the serialized payment intents
+            exceed this many bytes.
 
     Returns:
-        stripe.BillingPortalSession: The created billing portal session.
+        stripe.ListObject: A list of payment intents.
+        When any pagination argument is set, a dict with ``data`` and
+        ``next_page_token`` instead.
     """
+    params = _list_payment_intents_params(customer, limit)
+    if is_paginated(page_token, max_items, max_bytes):
+        return paginate(
+            client.payment_intents.list,
+            params,
+            _request_options(context),
+            page_token,
+            max_items,
+            max_bytes,
+        )
+    return client.payment_intents.list(params, _request_options(context)).data
+
+
+async def list_payment_intents_async(
+    client: StripeClient,
+    context: Context,
+    customer: Optional[str] = None,
+    limit: Optional[int] = None,
+    page_token: Optional[str] = None,
+    max_items: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+):
+    """Asynchronous counterpart of :func:`list_payment_intents`."""
+    params = _list_payment_intents_params(customer, limit)
+    if is_paginated(page_token, max_items, max_bytes):
+        return await paginate_async(
+            client.payment_intents.list_async,
+            params,
+            _request_options(context),
+            page_token,
+            max_items,
+            max_bytes,
+        )
+    payment_intents = await client.payment_intents.list_async(
+        params, _request_options(context)
+    )
+    return payment_intents.data
+
+
+def list_payment_intents_raw(
+    client: StripeClient,
+    context: Context,
+    customer: Optional[str] = None,
+    limit: Optional[int] = None,
+):
+    """Like :func:`list_payment_intents`, but returns the undecoded response.
+
+    Returns:
+        stripe.StripeResponse: The list of payment intents as sent by Stripe.
+    """
+    return client.raw_request(
+        "get",
+        "/v1/payment_intents",
+        **_list_payment_intents_params(customer, limit),
+        **_request_options(context),
+    )
+
+
+async def list_payment_intents_raw_async(
+    client: StripeClient,
+    context: Context,
+    customer: Optional[str] = None,
+    limit: Optional[int] = None,
+):
+    """Asynchronous counterpart of :func:`list_payment_intents_raw`."""
+    return await client.raw_request_async(
+        "get",
+        "/v1/payment_intents",
+        **_list_payment_intents_params(customer, limit),
+        **_request_options(context),
+    )
+
+
+def _create_billing_portal_session_params(
+    customer: str, return_url: Optional[str] = None
+) -> dict:
     billing_portal_session_data: dict = {
         "customer": customer,
     }
     if return_url:
         billing_portal_session_data["return_url"] = return_url
-    if context.get("account") is not None:
-        account = context.get("account")
-        if account is not None:
-            billing_portal_session_data["stripe_account"] = account
+    return billing_portal_session_data
 
-    session_object = stripe.billing_portal.Session.create(**billing_portal_session_data)
 
+def _billing_portal_session_summary(session_object) -> dict:
     return {
         "id": session_object.id,
         "customer": session_object.customer,
         "url": session_object.url,
     }
+
+
+def create_billing_portal_session(
+    client: StripeClient,
+    context: Context,
+    customer: str,
+    return_url: Optional[str] = None,
+):
+    """
+    Creates a session of the customer portal.
+
+    Parameters:
+        customer (str): The ID of the customer to list payment intents for.
+        return_url (str, optional): The URL to return to after the session is complete.
+
+    Returns:
+        stripe.BillingPortalSession: The created billing portal session.
+    """
+    session_object = client.billing_portal.sessions.create(
+        _create_billing_portal_session_params(customer, return_url),
+        _request_options(context),
+    )
+
+    return _billing_portal_session_summary(session_object)
+
+
+async def create_billing_portal_session_async(
+    client: StripeClient,
+    context: Context,
+    customer: str,
+    return_url: Optional[str] = None,
+):
+    """Asynchronous counterpart of :func:`create_billing_portal_session`."""
+    session_object = await client.billing_portal.sessions.create_async(
+        _create_billing_portal_session_params(customer, return_url),
+        _request_options(context),
+    )
+
+    return _billing_portal_session_summary(session_object)
@@ -0,0 +1,144 @@
+"""Metering of LangChain runs."""
+
+import threading
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from ..metering import BillingMeter
+
+
+def token_usage(response: LLMResult) -> Tuple[Optional[int], Optional[int]]:
+    """The input and output tokens of an LLM call, when it reports them."""
+    input_tokens = output_tokens = 0
+    found = False
+    for generations in response.generations:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            usage = getattr(message, "usage_metadata", None)
+            if usage:
+                found = True
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+    if found:
+        return input_tokens, output_tokens
+
+    # Older integrations only report usage in the provider's own shape.
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if not usage:
+        return None, None
+    return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+
+
+class BillingCallbackHandler(BaseCallbackHandler):
+    """Records the usage of each top-level LangChain run with a meter.
+
+    Token usage of the LLM calls made inside a run, such as an agent
+    executor or any other chain, is summed and recorded when the run ends.
+    LLM calls made outside of a chain are recorded on their own. Recording
+    only queues meter events, so callbacks never wait on Stripe.
+    """
+
+    raise_error = False
+
+    def __init__(self, meter: BillingMeter):
+        self.meter = meter
+        # Top-level run of each chain, and token usage per top-level run.
+        self._roots: Dict[UUID, UUID] = {}
+        self._usage: Dict[UUID, Tuple[int, int, bool]] = {}
+        self._lock = threading.Lock()
+
+    def on_chain_start(
+        self,
+        serialized: Dict[str, Any],
+        inputs: Dict[str, Any],
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> None:
+        with self._lock:
+            root = self._roots.get(parent_run_id) or run_id
+            self._roots[run_id] = root
+            if root == run_id:
+                self._usage[run_id] = (0, 0, False)
+
+    def on_tool_start(
+        self,
+        serialized: Dict[str, Any],
+        input_str: str,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> None:
+        # Tools are only followed inside runs, as calling one directly is
+        # not an agent run.
+        with self._lock:
+            root = self._roots.get(parent_run_id)
+            if root is not None:
+                self._roots[run_id] = root
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._roots.pop(run_id, None)
+
+    def on_tool_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        with self._lock:
+            self._roots.pop(run_id, None)
+
+    def on_llm_end(
+        self,
+        response: LLMResult,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> None:
+        input_tokens, output_tokens = token_usage(response)
+        with self._lock:
+            root = self._roots.get(parent_run_id)
+            if root is not None and root in self._usage:
+                if input_tokens is not None:
+                    total_input, total_output, _ = self._usage[root]
+                    self._usage[root] = (
+                        total_input + input_tokens,
+                        total_output + output_tokens,
+                        True,
+                    )
+                return
+        self.meter.record(input_tokens, output_tokens)
+
+    def _end(self, run_id: UUID, record: bool) -> None:
+        with self._lock:
+            root = self._roots.pop(run_id, None)
+            if root != run_id:
+                return
+            input_tokens, output_tokens, found = self._usage.pop(run_id)
+            # Drop the chains of the run that did not report their end.
+            for chain in [c for c, r in self._roots.items() if r == run_id]:
+                del self._roots[chain]
+        if record:
+            if found:
+                self.meter.record(input_tokens, output_tokens)
+            else:
+                self.meter.record()
+
+    def on_chain_end(
+        self, outputs: Dict[str, Any], *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._end(run_id, record=True)
+
+    def on_chain_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        # Tokens spent on a failed run are still billed; its outcome is not.
+        with self._lock:
+            usage = self._usage.get(run_id)
+        self._end(run_id, record=False)
+        if usage is not None and usage[2] and self.meter.type == "token":
+            self.meter.record(usage[0], usage[1])
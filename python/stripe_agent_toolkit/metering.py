@@ -0,0 +1,701 @@
+"""Delivery of meter events, in the background and on the v2 stream."""
+
+from __future__ import annotations
+
+import atexit
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import (
+    TYPE_CHECKING,
+    Deque,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from .clients import key_id
+from .retries import RetryPolicy, is_retryable
+
+if TYPE_CHECKING:
+    from stripe import StripeClient
+
+    from .api import StripeAPI
+
+logger = logging.getLogger(__name__)
+
+
+class MeterEvent(NamedTuple):
+    """One usage event, stamped when it was emitted.
+
+    ``account`` is the connected account the event was emitted for, or
+    ``None`` for the platform account, and ``secret_key`` the key of the
+    route it was emitted under, or ``None`` for the key of the sender.
+    """
+
+    event_name: str
+    customer: str
+    value: Optional[str]
+    identifier: str
+    timestamp: int
+    account: Optional[str] = None
+    secret_key: Optional[str] = None
+
+    def __repr__(self) -> str:
+        # Keeps secret keys out of logs and tracebacks.
+        return "MeterEvent(%s)" % ", ".join(
+            "%s=%r"
+            % (name, "..." if name == "secret_key" and value else value)
+            for name, value in zip(self._fields, self)
+        )
+
+    def v2_params(self) -> dict:
+        """The event as an entry of a v2 meter event stream request."""
+        payload = {"stripe_customer_id": self.customer}
+        if self.value is not None:
+            payload["value"] = self.value
+        return {
+            "event_name": self.event_name,
+            "identifier": self.identifier,
+            "payload": payload,
+            "timestamp": datetime.fromtimestamp(self.timestamp, timezone.utc)
+            .isoformat()
+            .replace("+00:00", "Z"),
+        }
+
+
+def is_duplicate(error: Exception) -> bool:
+    """Whether ``error`` rejected an event Stripe already has."""
+    return getattr(error, "code", None) == "duplicate_meter_event"
+
+
+def _expires_at(session) -> float:
+    try:
+        expires_at = session.expires_at.replace("Z", "+00:00")
+        return datetime.fromisoformat(expires_at).timestamp()
+    except (AttributeError, TypeError, ValueError):
+        # Sessions last 15 minutes.
+        return time.time() + 900
+
+
+class MeterEventStream:
+    """Sends meter events on Stripe's v2 high-throughput meter event stream.
+
+    Each request carries up to ``max_events`` events and authenticates with
+    a meter event session token, which is reused per key and account until
+    ``refresh_margin`` seconds before it expires, or until Stripe reports
+    it expired. ``available`` is cleared by :class:`~.api.StripeAPI` when
+    the stream cannot be used, so that events fall back to the v1 API.
+    """
+
+    max_events = 100
+
+    def __init__(self, refresh_margin: float = 60.0):
+        self.refresh_margin = refresh_margin
+        self.available = True
+        self._sessions: Dict[Tuple[str, Optional[str]], Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _cached_token(self, key: Tuple[str, Optional[str]]) -> Optional[str]:
+        with self._lock:
+            session = self._sessions.get(key)
+        if session is None or session[1] - self.refresh_margin <= time.time():
+            return None
+        return session[0]
+
+    def _store(self, key: Tuple[str, Optional[str]], session) -> str:
+        # Concurrent refreshes may each create a session; the last one wins
+        # and the others stay valid until they expire.
+        with self._lock:
+            self._sessions[key] = (
+                session.authentication_token,
+                _expires_at(session),
+            )
+        return session.authentication_token
+
+    def _chunks(self, events: List[dict]):
+        for i in range(0, len(events), self.max_events):
+            yield events[i : i + self.max_events]
+
+    def send(
+        self,
+        client: StripeClient,
+        key: Tuple[str, Optional[str]],
+        events: List[dict],
+        options: dict,
+    ) -> None:
+        """Send ``events``, given the key ID and account of ``client``."""
+        from stripe import TemporarySessionExpiredError
+
+        for chunk in self._chunks(events):
+            for refresh in (False, True):
+                token = None if refresh else self._cached_token(key)
+                if token is None:
+                    token = self._store(
+                        key,
+                        client.v2.billing.meter_event_session.create(
+                            options=options
+                        ),
+                    )
+                try:
+                    client.v2.billing.meter_event_stream.create(
+                        {"events": chunk}, {"api_key": token}
+                    )
+                    break
+                except TemporarySessionExpiredError:
+                    if refresh:
+                        raise
+
+    async def send_async(
+        self,
+        client: StripeClient,
+        key: Tuple[str, Optional[str]],
+        events: List[dict],
+        options: dict,
+    ) -> None:
+        """Asynchronous counterpart of :meth:`send`."""
+        from stripe import TemporarySessionExpiredError
+
+        for chunk in self._chunks(events):
+            for refresh in (False, True):
+                token = None if refresh else self._cached_token(key)
+                if token is None:
+                    sessions = client.v2.billing.meter_event_session
+                    token = self._store(
+                        key, await sessions.create_async(options=options)
+                    )
+                try:
+                    await client.v2.billing.meter_event_stream.create_async(
+                        {"events": chunk}, {"api_key": token}
+                    )
+                    break
+                except TemporarySessionExpiredError:
+                    if refresh:
+                        raise
+
+
+# Emitters, aggregators and spools to close when the process exits, in
+# two rounds so that aggregators forward their windows before the emitters
+# they forward to are drained. Held weakly, with the close timeout of each,
+# so that one its owner dropped can be garbage collected.
+_closing_at_exit: Tuple[weakref.WeakKeyDictionary, ...] = (
+    weakref.WeakKeyDictionary(),
+    weakref.WeakKeyDictionary(),
+)
+
+
+def close_at_exit(obj, timeout: float, first=False) -> None:
+    """Call ``obj.close(timeout)`` when the process exits, if still alive."""
+    _closing_at_exit[0 if first else 1][obj] = timeout
+
+
+@atexit.register
+def _close_all() -> None:
+    for closing in _closing_at_exit:
+        for obj, timeout in list(closing.items()):
+            obj.close(timeout)
+
+
+def for_event(stripe: StripeAPI, event: MeterEvent) -> StripeAPI:
+    """``stripe``, or a view of it with the key and account of ``event``."""
+    api = stripe
+    if event.secret_key is not None and event.secret_key != api.secret_key:
+        api = api.with_secret_key(event.secret_key)
+    if event.account != api.account:
+        api = api.bind({"account": event.account})
+    return api
+
+
+def deliver(
+    stripe: StripeAPI, events: List[MeterEvent], retry: RetryPolicy
+) -> List[Optional[Exception]]:
+    """Send ``events`` with their keys and accounts, retrying the transient
+    failures.
+
+    Returns ``None`` for each event Stripe accepted, or already had, and
+    the last error of each one it did not.
+    """
+    outcomes: List[Optional[Exception]] = [None] * len(events)
+    senders: Dict[Tuple[Optional[str], Optional[str]], List[int]] = {}
+    for index, event in enumerate(events):
+        sender = (event.secret_key, event.account)
+        senders.setdefault(sender, []).append(index)
+
+    for indexes in senders.values():
+        api = for_event(stripe, events[indexes[0]])
+
+        def attempt() -> None:
+            nonlocal indexes
+            batch = [events[index] for index in indexes]
+            try:
+                errors = api.create_meter_events(batch)
+            except Exception as e:
+                errors = [e] * len(batch)
+            for index, error in zip(indexes, errors):
+                outcomes[index] = error
+            indexes = [
+                index
+                for index in indexes
+                if outcomes[index] is not None
+                and is_retryable(outcomes[index])
+            ]
+            if indexes:
+                raise outcomes[indexes[0]]
+
+        try:
+            retry.call(attempt)
+        except Exception:
+            pass  # Kept in the outcomes.
+    return outcomes
+
+
+class MeterEventEmitter:
+    """Sends meter events from a background thread.
+
+    :meth:`emit` only appends to an in-memory queue, so callers such as
+    agent hooks never wait on billing I/O. Events are sent in batches once
+    ``max_batch`` are queued or the oldest has waited ``flush_interval``
+    seconds, in one request per 100 events when ``stripe`` uses the v2
+    meter event stream and concurrently otherwise. They are retried with
+    ``retry``, and each carries an identifier chosen at emit time, so a
+    retried event is counted once. When ``max_queue`` events are waiting,
+    new ones are dropped rather than blocking.
+
+    Each event is sent for the connected account it was emitted for, with
+    the secret key it was emitted with: the ``account`` and ``secret_key``
+    passed to :meth:`emit`, or else those of ``stripe`` under the current
+    route. The background thread stops once nothing was
+    queued for ``idle_timeout`` seconds and starts again on the next
+    event. Queued events are drained when the process exits, for at most
+    ``exit_timeout`` seconds so that an unreachable Stripe cannot hold up
+    the exit; call :meth:`flush` or :meth:`close` to drain them earlier.
+    """
+
+    def __init__(
+        self,
+        stripe: StripeAPI,
+        max_batch: int = 100,
+        flush_interval: float = 1.0,
+        max_queue: int = 10000,
+        max_concurrency: int = 8,
+        retry: Optional[RetryPolicy] = None,
+        idle_timeout: float = 10.0,
+        exit_timeout: float = 5.0,
+    ):
+        self.stripe = stripe
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.max_concurrency = max_concurrency
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.idle_timeout = idle_timeout
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self._queue: Deque[MeterEvent] = deque()
+        # Events queued or being sent.
+        self._pending = 0
+        self._oldest = 0.0
+        self._flushing = 0
+        self._closing = False
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        close_at_exit(self, exit_timeout)
+
+    def emit(
+        self,
+        event_name: str,
+        customer: str,
+        value: Union[str, int, None] = None,
+        identifier: Optional[str] = None,
+        timestamp: Optional[int] = None,
+        account: Optional[str] = None,
+        secret_key: Optional[str] = None,
+    ) -> bool:
+        """Queue an event, returning whether it was accepted."""
+        # Resolved here, as the worker thread does not see the route.
+        event = MeterEvent(
+            event_name,
+            customer,
+            str(value) if value is not None else None,
+            identifier or "stripe-agent-toolkit-%s" % uuid.uuid4(),
+            timestamp if timestamp is not None else int(time.time()),
+            account if account is not None else self.stripe.account,
+            secret_key if secret_key is not None else self.stripe.secret_key,
+        )
+        with self._condition:
+            if self._closing or self._pending >= self.max_queue:
+                self.dropped += 1
+                logger.warning(
+                    "Dropped a %s meter event: the emitter is %s.",
+                    event_name,
+                    "closed" if self._closing else "full",
+                )
+                return False
+            if not self._queue:
+                self._oldest = time.monotonic()
+            self._queue.append(event)
+            self._pending += 1
+            if self._thread is None:
+                self._start()
+            elif len(self._queue) == 1 or len(self._queue) >= self.max_batch:
+                self._condition.notify_all()
+        return True
+
+    def _start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._work, name="stripe-meter-events", daemon=True
+        )
+        self._thread.start()
+
+    def _take(self) -> Optional[List[MeterEvent]]:
+        with self._condition:
+            idle_since = time.monotonic()
+            while True:
+                now = time.monotonic()
+                if self._queue and (
+                    len(self._queue) >= self.max_batch
+                    or self._closing
+                    or self._flushing
+                    or now >= self._oldest + self.flush_interval
+                ):
+                    count = min(len(self._queue), self.max_batch)
+                    batch = [self._queue.popleft() for _ in range(count)]
+                    self._oldest = now
+                    return batch
+                if self._closing or (
+                    not self._queue and now >= idle_since + self.idle_timeout
+                ):
+                    # Cleared under the lock, so that emit starts a new
+                    # thread for anything queued after this one stops.
+                    self._thread = None
+                    return None
+                self._condition.wait(
+                    self._oldest + self.flush_interval - now
+                    if self._queue
+                    else idle_since + self.idle_timeout - now
+                )
+
+    def _work(self) -> None:
+        executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix="stripe-meter-events",
+        )
+        try:
+            while True:
+                batch = self._take()
+                if batch is None:
+                    return
+                try:
+                    self._send(executor, batch)
+                finally:
+                    with self._condition:
+                        self._pending -= len(batch)
+                        self._condition.notify_all()
+        finally:
+            executor.shutdown(wait=False)
+
+    def _send(
+        self, executor: ThreadPoolExecutor, batch: List[MeterEvent]
+    ) -> None:
+        if self.stripe.uses_meter_event_stream:
+            self._count(deliver(self.stripe, batch, self.retry))
+            return
+
+        def send(event: MeterEvent) -> Optional[Exception]:
+            return self._send_one(for_event(self.stripe, event), event)
+
+        try:
+            errors = list(executor.map(send, batch))
+        except RuntimeError:
+            # The interpreter is exiting and no longer runs new futures.
+            errors = [send(event) for event in batch]
+        self._count(errors)
+
+    def _count(self, errors: List[Optional[Exception]]) -> None:
+        failed = [error for error in errors if error is not None]
+        self.sent += len(errors) - len(failed)
+        self.failed += len(failed)
+        if failed:
+            logger.warning(
+                "Failed to send %d meter events: %s", len(failed), failed[0]
+            )
+
+    def _send_one(
+        self, api: StripeAPI, event: MeterEvent
+    ) -> Optional[Exception]:
+        try:
+            self.retry.call(
+                lambda: api.create_meter_event(
+                    event.event_name,
+                    event.customer,
+                    event.value,
+                    identifier=event.identifier,
+                    timestamp=event.timestamp,
+                )
+            )
+        except Exception as e:
+            return None if is_duplicate(e) else e
+        return None
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Send every queued event, returning whether all were sent."""
+        with self._condition:
+            self._flushing += 1
+            self._condition.notify_all()
+            try:
+                return self._condition.wait_for(
+                    lambda: self._pending == 0, timeout
+                )
+            finally:
+                self._flushing -= 1
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Drain the queue and stop the background thread."""
+        with self._condition:
+            self._closing = True
+            thread = self._thread
+            self._condition.notify_all()
+        drained = self.flush(timeout)
+        if thread is not None:
+            thread.join(timeout)
+        return drained
+
+
+_WindowKey = Tuple[str, str, Optional[str], str, float]
+
+
+class UsageAggregator:
+    """Sums usage per customer and meter before handing it to an emitter.
+
+    It takes the same :meth:`emit` calls as :class:`MeterEventEmitter`, and
+    emits one event per customer, meter, connected account and key for each
+    ``window`` seconds of wall-clock time, whose value is the sum of the
+    values emitted in the window, or their count for events without one.
+    Windows are forwarded once they end, and early by :meth:`flush`.
+
+    Forwarded events are stamped with the start of their window and get
+    identifiers derived from ``source``, the meter, the customer, the
+    window and a sequence number, so retrying an event cannot count it
+    twice. Aggregators that may run concurrently, such as one per worker
+    process, need distinct sources; the default is random per instance.
+    The background thread only runs while some window has usage.
+    """
+
+    def __init__(
+        self,
+        emitter: MeterEventEmitter,
+        window: float = 60.0,
+        source: Optional[str] = None,
+    ):
+        self.emitter = emitter
+        self.window = window
+        self.source = source if source is not None else uuid.uuid4().hex
+        # (event name, customer, account, secret key, window start) -> total
+        self._totals: Dict[_WindowKey, Union[int, float]] = {}
+        # Times each window was forwarded, for unique identifiers.
+        self._sequences: Dict[_WindowKey, int] = {}
+        self._closing = False
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        close_at_exit(self, 5.0, first=True)
+
+    def _window_start(self, timestamp: float) -> Union[int, float]:
+        start = timestamp // self.window * self.window
+        return int(start) if start.is_integer() else start
+
+    def identifier(
+        self,
+        event_name: str,
+        customer: str,
+        start: Union[int, float],
+        sequence: int,
+        account: Optional[str] = None,
+        secret_key: Optional[str] = None,
+    ) -> str:
+        """The identifier of a forwarded event.
+
+        ``secret_key`` only needs to be given when it is not the key of the
+        emitter.
+        """
+        key = [self.source, event_name, customer, start, sequence]
+        if account is not None or secret_key is not None:
+            key.append(account)
+        if secret_key is not None:
+            key.append(key_id(secret_key))
+        digest = hashlib.sha256(json.dumps(key).encode()).hexdigest()
+        return "stripe-agent-toolkit-%s" % digest[:32]
+
+    def emit(
+        self,
+        event_name: str,
+        customer: str,
+        value: Union[str, int, float, None] = None,
+        account: Optional[str] = None,
+        secret_key: Optional[str] = None,
+    ) -> bool:
+        """Add usage to the current window of ``customer`` and the meter."""
+        amount: Union[int, float] = 1
+        if isinstance(value, (int, float)):
+            amount = value
+        elif value is not None:
+            try:
+                amount = int(value)
+            except ValueError:
+                amount = float(value)
+        if account is None:
+            account = self.emitter.stripe.account
+        if secret_key is None:
+            secret_key = self.emitter.stripe.secret_key
+        key = (
+            event_name,
+            customer,
+            account,
+            secret_key,
+            self._window_start(time.time()),
+        )
+        with self._condition:
+            if self._closing:
+                return self.emitter.emit(
+                    event_name,
+                    customer,
+                    value,
+                    account=account,
+                    secret_key=secret_key,
+                )
+            self._totals[key] = self._totals.get(key, 0) + amount
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._work,
+                    name="stripe-usage-aggregator",
+                    daemon=True,
+                )
+                self._thread.start()
+        return True
+
+    def _forward(self, ended_before: Optional[float]) -> None:
+        with self._condition:
+            keys = [
+                key
+                for key in self._totals
+                if ended_before is None
+                or key[-1] + self.window <= ended_before
+            ]
+            forwarded = []
+            for key in keys:
+                sequence = self._sequences.get(key, 0)
+                self._sequences[key] = sequence + 1
+                forwarded.append((key, self._totals.pop(key), sequence))
+            # Sequences are only needed while a window may still get usage.
+            current = self._window_start(time.time())
+            for key in [k for k in self._sequences if k[-1] < current]:
+                if key not in self._totals:
+                    del self._sequences[key]
+
+        for key, total, sequence in forwarded:
+            event_name, customer, account, secret_key, start = key
+            routed_key = (
+                secret_key
+                if secret_key != self.emitter.stripe.secret_key
+                else None
+            )
+            self.emitter.emit(
+                event_name,
+                customer,
+                total,
+                identifier=self.identifier(
+                    event_name, customer, start, sequence, account, routed_key
+                ),
+                timestamp=int(start),
+                account=account,
+                secret_key=secret_key,
+            )
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                if self._closing or not self._totals:
+                    self._thread = None
+                    return
+                now = time.time()
+                self._condition.wait(
+                    self._window_start(now) + self.window - now
+                )
+            self._forward(ended_before=time.time())
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Forward every window, including open ones, and send them."""
+        self._forward(ended_before=None)
+        return self.emitter.flush(timeout)
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Forward every window and stop aggregating."""
+        with self._condition:
+            self._closing = True
+            thread = self._thread
+            self._condition.notify_all()
+        if thread is not None:
+            thread.join(timeout)
+        return self.flush(timeout)
+
+
+class BillingMeter:
+    """Turns agent runs into meter events, whatever the agent framework.
+
+    With ``type="outcome"``, each run is one event on ``meter``. With
+    ``type="token"``, each run emits its input and output token counts on
+    the ``"input"`` and ``"output"`` meters of ``meters``. Events go to
+    ``emitter``, which can be a :class:`MeterEventEmitter`, a
+    :class:`UsageAggregator` or a :class:`~.spool.MeterEventSpool`, so
+    recording a run never waits on Stripe. With ``stripe``, events are
+    emitted for the account it acts on, with the key it uses, when the run
+    is recorded.
+    """
+
+    def __init__(
+        self,
+        emitter: Union[MeterEventEmitter, UsageAggregator],
+        type: Optional[str],
+        customer: Optional[str],
+        meter: Optional[str] = None,
+        meters: Optional[Dict[str, str]] = None,
+        stripe: Optional[StripeAPI] = None,
+    ):
+        self.emitter = emitter
+        self.type = type
+        self.customer = customer
+        self.meter = meter
+        self.meters = meters or {}
+        self.stripe = stripe
+
+    def record(
+        self,
+        input_tokens: Optional[int] = None,
+        output_tokens: Optional[int] = None,
+    ) -> None:
+        """Emit the meter events of one run."""
+        options = {}
+        if self.stripe is not None:
+            options["account"] = self.stripe.account
+            options["secret_key"] = self.stripe.secret_key
+
+        if self.type == "outcome":
+            self.emitter.emit(self.meter, self.customer, **options)
+
+        if self.type == "token":
+            for meter, tokens in (
+                (self.meters.get("input"), input_tokens),
+                (self.meters.get("output"), output_tokens),
+            ):
+                if meter and tokens is not None:
+                    self.emitter.emit(meter, self.customer, tokens, **options)
@@ -1,21 +1,18 @@
-from typing import Any
+from typing import Any, Union
 from agents import AgentHooks, RunContextWrapper, Agent, Tool
 from ..api import StripeAPI
+from ..metering import BillingMeter, MeterEventEmitter, UsageAggregator
 
 class BillingHooks(AgentHooks):
-    def __init__(self, stripe: StripeAPI, type: str, customer: str, meter: str = None, meters: dict[str, str] = None):
+    def __init__(self, stripe: StripeAPI, type: str, customer: str, meter: str = None, meters: dict[str, str] = None, emitter: Union[MeterEventEmitter, UsageAggregator] = None):
         self.type = type
         self.stripe = stripe
         self.customer = customer
         self.meter = meter
         self.meters = meters
+        # Meter events are sent in the background so that they never delay
+        # the end of the run.
+        self.emitter = emitter if emitter is not None else MeterEventEmitter(stripe)
 
     async def on_end(self, context: RunContextWrapper, agent: Agent, output: Any) -> None:
-        if self.type == "outcome":
-            self.stripe.create_meter_event(self.meter, self.customer)
-
-        if self.type == "token":
-            if self.meters["input"]:
-                self.stripe.create_meter_event(self.meters["input"], self.customer, context.usage.input_tokens)
-            if self.meters["output"]:
-                self.stripe.create_meter_event(self.meters["output"], self.customer, context.usage.output_tokens)
+        BillingMeter(self.emitter, self.type, self.customer, self.meter, self.meters, self.stripe).record(context.usage.input_tokens, context.usage.output_tokens)
@@ -5,39 +5,52 @@ This tool allows agents to interact with the Stripe API.
 from __future__ import annotations
 
 from collections.abc import Awaitable
-from typing import Any
+from functools import lru_cache
+from typing import Any, Dict, Type
 import json
 
 from agents import FunctionTool
 from agents.run_context import RunContextWrapper
+from pydantic import BaseModel
 
-def StripeTool(api, tool) -> FunctionTool:
-    async def on_invoke_tool(ctx: RunContextWrapper[Any], input_str: str) -> str:
-        return api.run(tool["method"], **json.loads(input_str))
 
-    parameters = tool["args_schema"].model_json_schema()
-    parameters["additionalProperties"] = False
-    parameters["type"] = "object"
+@lru_cache(maxsize=None)
+def params_json_schema(args_schema: Type[BaseModel]) -> Dict[str, Any]:
+    """The function parameters JSON schema for ``args_schema``.
+
+    Computed once per process and shared by the tools of every toolkit, so
+    it must not be modified.
+    """
+    schema = args_schema.model_json_schema()
+    schema["additionalProperties"] = False
+    schema["type"] = "object"
 
     # Remove the description field from parameters as it's not needed in the OpenAI function schema
-    if "description" in parameters:
-        del parameters["description"]
+    if "description" in schema:
+        del schema["description"]
 
-    if "title" in parameters:
-        del parameters["title"]
+    if "title" in schema:
+        del schema["title"]
 
     # Remove title and default fields from properties
-    if "properties" in parameters:
-        for prop in parameters["properties"].values():
+    if "properties" in schema:
+        for prop in schema["properties"].values():
             if "title" in prop:
                 del prop["title"]
             if "default" in prop:
                 del prop["default"]
 
+    return schema
+
+
+def StripeTool(api, tool) -> FunctionTool:
+    async def on_invoke_tool(ctx: RunContextWrapper[Any], input_str: str) -> str:
+        return await api.arun(tool["method"], **json.loads(input_str))
+
     return FunctionTool(
         name=tool["method"],
         description=tool["description"],
-        params_json_schema=parameters,
+        params_json_schema=params_json_schema(tool["args_schema"]),
         on_invoke_tool=on_invoke_tool,
         strict_json_schema=False
     )
@@ -1,6 +1,7 @@
 """Stripe Agent Toolkit."""
 
-from typing import List, Optional
+import copy
+from typing import List, Optional, Union
 from pydantic import PrivateAttr
 import json
 
@@ -8,9 +9,9 @@ from agents import FunctionTool
 
 
 from ..api import StripeAPI
-from ..tools import tools
-from ..configuration import Configuration, is_tool_allowed
+from ..configuration import Configuration, Context
 from .tool import StripeTool
+from ..metering import MeterEventEmitter, UsageAggregator
 from .hooks import BillingHooks
 
 class StripeAgentToolkit:
@@ -24,20 +25,52 @@ class StripeAgentToolkit:
 
         context = configuration.get("context") if configuration else None
 
-        self._stripe_api = StripeAPI(secret_key=secret_key, context=context)
+        self._stripe_api = StripeAPI(
+            secret_key=secret_key,
+            context=context,
+            configuration=configuration,
+        )
 
-        filtered_tools = [
-            tool for tool in tools if is_tool_allowed(tool, configuration)
-        ]
+        # Imported here so that importing the toolkit does not build every
+        # tool schema.
+        from ..tools import configured_tools
+
+        self._filtered_tools = configured_tools(configuration)
 
         self._tools = [
             StripeTool(self._stripe_api, tool)
-            for tool in filtered_tools
+            for tool in self._filtered_tools
         ]
 
+        # Shared by every billing hook of the toolkit and of its views.
+        self._meter_event_emitter = MeterEventEmitter(self._stripe_api)
+
     def get_tools(self) -> List[FunctionTool]:
         """Get the tools in the toolkit."""
         return self._tools
 
-    def billing_hook(self, type: Optional[str] = None, customer: Optional[str] = None, meter: Optional[str] = None, meters: Optional[dict[str, str]] = None) -> BillingHooks:
-        return BillingHooks(self._stripe_api, type, customer, meter, meters)
+    def bind(self, context: Context) -> "StripeAgentToolkit":
+        """A lightweight view of the toolkit with ``context`` applied.
+
+        The view shares the tool catalog, schemas and client with this
+        toolkit, so it is cheap enough to create per request.
+        """
+        toolkit = copy.copy(self)
+        toolkit._stripe_api = self._stripe_api.bind(context)
+        toolkit._tools = [
+            StripeTool(toolkit._stripe_api, tool)
+            for tool in self._filtered_tools
+        ]
+        return toolkit
+
+    def with_account(self, account: str) -> "StripeAgentToolkit":
+        """A view of the toolkit acting on the connected ``account``."""
+        return self.bind({"account": account})
+
+    def billing_hook(self, type: Optional[str] = None, customer: Optional[str] = None, meter: Optional[str] = None, meters: Optional[dict[str, str]] = None, emitter: Optional[Union[MeterEventEmitter, UsageAggregator]] = None) -> BillingHooks:
+        return BillingHooks(self._stripe_api, type, customer, meter, meters, emitter or self._meter_event_emitter)
+
+    @property
+    def meter_event_emitter(self) -> MeterEventEmitter:
+        """The emitter sending the meter events of the billing hooks."""
+        return self._meter_event_emitter
@@ -0,0 +1,242 @@
+"""Cursor-based pagination for the list tools."""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from contextlib import aclosing, contextmanager
+from contextvars import ContextVar
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from .projection import project
+
+# Item budget used when a paginated call sets neither an item nor a byte
+# budget, so a single call can never walk an entire account.
+DEFAULT_MAX_ITEMS = 100
+
+# Largest page size the Stripe list endpoints accept.
+MAX_PAGE_SIZE = 100
+
+# Set around a call by StripeAPI to the fields its results are projected to,
+# so that byte budgets are measured on what the caller gets back.
+_projection: ContextVar[Optional[Sequence[str]]] = ContextVar(
+    "stripe_agent_toolkit_projection", default=None
+)
+
+
+@contextmanager
+def projected(fields: Optional[Sequence[str]]) -> Iterator[None]:
+    """Measure the byte budgets of the block on ``fields`` only."""
+    token = _projection.set(fields)
+    try:
+        yield
+    finally:
+        _projection.reset(token)
+
+
+def is_paginated(
+    page_token: Optional[str],
+    max_items: Optional[int],
+    max_bytes: Optional[int],
+) -> bool:
+    """Whether a list call should use pagination mode."""
+    return (
+        page_token is not None
+        or max_items is not None
+        or max_bytes is not None
+    )
+
+
+def encode_page_token(starting_after: str) -> str:
+    """Encode a ``starting_after`` cursor as an opaque page token."""
+    payload = json.dumps({"starting_after": starting_after}).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def decode_page_token(page_token: str) -> str:
+    """Decode a page token back into its ``starting_after`` cursor."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(page_token.encode()))
+        return payload["starting_after"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValueError("Invalid page token " + page_token)
+
+
+def _page_params(
+    params: dict,
+    page_token: Optional[str],
+    max_items: Optional[int],
+) -> dict:
+    page_params = dict(params)
+    page_params["limit"] = min(
+        page_params.get("limit") or MAX_PAGE_SIZE,
+        max_items or MAX_PAGE_SIZE,
+        MAX_PAGE_SIZE,
+    )
+    if page_token is not None:
+        page_params["starting_after"] = decode_page_token(page_token)
+    return page_params
+
+
+def _next_page_params(
+    params: dict, last_id: str, remaining: Optional[int]
+) -> dict:
+    params = dict(params, starting_after=last_id)
+    if remaining is not None and "limit" in params:
+        params["limit"] = max(1, min(params["limit"], remaining))
+    return params
+
+
+def iter_list(
+    list_page: Callable[[dict, dict], Any],
+    params: dict,
+    options: dict,
+    max_items: Optional[int] = None,
+) -> Iterator[Tuple[Any, bool]]:
+    """Lazily yield ``(object, has_more)`` across every page of a list.
+
+    ``has_more`` tells whether anything follows the object, so callers can
+    stop without fetching another page just to find out. Only one page is
+    held in memory at a time. With ``max_items``, later pages only ask for
+    the objects that remain.
+    """
+    count = 0
+    while True:
+        page = list_page(params, options)
+        data = page.data
+        for index, obj in enumerate(data):
+            yield obj, index < len(data) - 1 or page.has_more
+        if not page.has_more or not data:
+            return
+        count += len(data)
+        remaining = max_items - count if max_items is not None else None
+        params = _next_page_params(params, data[-1].id, remaining)
+
+
+async def iter_list_async(
+    list_page: Callable[[dict, dict], Awaitable[Any]],
+    params: dict,
+    options: dict,
+    max_items: Optional[int] = None,
+) -> AsyncIterator[Tuple[Any, bool]]:
+    """Asynchronous counterpart of :func:`iter_list`."""
+    count = 0
+    while True:
+        page = await list_page(params, options)
+        data = page.data
+        for index, obj in enumerate(data):
+            yield obj, index < len(data) - 1 or page.has_more
+        if not page.has_more or not data:
+            return
+        count += len(data)
+        remaining = max_items - count if max_items is not None else None
+        params = _next_page_params(params, data[-1].id, remaining)
+
+
+class _Budget:
+    """Accumulates list items until the item or byte budget is spent."""
+
+    def __init__(
+        self,
+        max_items: Optional[int],
+        max_bytes: Optional[int],
+        transform: Callable[[Any], Any],
+        limit: Optional[int],
+    ):
+        # ``limit`` is the most objects the caller asked for, so it caps
+        # the configured budget rather than being replaced by it.
+        if max_items is None and max_bytes is None:
+            max_items = limit or DEFAULT_MAX_ITEMS
+        elif limit is not None:
+            max_items = limit if max_items is None else min(limit, max_items)
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.transform = transform
+        self.fields = _projection.get()
+        self.data: list = []
+        self.size = 0
+        self.last_id: Optional[str] = None
+        self.next_page_token: Optional[str] = None
+
+    def add(self, obj: Any, has_more: bool) -> bool:
+        """Add ``obj`` if it fits and return whether to keep going."""
+        item = self.transform(obj)
+        if self.max_bytes is not None:
+            item_size = len(json.dumps(project(item, self.fields)))
+            if self.data and self.size + item_size > self.max_bytes:
+                self.next_page_token = encode_page_token(self.last_id)
+                return False
+            self.size += item_size
+
+        self.data.append(item)
+        self.last_id = obj.id
+        if not has_more:
+            return False
+        if self.max_items is not None and len(self.data) >= self.max_items:
+            self.next_page_token = encode_page_token(obj.id)
+            return False
+        return True
+
+    def result(self) -> Dict[str, Any]:
+        return {"data": self.data, "next_page_token": self.next_page_token}
+
+
+def _identity(obj: Any) -> Any:
+    return obj
+
+
+def paginate(
+    list_page: Callable[[dict, dict], Any],
+    params: dict,
+    options: dict,
+    page_token: Optional[str] = None,
+    max_items: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+    transform: Callable[[Any], Any] = _identity,
+) -> Dict[str, Any]:
+    """Collect one budgeted window of a list, resuming from ``page_token``.
+
+    Returns the collected ``data`` and a ``next_page_token`` that resumes
+    right after the last returned object, or ``None`` once the list is
+    exhausted.
+    """
+    budget = _Budget(max_items, max_bytes, transform, params.get("limit"))
+    page_params = _page_params(params, page_token, budget.max_items)
+    for obj, has_more in iter_list(
+        list_page, page_params, options, budget.max_items
+    ):
+        if not budget.add(obj, has_more):
+            break
+    return budget.result()
+
+
+async def paginate_async(
+    list_page: Callable[[dict, dict], Awaitable[Any]],
+    params: dict,
+    options: dict,
+    page_token: Optional[str] = None,
+    max_items: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+    transform: Callable[[Any], Any] = _identity,
+) -> Dict[str, Any]:
+    """Asynchronous counterpart of :func:`paginate`."""
+    budget = _Budget(max_items, max_bytes, transform, params.get("limit"))
+    page_params = _page_params(params, page_token, budget.max_items)
+    async with aclosing(
+        iter_list_async(list_page, page_params, options, budget.max_items)
+    ) as objects:
+        async for obj, has_more in objects:
+            if not budget.add(obj, has_more):
+                break
+    return budget.result()
@@ -0,0 +1,66 @@
+"""Field projections that trim tool results down to what agents need."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Sequence
+
+# Fields kept in the results of each tool, unless overridden through
+# ``Configuration["projections"]``. Tools not listed return whole objects.
+DEFAULT_PROJECTIONS: Dict[str, Sequence[str]] = {
+    "create_product": ("id", "name", "description"),
+    "list_products": ("id", "name", "description", "active", "default_price"),
+    "create_price": ("id", "product", "currency", "unit_amount"),
+    "list_prices": (
+        "id",
+        "product",
+        "currency",
+        "unit_amount",
+        "recurring",
+        "active",
+    ),
+    "list_invoices": (
+        "id",
+        "customer",
+        "status",
+        "currency",
+        "total",
+        "amount_due",
+        "due_date",
+        "hosted_invoice_url",
+    ),
+    "list_payment_intents": (
+        "id",
+        "customer",
+        "status",
+        "currency",
+        "amount",
+        "description",
+        "created",
+    ),
+    "retrieve_balance": ("available", "pending"),
+    "create_refund": ("id", "payment_intent", "status", "currency", "amount"),
+}
+
+
+def _project_object(obj: Any, fields: Sequence[str]) -> Any:
+    if not isinstance(obj, dict):
+        return obj
+    return {field: obj[field] for field in fields if field in obj}
+
+
+def project(result: Any, fields: Optional[Sequence[str]]) -> Any:
+    """Keep only ``fields`` of the object or objects in ``result``.
+
+    ``result`` may be a single object, a list of objects or a paginated
+    ``{"data", "next_page_token"}`` window. ``None`` keeps everything.
+    """
+    if fields is None:
+        return result
+    if isinstance(result, list):
+        return [_project_object(obj, fields) for obj in result]
+    if isinstance(result, dict) and "next_page_token" in result:
+        return {
+            **result,
+            "data": [_project_object(obj, fields) for obj in result["data"]],
+        }
+    return _project_object(result, fields)
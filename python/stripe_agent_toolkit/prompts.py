@@ -9,7 +9,9 @@ It takes two arguments:
 LIST_CUSTOMERS_PROMPT = """
 This tool will fetch a list of Customers from Stripe.
 
-It takes no input.
+It takes two optional arguments:
+- email (str, optional): A case-sensitive filter on the customer's email.
+- limit (int, optional): The number of customers to return.
 """
 
 CREATE_PRODUCT_PROMPT = """
@@ -112,3 +114,8 @@ It takes two arguments:
 - customer (str): The ID of the customer to create the invoice item for.
 - return_url (str, optional): The default URL to return to afterwards.
 """
+
+PAGINATION_PROMPT = """
+When the result has a next_page_token, pass it back as page_token to
+continue listing where that call stopped.
+"""
@@ -0,0 +1,227 @@
+"""Client-side adaptive rate limiting per connected account."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Deque, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from stripe import StripeError
+
+
+def retry_after(error: StripeError) -> Optional[float]:
+    """Seconds to back off according to the error's Retry-After header."""
+    for name, value in (error.headers or {}).items():
+        if name.lower() == "retry-after":
+            try:
+                return max(float(value), 0.0)
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+class AdaptiveBucket:
+    """Token bucket with an adaptive request rate and concurrency limit.
+
+    Each request takes a token and a concurrency slot. A throttled response
+    halves both the rate and the concurrency limit and, when Retry-After is
+    given, blocks the bucket until then. Every successful response grows
+    them back additively toward their configured maximums.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: Optional[float] = None,
+        max_concurrency: int = 16,
+        min_rate: float = 1.0,
+    ):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.capacity = burst if burst is not None else rate
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(max_concurrency)
+        self.in_flight = 0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        # Async waiters for a concurrency slot, woken by release() from
+        # whichever thread it runs on.
+        self._waiters: Deque[
+            Tuple[asyncio.AbstractEventLoop, asyncio.Future]
+        ] = deque()
+
+    def _reserve(self) -> Optional[float]:
+        """Take a token and a slot, or return how long to wait for them.
+
+        ``None`` means waiting until a slot is released.
+        """
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        if self.in_flight >= int(self.concurrency):
+            return None
+        if self._tokens < 1:
+            return (1 - self._tokens) / self.rate
+
+        self._tokens -= 1
+        self.in_flight += 1
+        return 0.0
+
+    def acquire(self) -> None:
+        """Block until a request may be sent."""
+        with self._lock:
+            while True:
+                wait = self._reserve()
+                if wait is not None and wait <= 0:
+                    return
+                self._released.wait(wait)
+
+    async def acquire_async(self) -> None:
+        """Wait without blocking the event loop until a request may be sent."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                wait = self._reserve()
+                if wait is None:
+                    released = loop.create_future()
+                    self._waiters.append((loop, released))
+            if wait is None:
+                try:
+                    await released
+                except asyncio.CancelledError:
+                    with self._lock:
+                        try:
+                            self._waiters.remove((loop, released))
+                        except ValueError:
+                            # Already woken: pass the slot on.
+                            self._wake()
+                    raise
+            elif wait > 0:
+                await asyncio.sleep(wait)
+            else:
+                return
+
+    def _wake(self) -> None:
+        """Wake as many async waiters as there are free slots."""
+        free = int(self.concurrency) - self.in_flight
+        while free > 0 and self._waiters:
+            loop, released = self._waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(_set_released, released)
+            except RuntimeError:
+                # The waiter's loop is closed.
+                continue
+            free -= 1
+
+    def release(
+        self, throttled: bool = False, retry_after: Optional[float] = None
+    ) -> None:
+        """Return the slot and adapt to how the request went."""
+        with self._lock:
+            self.in_flight -= 1
+            if throttled:
+                self.rate = max(self.min_rate, self.rate / 2)
+                self.concurrency = max(1.0, self.concurrency / 2)
+                self._tokens = min(self._tokens, 0.0)
+                if retry_after is not None:
+                    self._blocked_until = max(
+                        self._blocked_until, time.monotonic() + retry_after
+                    )
+            else:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+                self.concurrency = min(
+                    float(self.max_concurrency),
+                    self.concurrency + 1 / self.concurrency,
+                )
+            self._released.notify_all()
+            self._wake()
+
+
+def _set_released(released: asyncio.Future) -> None:
+    if not released.done():
+        released.set_result(None)
+
+
+class _Slot:
+    """Holds a bucket slot for the duration of one request."""
+
+    def __init__(self, bucket: AdaptiveBucket):
+        self._bucket = bucket
+
+    def _release(self, error: Optional[BaseException]) -> None:
+        # Imported lazily to keep the Stripe SDK out of import time.
+        from stripe import RateLimitError
+
+        if isinstance(error, RateLimitError):
+            self._bucket.release(
+                throttled=True, retry_after=retry_after(error)
+            )
+        else:
+            self._bucket.release()
+
+    def __enter__(self) -> "_Slot":
+        self._bucket.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._release(exc)
+
+    async def __aenter__(self) -> "_Slot":
+        await self._bucket.acquire_async()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self._release(exc)
+
+
+class RateLimiter:
+    """Adaptive limiter with separate read and write buckets per account.
+
+    Share one instance between toolkits so that every request made for the
+    same key and connected account draws from the same buckets.
+    """
+
+    def __init__(
+        self,
+        read_rate: float = 25,
+        write_rate: float = 25,
+        max_concurrency: int = 16,
+    ):
+        self._rates = {"read": read_rate, "write": write_rate}
+        self._max_concurrency = max_concurrency
+        self._buckets: Dict[
+            Tuple[str, Optional[str], str], AdaptiveBucket
+        ] = {}
+        self._lock = threading.Lock()
+
+    def bucket(
+        self, key_id: str, account: Optional[str], kind: str
+    ) -> AdaptiveBucket:
+        """The ``"read"`` or ``"write"`` bucket for a key and account."""
+        bucket_key = (key_id, account, kind)
+        bucket = self._buckets.get(bucket_key)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.get(bucket_key)
+                if bucket is None:
+                    bucket = self._buckets[bucket_key] = AdaptiveBucket(
+                        self._rates[kind],
+                        max_concurrency=self._max_concurrency,
+                    )
+        return bucket
+
+    def slot(self, key_id: str, account: Optional[str], kind: str) -> _Slot:
+        """Context manager, sync or async, holding one request slot."""
+        return _Slot(self.bucket(key_id, account, kind))
@@ -0,0 +1,123 @@
+"""Retries with jittered exponential backoff for transient Stripe errors."""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Iterator, Optional
+
+from .ratelimit import retry_after
+
+
+def new_idempotency_key(method: str) -> str:
+    """A fresh idempotency key for one logical call of ``method``."""
+    return "stripe-agent-toolkit-%s-%s" % (method, uuid.uuid4())
+
+
+# Set around each attempt of a write, so that the key is a per-request
+# option of the calls it makes rather than part of the toolkit context.
+_idempotency_key: ContextVar[Optional[str]] = ContextVar(
+    "stripe_agent_toolkit_idempotency_key", default=None
+)
+
+
+def current_idempotency_key() -> Optional[str]:
+    """The idempotency key of the requests of the running call, if any."""
+    return _idempotency_key.get()
+
+
+@contextmanager
+def idempotency_key(key: Optional[str]) -> Iterator[None]:
+    """Send the requests made inside the block with ``key``."""
+    token = _idempotency_key.set(key)
+    try:
+        yield
+    finally:
+        _idempotency_key.reset(token)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether retrying ``error`` can succeed and is safe to do."""
+    # Imported lazily to keep the Stripe SDK out of import time.
+    from stripe import APIConnectionError, RateLimitError, StripeError
+
+    if not isinstance(error, StripeError):
+        return False
+    for name, value in (error.headers or {}).items():
+        if name.lower() == "stripe-should-retry":
+            return value == "true"
+
+    if isinstance(error, APIConnectionError):
+        return error.should_retry
+    if isinstance(error, RateLimitError):
+        return True
+    status = error.http_status
+    return status is not None and (status == 409 or status >= 500)
+
+
+class RetryPolicy:
+    """Retries transient errors until attempts or the deadline run out.
+
+    Delays grow exponentially from ``base_delay`` up to ``max_delay`` with
+    full jitter, and never undercut a Retry-After hint. A retry is skipped
+    when its delay would end past ``deadline`` seconds after the first
+    attempt started.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        deadline: float = 30.0,
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def _delay(
+        self, attempt: int, error: Exception, deadline: float
+    ) -> Optional[float]:
+        """Seconds to wait before the next attempt, or ``None`` to give up."""
+        if attempt + 1 >= self.max_attempts or not is_retryable(error):
+            return None
+        delay = random.uniform(
+            0, min(self.max_delay, self.base_delay * 2**attempt)
+        )
+        delay = max(delay, retry_after(error) or 0.0)
+        if time.monotonic() + delay > deadline:
+            return None
+        return delay
+
+    def call(self, fn: Callable[[], Any]) -> Any:
+        """Call ``fn``, retrying it on transient errors."""
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            try:
+                return fn()
+            except Exception as e:
+                delay = self._delay(attempt, e, deadline)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+    async def call_async(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Asynchronous counterpart of :meth:`call`."""
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            try:
+                return await fn()
+            except Exception as e:
+                delay = self._delay(attempt, e, deadline)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
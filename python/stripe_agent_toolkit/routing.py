@@ -0,0 +1,49 @@
+"""Per-invocation routing of Stripe calls through ``contextvars``."""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, NamedTuple, Optional
+
+from .configuration import Context
+
+
+class Route(NamedTuple):
+    """Overrides applied to every StripeAPI call made under a route."""
+
+    context: Context
+    secret_key: Optional[str] = None
+
+
+_current_route: ContextVar[Optional[Route]] = ContextVar(
+    "stripe_agent_toolkit_route", default=None
+)
+
+
+def current_route() -> Optional[Route]:
+    """The route of the running thread or task, if any."""
+    return _current_route.get()
+
+
+@contextmanager
+def route(
+    context: Optional[Context] = None, secret_key: Optional[str] = None
+) -> Iterator[Route]:
+    """Route the StripeAPI calls made inside the block.
+
+    ``context`` is merged into the context of whichever StripeAPI runs the
+    call, and ``secret_key``, when given, replaces its key. Routes nest, and
+    asyncio tasks started inside the block inherit the route, so one shared
+    toolkit can serve interleaved tasks for different accounts.
+    """
+    outer = _current_route.get()
+    if outer is not None:
+        context = Context(**{**outer.context, **(context or {})})
+        secret_key = secret_key or outer.secret_key
+    current = Route(context or Context(), secret_key)
+    token = _current_route.set(current)
+    try:
+        yield current
+    finally:
+        _current_route.reset(token)
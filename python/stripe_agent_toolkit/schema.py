@@ -35,6 +35,14 @@ class ListCustomers(BaseModel):
         ),
     )
 
+    page_token: Optional[str] = Field(
+        None,
+        description=(
+            "The next_page_token returned by a previous call, to continue"
+            " listing where that call stopped."
+        ),
+    )
+
 
 class CreateProduct(BaseModel):
     """Schema for the ``create_product`` operation."""
@@ -59,6 +67,13 @@ class ListProducts(BaseModel):
             " Limit can range between 1 and 100, and the default is 10."
         ),
     )
+    page_token: Optional[str] = Field(
+        None,
+        description=(
+            "The next_page_token returned by a previous call, to continue"
+            " listing where that call stopped."
+        ),
+    )
 
 
 class CreatePrice(BaseModel):
@@ -91,6 +106,13 @@ class ListPrices(BaseModel):
             " Limit can range between 1 and 100, and the default is 10."
         ),
     )
+    page_token: Optional[str] = Field(
+        None,
+        description=(
+            "The next_page_token returned by a previous call, to continue"
+            " listing where that call stopped."
+        ),
+    )
 
 
 class CreatePaymentLink(BaseModel):
@@ -120,6 +142,13 @@ class ListInvoices(BaseModel):
             " Limit can range between 1 and 100, and the default is 10."
         ),
     )
+    page_token: Optional[str] = Field(
+        None,
+        description=(
+            "The next_page_token returned by a previous call, to continue"
+            " listing where that call stopped."
+        ),
+    )
 
 
 class CreateInvoice(BaseModel):
@@ -193,6 +222,14 @@ class ListPaymentIntents(BaseModel):
             " Limit can range between 1 and 100."
         ),
     )
+    page_token: Optional[str] = Field(
+        None,
+        description=(
+            "The next_page_token returned by a previous call, to continue"
+            " listing where that call stopped."
+        ),
+    )
+
 
 class CreateBillingPortalSession(BaseModel):
     """Schema for the ``create_billing_portal_session`` operation."""
@@ -0,0 +1,134 @@
+"""Serialization of tool results, from raw responses and in list formats."""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .projection import project
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_encoder = json.JSONEncoder(separators=(",", ":"), check_circular=False)
+
+
+def dumps(value: Any) -> str:
+    """Encode plain JSON data, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(value).decode()
+    return _encoder.encode(value)
+
+
+# Table text for an empty list whose fields are not known.
+EMPTY_TABLE = "(no results)\n"
+
+
+def _columns(
+    rows: List[Any], fields: Optional[Sequence[str]] = None
+) -> List[str]:
+    if not rows:
+        # An empty list has no keys to show, so head it with the fields it
+        # would have been projected to.
+        return list(fields or ())
+    columns: Dict[str, None] = {}
+    for row in rows:
+        columns.update(dict.fromkeys(row))
+    return list(columns)
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (dict, list)):
+        return dumps(value)
+    return str(value)
+
+
+def to_table(rows: List[Any], fields: Optional[Sequence[str]] = None) -> str:
+    """Encode objects as CSV: one header row, then one row per object.
+
+    An empty list is just the header row of ``fields``, or
+    :data:`EMPTY_TABLE` without them.
+    """
+    columns = _columns(rows, fields)
+    if not columns:
+        return EMPTY_TABLE
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_cell(row.get(column)) for column in columns])
+    return out.getvalue()
+
+
+def to_columns(
+    rows: List[Any], fields: Optional[Sequence[str]] = None
+) -> Dict[str, List[Any]]:
+    """Transpose objects into one list of values per field."""
+    return {
+        column: [row.get(column) for row in rows]
+        for column in _columns(rows, fields)
+    }
+
+
+def serialize(
+    result: Any,
+    list_format: str = "json",
+    encode: Callable[[Any], str] = json.dumps,
+    fields: Optional[Sequence[str]] = None,
+) -> str:
+    """Encode a tool result, laying lists out in ``list_format``.
+
+    ``"json"`` keeps lists as arrays of objects. ``"columns"`` turns them
+    into one array per field, and ``"table"`` into CSV text, followed by a
+    ``next_page_token:`` line when a paginated window has more results.
+    ``fields``, the projection of the result, names the columns of an
+    empty list.
+    """
+    if list_format == "json":
+        return encode(result)
+
+    window = isinstance(result, dict) and "next_page_token" in result
+    rows = result["data"] if window else result
+    if not isinstance(rows, list):
+        return encode(result)
+
+    if list_format == "table":
+        table = to_table(rows, fields)
+        if window and result["next_page_token"] is not None:
+            table += "next_page_token: %s\n" % result["next_page_token"]
+        return table
+    if list_format == "columns":
+        columns = to_columns(rows, fields)
+        if window:
+            return encode({**result, "data": columns})
+        return encode(columns)
+    raise ValueError("Invalid list format " + list_format)
+
+
+def serialize_raw(
+    response: Any,
+    fields: Optional[Sequence[str]],
+    list_format: str = "json",
+) -> str:
+    """Turn a raw ``stripe.StripeResponse`` into a tool result.
+
+    A single object without ``fields`` is passed through as the response
+    body. Otherwise the decoded object, or the objects of a list, are
+    projected and re-encoded without ever being turned into
+    ``StripeObject`` trees, so lists have the same shape as on the decoded
+    path.
+    """
+    data = response.data
+    if data.get("object") == "list":
+        data = data["data"]
+    elif fields is None:
+        return response.body
+    return serialize(project(data, fields), list_format, dumps, fields)
@@ -0,0 +1,79 @@
+"""Coalescing of identical in-flight calls."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Lets identical concurrent calls share one execution and result.
+
+    The first caller for a key runs the call; callers that arrive with the
+    same key while it is in flight wait for it and get the same result or
+    exception. Threads and asyncio tasks are coalesced separately, and
+    tasks only with other tasks on the same event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[Tuple[int, Hashable], asyncio.Future] = {}
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run ``fn`` unless a call for ``key`` is already in flight."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(
+        self, key: Hashable, fn: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Asynchronous counterpart of :meth:`do`."""
+        flight_key = (id(asyncio.get_running_loop()), key)
+        task = self._tasks.get(flight_key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._tasks[flight_key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(flight_key, None))
+        else:
+            self.coalesced += 1
+
+        # Shield the shared task so one cancelled caller does not cancel it
+        # for everyone else waiting on it.
+        return await asyncio.shield(task)
+
+
+default_single_flight = SingleFlight()
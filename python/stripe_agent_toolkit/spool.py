@@ -0,0 +1,266 @@
+"""Durable on-disk spool of meter events."""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple, Union
+
+from .clients import key_id
+from .metering import MeterEvent, close_at_exit, deliver
+from .retries import RetryPolicy, is_retryable
+
+if TYPE_CHECKING:
+    from .api import StripeAPI
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meter_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_name TEXT NOT NULL,
+    customer TEXT NOT NULL,
+    value TEXT,
+    identifier TEXT NOT NULL UNIQUE,
+    timestamp INTEGER NOT NULL,
+    account TEXT,
+    key_id TEXT
+)
+"""
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(
+        path, timeout=30, isolation_level=None, check_same_thread=False
+    )
+    # WAL lets the shipper read while events are appended, and with
+    # synchronous=NORMAL a commit does not wait for fsync, which keeps
+    # writes cheap while surviving process crashes.
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute(_SCHEMA)
+    return connection
+
+
+class MeterEventSpool:
+    """Appends meter events to a SQLite database that a thread ships.
+
+    :meth:`emit` takes the same calls as
+    :class:`~.metering.MeterEventEmitter` and only inserts a row, so it can
+    be used as the emitter of billing hooks or of a
+    :class:`~.metering.UsageAggregator`. A background thread sends the
+    spooled events in batches of up to ``batch_size``, on the v2 meter
+    event stream when ``stripe`` uses it, with ``retry``. Each event is
+    deleted once Stripe accepted it, or rejected it for good, whatever
+    became of the rest of its batch, so a crash or a Stripe outage only
+    delays delivery: the events left in ``path`` are sent when the spool
+    is opened again. Identifiers are fixed when an event is spooled, so a
+    resent event is counted once, and so are the connected account each
+    event is sent for and the key it is sent with, as with
+    :class:`~.metering.MeterEventEmitter`.
+
+    Secret keys are not written to ``path``, only an ID of each. Events
+    left by another process with the key of a route are therefore shipped
+    once an event is spooled under that route again.
+    """
+
+    def __init__(
+        self,
+        stripe: StripeAPI,
+        path: str,
+        batch_size: int = 100,
+        poll_interval: float = 1.0,
+        max_backoff: float = 60.0,
+        retry: Optional[RetryPolicy] = None,
+    ):
+        self.stripe = stripe
+        self.path = path
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_backoff = max_backoff
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.sent = 0
+        self.failed = 0
+        self._connection = _connect(path)
+        self._lock = threading.Lock()
+        # Keys events were spooled with, by ID.
+        self._keys: Dict[str, str] = {
+            key_id(stripe.secret_key): stripe.secret_key
+        }
+        self._condition = threading.Condition()
+        self._empty = False
+        # Bumped whenever the spool may have new events, so that the
+        # shipper only reports it empty if nothing was added meanwhile.
+        self._version = 0
+        self._closing = False
+        self._thread = threading.Thread(
+            target=self._work, name="stripe-meter-event-spool", daemon=True
+        )
+        self._thread.start()
+        # Events that are not shipped in time at exit stay spooled.
+        close_at_exit(self, 5.0)
+
+    def emit(
+        self,
+        event_name: str,
+        customer: str,
+        value: Union[str, int, None] = None,
+        identifier: Optional[str] = None,
+        timestamp: Optional[int] = None,
+        account: Optional[str] = None,
+        secret_key: Optional[str] = None,
+    ) -> bool:
+        """Spool an event, returning whether it was accepted."""
+        if self._closing:
+            logger.warning(
+                "Dropped a %s meter event: the spool is closed.", event_name
+            )
+            return False
+        if secret_key is None:
+            secret_key = self.stripe.secret_key
+        id = key_id(secret_key)
+        with self._lock:
+            self._keys[id] = secret_key
+            self._connection.execute(
+                "INSERT OR IGNORE INTO meter_events (event_name, customer,"
+                " value, identifier, timestamp, account, key_id)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    event_name,
+                    customer,
+                    str(value) if value is not None else None,
+                    identifier or "stripe-agent-toolkit-%s" % uuid.uuid4(),
+                    timestamp if timestamp is not None else int(time.time()),
+                    account if account is not None else self.stripe.account,
+                    id,
+                ),
+            )
+        with self._condition:
+            self._version += 1
+            if self._empty:
+                self._empty = False
+                self._condition.notify_all()
+        return True
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._connection.execute(
+                "SELECT COUNT(*) FROM meter_events"
+            ).fetchone()
+        return count
+
+    # Shipping
+
+    def _batch(self) -> List[Tuple[int, MeterEvent]]:
+        with self._lock:
+            keys = dict(self._keys)
+            rows = self._connection.execute(
+                "SELECT id, event_name, customer, value, identifier,"
+                " timestamp, account, key_id FROM meter_events"
+                " WHERE key_id IN (%s) ORDER BY id LIMIT ?"
+                % ", ".join("?" * len(keys)),
+                (*keys, self.batch_size),
+            ).fetchall()
+        return [
+            (row[0], MeterEvent(*row[1:7], secret_key=keys[row[7]]))
+            for row in rows
+        ]
+
+    def _ship(self, batch: List[Tuple[int, MeterEvent]]) -> Set[int]:
+        """Send ``batch``, returning the IDs of the rows that are done.
+
+        Rows are done once Stripe accepted or already had their event, or
+        rejected it for good; the others are kept to be resent.
+        """
+        outcomes = deliver(
+            self.stripe, [event for _, event in batch], self.retry
+        )
+        done: Set[int] = set()
+        dropped: List[Exception] = []
+        kept: List[Exception] = []
+        for (id, _), error in zip(batch, outcomes):
+            if error is not None and is_retryable(error):
+                kept.append(error)
+                continue
+            if error is None:
+                self.sent += 1
+            else:
+                self.failed += 1
+                dropped.append(error)
+            done.add(id)
+        if dropped:
+            logger.warning(
+                "Dropped %d meter events: %s", len(dropped), dropped[0]
+            )
+        if kept:
+            logger.warning(
+                "%d meter events will be resent: %s", len(kept), kept[0]
+            )
+        return done
+
+    def _checkpoint(self, done: Set[int]) -> None:
+        with self._lock:
+            self._connection.execute("BEGIN")
+            self._connection.executemany(
+                "DELETE FROM meter_events WHERE id = ?",
+                [(id,) for id in done],
+            )
+            self._connection.execute("COMMIT")
+
+    def _work(self) -> None:
+        backoff = self.poll_interval
+        while True:
+            with self._condition:
+                version = self._version
+            batch = self._batch()
+            with self._condition:
+                if not batch and version != self._version:
+                    continue
+                if not batch:
+                    self._empty = True
+                    self._condition.notify_all()
+                    if self._closing:
+                        return
+                    self._condition.wait(self.poll_interval)
+                    continue
+
+            done = self._ship(batch)
+            self._checkpoint(done)
+            if len(done) == len(batch):
+                backoff = self.poll_interval
+                continue
+
+            # Stripe is unavailable: keep the rest and try again later.
+            with self._condition:
+                if self._closing:
+                    return
+                self._condition.wait(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every spooled event was shipped."""
+        with self._condition:
+            self._version += 1
+            self._empty = False
+            self._condition.notify_all()
+            self._condition.wait_for(
+                lambda: self._empty or not self._thread.is_alive(), timeout
+            )
+            return self._empty
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Ship what Stripe accepts within ``timeout`` and stop.
+
+        Events that could not be sent stay in the spool for next time.
+        """
+        drained = self.flush(timeout)
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            self._connection.close()
+        return drained
@@ -0,0 +1,857 @@
+"""In-process fake of the Stripe API endpoints used by the toolkit.
+
+Start a :class:`FakeStripeServer` and point a toolkit at it with the
+``api_base`` configuration option to exercise the whole stack, HTTP
+included, without reaching Stripe::
+
+    with FakeStripeServer(FakeStripe(latency=0.05)) as server:
+        api = StripeAPI(
+            secret_key="sk_test_123",
+            context=None,
+            configuration={"api_base": server.url},
+        )
+        api.run("create_customer", name="Jenny Rosen")
+
+State is kept in memory per connected account, list endpoints paginate
+like Stripe does, and latency, 5xx errors and 429s can be injected.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import re
+import string
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl, urlsplit
+
+Object = Dict[str, Any]
+
+
+class FakeStripeError(Exception):
+    """An error response of the fake API."""
+
+    def __init__(
+        self,
+        status: int,
+        message: str,
+        type: str = "invalid_request_error",
+        code: Optional[str] = None,
+        param: Optional[str] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        super().__init__(message)
+        self.status = status
+        self.body = {
+            "error": {
+                key: value
+                for key, value in (
+                    ("type", type),
+                    ("message", message),
+                    ("code", code),
+                    ("param", param),
+                )
+                if value is not None
+            }
+        }
+        self.headers = headers or {}
+
+
+def decode_form(query: str) -> Dict[str, Any]:
+    """Decode Stripe's form encoding, such as ``a[b][0]=c``, into objects."""
+    decoded: Dict[str, Any] = {}
+    for key, value in parse_qsl(query, keep_blank_values=True):
+        path = re.findall(r"[^\[\]]+", key)
+        target = decoded
+        for part in path[:-1]:
+            target = target.setdefault(part, {})
+        target[path[-1]] = value
+    return _lists(decoded)
+
+
+def _lists(value: Any) -> Any:
+    if not isinstance(value, dict):
+        return value
+    if value and all(key.isdigit() for key in value):
+        return [_lists(value[key]) for key in sorted(value, key=int)]
+    return {key: _lists(item) for key, item in value.items()}
+
+
+def _required(params: Dict[str, Any], name: str) -> Any:
+    value = params.get(name)
+    if value in (None, ""):
+        raise FakeStripeError(
+            400,
+            "Missing required param: %s." % name,
+            code="parameter_missing",
+            param=name,
+        )
+    return value
+
+
+def _integer(params: Dict[str, Any], name: str, default: Any = None) -> Any:
+    value = params.get(name)
+    if value in (None, ""):
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise FakeStripeError(
+            400,
+            "Invalid integer: %s" % value,
+            code="parameter_invalid_integer",
+            param=name,
+        ) from None
+
+
+class _Account:
+    """The objects of one account, newest last within each resource."""
+
+    def __init__(self, id: Optional[str] = None):
+        self.id = id
+        self.objects: Dict[str, Dict[str, Object]] = {}
+        self.balance: Dict[str, int] = {}
+
+    def resource(self, name: str) -> Dict[str, Object]:
+        return self.objects.setdefault(name, {})
+
+
+class FakeStripe:
+    """In-memory Stripe state and request handling.
+
+    ``latency`` is a number of seconds, or a ``(min, max)`` range, to wait
+    before answering each request. ``error_rate`` and ``rate_limit_rate``
+    are the probabilities of answering with a 500 or a 429 instead;
+    ``retry_after`` adds a Retry-After header to those 429s. Pass ``seed``
+    for reproducible IDs and injected failures.
+
+    The v2 meter event stream is served too, with sessions that expire
+    after ``session_ttl`` seconds; pass ``meter_event_stream=False`` to
+    answer it with 404s, as for an account without access to it.
+    """
+
+    def __init__(
+        self,
+        latency: Union[float, Tuple[float, float]] = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: Optional[float] = None,
+        seed: Optional[int] = None,
+        session_ttl: float = 900.0,
+        meter_event_stream: bool = True,
+    ):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.session_ttl = session_ttl
+        self.meter_event_stream = meter_event_stream
+        # Requests per endpoint, such as "POST /v1/invoices/{id}/finalize",
+        # and responses per status code.
+        self.requests: Counter = Counter()
+        self.statuses: Counter = Counter()
+        self._random = random.Random(seed)
+        self._accounts: Dict[Optional[str], _Account] = {}
+        self._idempotent: Dict[Tuple[Optional[str], str], Tuple] = {}
+        self._failures: List[int] = []
+        # Meter event session tokens, with their account and expiry.
+        self._sessions: Dict[str, Tuple[Optional[str], float]] = {}
+        self._lock = threading.Lock()
+        self._routes: List[Tuple[str, re.Pattern, str, Callable]] = [
+            (
+                method,
+                re.compile("^%s$" % pattern),
+                re.sub(r"\(\?P<(\w+)>[^)]*\)", r"{\1}", pattern),
+                handler,
+            )
+            for method, pattern, handler in (
+                ("POST", "/v1/customers", self._create_customer),
+                ("GET", "/v1/customers", self._list("customers", "email")),
+                ("POST", "/v1/products", self._create_product),
+                ("GET", "/v1/products", self._list("products")),
+                ("POST", "/v1/prices", self._create_price),
+                ("GET", "/v1/prices", self._list("prices", "product")),
+                ("POST", "/v1/payment_links", self._create_payment_link),
+                ("POST", "/v1/invoices", self._create_invoice),
+                ("GET", "/v1/invoices", self._list("invoices", "customer")),
+                (
+                    "POST",
+                    "/v1/invoices/(?P<id>[^/]+)/finalize",
+                    self._finalize_invoice,
+                ),
+                ("POST", "/v1/invoiceitems", self._create_invoice_item),
+                ("GET", "/v1/balance", self._retrieve_balance),
+                ("POST", "/v1/refunds", self._create_refund),
+                ("POST", "/v1/payment_intents", self._create_payment_intent),
+                (
+                    "GET",
+                    "/v1/payment_intents",
+                    self._list("payment_intents", "customer"),
+                ),
+                (
+                    "POST",
+                    "/v1/billing_portal/sessions",
+                    self._create_billing_portal_session,
+                ),
+                (
+                    "POST",
+                    "/v1/billing/meter_events",
+                    self._create_meter_event,
+                ),
+                (
+                    "POST",
+                    "/v2/billing/meter_event_session",
+                    self._create_meter_event_session,
+                ),
+                (
+                    "POST",
+                    "/v2/billing/meter_event_stream",
+                    self._create_meter_event_stream,
+                ),
+            )
+        ]
+
+    # Failure injection
+
+    def fail_next(self, status: int = 500, count: int = 1) -> None:
+        """Answer the next ``count`` requests with ``status``."""
+        with self._lock:
+            self._failures.extend([status] * count)
+
+    def _injected_failure(self) -> Optional[FakeStripeError]:
+        with self._lock:
+            if self._failures:
+                status = self._failures.pop(0)
+            elif self._random.random() < self.rate_limit_rate:
+                status = 429
+            elif self._random.random() < self.error_rate:
+                status = 500
+            else:
+                return None
+        if status == 429:
+            headers = {}
+            if self.retry_after is not None:
+                headers["Retry-After"] = str(self.retry_after)
+            return FakeStripeError(
+                429,
+                "Too many requests.",
+                type="invalid_request_error",
+                code="rate_limit",
+                headers=headers,
+            )
+        return FakeStripeError(status, "Injected failure.", type="api_error")
+
+    def _delay(self) -> float:
+        if isinstance(self.latency, tuple):
+            with self._lock:
+                return self._random.uniform(*self.latency)
+        return self.latency
+
+    # Request handling
+
+    def handle(
+        self,
+        method: str,
+        path: str,
+        params: Dict[str, Any],
+        headers: Dict[str, str],
+    ) -> Tuple[int, Object, Dict[str, str]]:
+        """Answer one request with a status, a JSON body and headers."""
+        headers = {name.lower(): value for name, value in headers.items()}
+        delay = self._delay()
+        if delay > 0:
+            time.sleep(delay)
+
+        status, body, response_headers = self._respond(
+            method, path, params, headers
+        )
+        with self._lock:
+            self.requests["%s %s" % (method, self._template(path))] += 1
+            self.statuses[status] += 1
+        return status, body, response_headers
+
+    def _respond(
+        self,
+        method: str,
+        path: str,
+        params: Dict[str, Any],
+        headers: Dict[str, str],
+    ) -> Tuple[int, Object, Dict[str, str]]:
+        account = headers.get("stripe-account")
+        authorization = headers.get("authorization", "")
+        try:
+            if path.startswith("/v2/") and not self.meter_event_stream:
+                raise FakeStripeError(
+                    404, "Unrecognized request URL (%s: %s)." % (method, path)
+                )
+            if path == "/v2/billing/meter_event_stream":
+                # Authenticated with a session token instead of a key.
+                account = self._session_account(authorization)
+            elif not authorization.startswith("Bearer sk_"):
+                raise FakeStripeError(
+                    401,
+                    "Invalid API Key provided.",
+                    type="authentication_error",
+                )
+        except FakeStripeError as e:
+            return e.status, e.body, e.headers
+
+        failure = self._injected_failure()
+        if failure is not None:
+            return failure.status, failure.body, failure.headers
+
+        idempotency_key = headers.get("idempotency-key")
+        if method == "POST" and idempotency_key:
+            with self._lock:
+                replayed = self._idempotent.get((account, idempotency_key))
+            if replayed is not None:
+                status, body = replayed
+                return status, body, {"Idempotent-Replayed": "true"}
+
+        try:
+            status, body = 200, self._route(method, path, params, account)
+        except FakeStripeError as e:
+            status, body = e.status, e.body
+
+        if method == "POST" and idempotency_key:
+            with self._lock:
+                self._idempotent[(account, idempotency_key)] = (status, body)
+        return status, body, {}
+
+    def _session_account(self, authorization: str) -> Optional[str]:
+        token = authorization[len("Bearer ") :]
+        with self._lock:
+            session = self._sessions.get(token)
+        if session is None or session[1] <= time.time():
+            raise FakeStripeError(
+                401,
+                "The meter event session has expired.",
+                type="temporary_session_expired",
+                code="billing_meter_event_session_expired",
+            )
+        return session[0]
+
+    def _route(
+        self,
+        method: str,
+        path: str,
+        params: Dict[str, Any],
+        account: Optional[str],
+    ) -> Object:
+        for route_method, pattern, _, handler in self._routes:
+            match = pattern.match(path)
+            if match is not None and route_method == method:
+                with self._lock:
+                    state = self._accounts.get(account)
+                    if state is None:
+                        state = self._accounts[account] = _Account(account)
+                    return handler(state, params, **match.groupdict())
+        raise FakeStripeError(
+            404, "Unrecognized request URL (%s: %s)." % (method, path)
+        )
+
+    def _template(self, path: str) -> str:
+        for _, pattern, template, _ in self._routes:
+            if pattern.match(path):
+                return template
+        return path
+
+    def expire_sessions(self) -> None:
+        """Expire every meter event session token."""
+        with self._lock:
+            self._sessions.clear()
+
+    # Seeding
+
+    def create(
+        self, resource: str, account: Optional[str] = None, **params: Any
+    ) -> Object:
+        """Create an object directly, as a POST to ``resource`` would."""
+        return self._route(
+            "POST", "/v1/" + resource, _stringify(params), account
+        )
+
+    def objects(
+        self, resource: str, account: Optional[str] = None
+    ) -> List[Object]:
+        """Every object of ``resource``, oldest first."""
+        with self._lock:
+            state = self._accounts.get(account) or _Account(account)
+            return list(state.resource(resource).values())
+
+    # Resources
+
+    def _id(self, prefix: str) -> str:
+        alphabet = string.ascii_letters + string.digits
+        return prefix + "_" + "".join(self._random.choices(alphabet, k=14))
+
+    def _new(
+        self, state: _Account, resource: str, prefix: str, **fields: Any
+    ) -> Object:
+        obj = {
+            "id": self._id(prefix),
+            "created": int(time.time()),
+            "livemode": False,
+            **fields,
+        }
+        state.resource(resource)[obj["id"]] = obj
+        return obj
+
+    def _get(self, state: _Account, resource: str, id: str, param: str):
+        obj = state.resource(resource).get(id)
+        if obj is None:
+            raise FakeStripeError(
+                404,
+                "No such %s: '%s'" % (resource.rstrip("s"), id),
+                code="resource_missing",
+                param=param,
+            )
+        return obj
+
+    def _list(self, resource: str, *filters: str) -> Callable:
+        def list_objects(state: _Account, params: Dict[str, Any]) -> Object:
+            limit = _integer(params, "limit", 10)
+            if not 1 <= limit <= 100:
+                raise FakeStripeError(
+                    400,
+                    "Invalid limit: must be between 1 and 100.",
+                    param="limit",
+                )
+            objects = [
+                obj
+                for obj in reversed(state.resource(resource).values())
+                if all(
+                    params.get(name) in (None, obj.get(name))
+                    for name in filters
+                )
+            ]
+            starting_after = params.get("starting_after")
+            if starting_after:
+                ids = [obj["id"] for obj in objects]
+                if starting_after not in ids:
+                    raise FakeStripeError(
+                        404,
+                        "No such object: '%s'" % starting_after,
+                        code="resource_missing",
+                        param="starting_after",
+                    )
+                objects = objects[ids.index(starting_after) + 1 :]
+            return {
+                "object": "list",
+                "data": objects[:limit],
+                "has_more": len(objects) > limit,
+                "url": "/v1/" + resource,
+            }
+
+        return list_objects
+
+    def _create_customer(self, state: _Account, params) -> Object:
+        return self._new(
+            state,
+            "customers",
+            "cus",
+            object="customer",
+            name=params.get("name"),
+            email=params.get("email"),
+            metadata=params.get("metadata", {}),
+        )
+
+    def _create_product(self, state: _Account, params) -> Object:
+        return self._new(
+            state,
+            "products",
+            "prod",
+            object="product",
+            name=_required(params, "name"),
+            description=params.get("description"),
+            active=True,
+            default_price=None,
+            images=[],
+            metadata=params.get("metadata", {}),
+        )
+
+    def _create_price(self, state: _Account, params) -> Object:
+        product = self._get(
+            state, "products", _required(params, "product"), "product"
+        )
+        return self._new(
+            state,
+            "prices",
+            "price",
+            object="price",
+            product=product["id"],
+            currency=_required(params, "currency"),
+            unit_amount=_integer(params, "unit_amount"),
+            recurring=params.get("recurring"),
+            type="recurring" if params.get("recurring") else "one_time",
+            active=True,
+        )
+
+    def _create_payment_link(self, state: _Account, params) -> Object:
+        line_items = _required(params, "line_items")
+        for i, item in enumerate(line_items):
+            self._get(state, "prices", item.get("price"), "line_items[%d]" % i)
+        payment_link = self._new(
+            state,
+            "payment_links",
+            "plink",
+            object="payment_link",
+            active=True,
+            line_items=line_items,
+        )
+        payment_link["url"] = (
+            "https://buy.stripe.com/test_%s" % (payment_link["id"])
+        )
+        return payment_link
+
+    def _create_invoice(self, state: _Account, params) -> Object:
+        customer = self._get(
+            state, "customers", _required(params, "customer"), "customer"
+        )
+        return self._new(
+            state,
+            "invoices",
+            "in",
+            object="invoice",
+            customer=customer["id"],
+            collection_method=params.get(
+                "collection_method", "charge_automatically"
+            ),
+            days_until_due=_integer(params, "days_until_due"),
+            status="draft",
+            currency="usd",
+            total=0,
+            amount_due=0,
+            due_date=None,
+            hosted_invoice_url=None,
+        )
+
+    def _create_invoice_item(self, state: _Account, params) -> Object:
+        customer = self._get(
+            state, "customers", _required(params, "customer"), "customer"
+        )
+        price = self._get(state, "prices", _required(params, "price"), "price")
+        invoice = None
+        if params.get("invoice"):
+            invoice = self._get(
+                state, "invoices", params["invoice"], "invoice"
+            )
+            if invoice["status"] != "draft":
+                raise FakeStripeError(
+                    400,
+                    "Invoice %s is not a draft." % invoice["id"],
+                    code="invoice_not_editable",
+                    param="invoice",
+                )
+        quantity = _integer(params, "quantity", 1)
+        amount = (price["unit_amount"] or 0) * quantity
+        if invoice is not None:
+            invoice["total"] += amount
+            invoice["amount_due"] += amount
+        return self._new(
+            state,
+            "invoice_items",
+            "ii",
+            object="invoiceitem",
+            customer=customer["id"],
+            price=price,
+            invoice=invoice["id"] if invoice is not None else None,
+            quantity=quantity,
+            amount=amount,
+            currency=price["currency"],
+        )
+
+    def _finalize_invoice(self, state: _Account, params, id: str) -> Object:
+        invoice = self._get(state, "invoices", id, "invoice")
+        if invoice["status"] != "draft":
+            raise FakeStripeError(
+                400,
+                "This invoice is already finalized.",
+                code="invoice_not_editable",
+            )
+        invoice["status"] = "open"
+        invoice["number"] = "%04d" % len(state.resource("invoices"))
+        invoice["hosted_invoice_url"] = (
+            "https://invoice.stripe.com/i/%s" % (invoice["id"])
+        )
+        if invoice["days_until_due"] is not None:
+            invoice["due_date"] = invoice["created"] + (
+                invoice["days_until_due"] * 86400
+            )
+        return invoice
+
+    def _balance(self, state: _Account, currency: str, amount: int) -> None:
+        state.balance[currency] = state.balance.get(currency, 0) + amount
+
+    def _retrieve_balance(self, state: _Account, params) -> Object:
+        return {
+            "object": "balance",
+            "livemode": False,
+            "available": [
+                {"amount": amount, "currency": currency}
+                for currency, amount in sorted(state.balance.items())
+            ]
+            or [{"amount": 0, "currency": "usd"}],
+            "pending": [{"amount": 0, "currency": "usd"}],
+        }
+
+    def _create_payment_intent(self, state: _Account, params) -> Object:
+        amount = _integer(params, "amount")
+        if amount is None:
+            _required(params, "amount")
+        currency = _required(params, "currency")
+        if params.get("customer"):
+            self._get(state, "customers", params["customer"], "customer")
+        status = params.get("status", "succeeded")
+        if status == "succeeded":
+            self._balance(state, currency, amount)
+        return self._new(
+            state,
+            "payment_intents",
+            "pi",
+            object="payment_intent",
+            amount=amount,
+            amount_refunded=0,
+            currency=currency,
+            customer=params.get("customer"),
+            description=params.get("description"),
+            status=status,
+        )
+
+    def _create_refund(self, state: _Account, params) -> Object:
+        payment_intent = self._get(
+            state,
+            "payment_intents",
+            _required(params, "payment_intent"),
+            "payment_intent",
+        )
+        refundable = (
+            payment_intent["amount"] - (payment_intent["amount_refunded"])
+        )
+        amount = _integer(params, "amount", refundable)
+        if payment_intent["status"] != "succeeded" or amount > refundable:
+            raise FakeStripeError(
+                400,
+                "Refund amount is greater than the refundable amount.",
+                code="amount_too_large",
+                param="amount",
+            )
+        payment_intent["amount_refunded"] += amount
+        self._balance(state, payment_intent["currency"], -amount)
+        return self._new(
+            state,
+            "refunds",
+            "re",
+            object="refund",
+            amount=amount,
+            currency=payment_intent["currency"],
+            payment_intent=payment_intent["id"],
+            status="succeeded",
+        )
+
+    def _create_billing_portal_session(
+        self, state: _Account, params
+    ) -> Object:
+        customer = self._get(
+            state, "customers", _required(params, "customer"), "customer"
+        )
+        session = self._new(
+            state,
+            "billing_portal_sessions",
+            "bps",
+            object="billing_portal.session",
+            customer=customer["id"],
+            return_url=params.get("return_url"),
+        )
+        session["url"] = (
+            "https://billing.stripe.com/p/session/test_%s" % (session["id"])
+        )
+        return session
+
+    def _create_meter_event(self, state: _Account, params) -> Object:
+        payload = _required(params, "payload")
+        if not payload.get("stripe_customer_id"):
+            _required({}, "payload[stripe_customer_id]")
+        identifier = params.get("identifier") or self._id("mev")
+        events = state.resource("meter_events")
+        if identifier in events:
+            raise FakeStripeError(
+                400,
+                "An event already exists with identifier %s." % identifier,
+                code="duplicate_meter_event",
+                param="identifier",
+            )
+        event = {
+            "object": "billing.meter_event",
+            "created": int(time.time()),
+            "event_name": _required(params, "event_name"),
+            "identifier": identifier,
+            "livemode": False,
+            "payload": payload,
+            "timestamp": _integer(params, "timestamp", int(time.time())),
+        }
+        events[identifier] = event
+        return event
+
+    def _create_meter_event_session(self, state: _Account, params) -> Object:
+        now = time.time()
+        session = {
+            "object": "billing.meter_event_session",
+            "id": self._id("mes"),
+            "authentication_token": self._id("mes_tok"),
+            "created": _isoformat(now),
+            "expires_at": _isoformat(now + self.session_ttl),
+            "livemode": False,
+        }
+        self._sessions[session["authentication_token"]] = (
+            state.id,
+            now + self.session_ttl,
+        )
+        return session
+
+    def _create_meter_event_stream(self, state: _Account, params) -> Object:
+        events = _required(params, "events")
+        if len(events) > 100:
+            raise FakeStripeError(
+                400, "At most 100 events can be sent at once.", param="events"
+            )
+        # The request is rejected as a whole when any event is invalid.
+        for i, event in enumerate(events):
+            if not event.get("payload", {}).get("stripe_customer_id"):
+                _required({}, "events[%d].payload.stripe_customer_id" % i)
+            _required(event, "event_name")
+        stored = state.resource("meter_events")
+        for event in events:
+            # Duplicates are dropped rather than rejected.
+            identifier = event.get("identifier") or self._id("mev")
+            stored.setdefault(
+                identifier,
+                {
+                    "object": "billing.meter_event",
+                    "created": int(time.time()),
+                    "event_name": event["event_name"],
+                    "identifier": identifier,
+                    "livemode": False,
+                    "payload": event["payload"],
+                    "timestamp": event.get("timestamp"),
+                },
+            )
+        return {}
+
+
+def _isoformat(timestamp: float) -> str:
+    return (
+        datetime.fromtimestamp(timestamp, timezone.utc)
+        .isoformat(timespec="milliseconds")
+        .replace("+00:00", "Z")
+    )
+
+
+def _stringify(params: Dict[str, Any]) -> Dict[str, Any]:
+    # Mirror form encoding, where every scalar arrives as a string.
+    if isinstance(params, dict):
+        return {key: _stringify(value) for key, value in params.items()}
+    if isinstance(params, list):
+        return [_stringify(value) for value in params]
+    if isinstance(params, bool):
+        return "true" if params else "false"
+    return str(params) if params is not None else params
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-alive, so that clients reuse connections as they do with Stripe.
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+
+    def _handle(self, method: str) -> None:
+        url = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode() if length else ""
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            # The v2 API takes JSON bodies.
+            params = {**decode_form(url.query), **json.loads(body or "{}")}
+        else:
+            params = decode_form(url.query + "&" + body)
+        status, payload, headers = self.server.fake.handle(
+            method, url.path, params, dict(self.headers)
+        )
+
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Request-Id", "req_fake")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        self._handle("GET")
+
+    def do_POST(self) -> None:
+        self._handle("POST")
+
+    def do_DELETE(self) -> None:
+        self._handle("DELETE")
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    fake: FakeStripe
+
+
+class FakeStripeServer:
+    """Serves a :class:`FakeStripe` over HTTP on a local port.
+
+    Use it as a context manager, or call :meth:`start` and :meth:`stop`.
+    Requests are handled on their own threads, so injected latency does not
+    serialize concurrent callers.
+    """
+
+    def __init__(
+        self,
+        fake: Optional[FakeStripe] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.fake = fake if fake is not None else FakeStripe()
+        self._server = _Server((host, port), _Handler)
+        self._server.fake = self.fake
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """The base URL to pass as ``api_base``."""
+        host, port = self._server.server_address[:2]
+        return "http://%s:%d" % (host, port)
+
+    def start(self) -> "FakeStripeServer":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            name="fake-stripe",
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "FakeStripeServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
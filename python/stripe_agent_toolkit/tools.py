@@ -1,4 +1,9 @@
-from typing import Dict, List
+from functools import lru_cache
+from typing import Dict, List, Type
+
+from pydantic import BaseModel, create_model
+
+from .configuration import is_tool_allowed
 
 from .prompts import (
     CREATE_CUSTOMER_PROMPT,
@@ -16,6 +21,7 @@ from .prompts import (
     CREATE_REFUND_PROMPT,
     LIST_PAYMENT_INTENTS_PROMPT,
     CREATE_BILLING_PORTAL_SESSION_PROMPT,
+    PAGINATION_PROMPT,
 )
 
 from .schema import (
@@ -203,3 +209,47 @@ tools: List[Dict] = [
         },
     },
 ]
+
+
+@lru_cache(maxsize=None)
+def _without_page_token(args_schema: Type[BaseModel]) -> Type[BaseModel]:
+    return create_model(
+        args_schema.__name__,
+        __doc__=args_schema.__doc__,
+        __module__=args_schema.__module__,
+        **{
+            name: (field.annotation, field)
+            for name, field in args_schema.model_fields.items()
+            if name != "page_token"
+        },
+    )
+
+
+def configured_tools(configuration) -> List[Dict]:
+    """The tools allowed by ``configuration``, as the model should see them.
+
+    List tools only return a ``next_page_token`` once a pagination budget is
+    configured, so without one their ``page_token`` argument is left out.
+    """
+    paginated = bool((configuration or {}).get("pagination"))
+    configured = []
+    for tool in tools:
+        if not is_tool_allowed(tool, configuration):
+            continue
+        args_schema = tool.get("args_schema")
+        if (
+            args_schema is not None
+            and "page_token" in args_schema.model_fields
+        ):
+            if paginated:
+                tool = {
+                    **tool,
+                    "description": tool["description"] + PAGINATION_PROMPT,
+                }
+            else:
+                tool = {
+                    **tool,
+                    "args_schema": _without_page_token(args_schema),
+                }
+        configured.append(tool)
+    return configured
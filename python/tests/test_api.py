@@ -0,0 +1,261 @@
+import json
+import unittest
+import stripe
+from unittest import mock
+from pydantic import ValidationError
+from stripe_agent_toolkit.api import StripeAPI
+from stripe_agent_toolkit.clients import StripeClientRegistry
+
+
+class TestStripeAPI(unittest.TestCase):
+    def test_run(self):
+        with mock.patch("stripe.CustomerService.create") as mock_function:
+            mock_function.return_value = stripe.Customer.construct_from(
+                {"id": "cus_123"}, "sk_test_123"
+            )
+
+            api = StripeAPI(
+                secret_key="sk_test_123", context={"account": "acct_123"}
+            )
+            result = api.run("create_customer", name="Test User")
+
+            mock_function.assert_called_with(
+                {"name": "Test User"},
+                {"stripe_account": "acct_123", "idempotency_key": mock.ANY},
+            )
+            self.assertEqual(json.loads(result), {"id": "cus_123"})
+
+    def test_run_invalid_method(self):
+        api = StripeAPI(secret_key="sk_test_123", context=None)
+
+        with self.assertRaises(ValueError):
+            api.run("delete_everything")
+
+    def test_run_with_pagination(self):
+        with mock.patch("stripe.ProductService.list") as mock_function:
+            mock_function.return_value = stripe.ListObject.construct_from(
+                {
+                    "object": "list",
+                    "data": [{"id": "prod_123"}, {"id": "prod_456"}],
+                    "has_more": True,
+                    "url": "/v1/products",
+                },
+                "sk_test_123",
+            )
+
+            api = StripeAPI(
+                secret_key="sk_test_123",
+                context=None,
+                configuration={"pagination": {"max_items": 2}},
+            )
+            result = json.loads(api.run("list_products"))
+
+            mock_function.assert_called_with({"limit": 2}, {})
+            self.assertEqual(
+                result["data"], [{"id": "prod_123"}, {"id": "prod_456"}]
+            )
+            self.assertIsNotNone(result["next_page_token"])
+
+            api.run("list_products", page_token=result["next_page_token"])
+
+            mock_function.assert_called_with(
+                {"limit": 2, "starting_after": "prod_456"}, {}
+            )
+
+    def test_run_with_budget_per_call(self):
+        with mock.patch("stripe.CustomerService.list") as mock_function:
+            mock_function.return_value = stripe.ListObject.construct_from(
+                {
+                    "object": "list",
+                    "data": [{"id": "cus_%d" % i} for i in range(10)],
+                    "has_more": True,
+                    "url": "/v1/customers",
+                },
+                "sk_test_123",
+            )
+
+            api = StripeAPI(
+                secret_key="sk_test_123",
+                context=None,
+                configuration={"pagination": {"max_items": 2}},
+            )
+            result = json.loads(api.run("list_customers", max_items=5))
+
+            mock_function.assert_called_with({"limit": 5}, {})
+            self.assertEqual(len(result["data"]), 5)
+
+            api = StripeAPI(secret_key="sk_test_123", context=None)
+            result = json.loads(api.run("list_customers", max_items=3))
+
+            self.assertEqual(len(result["data"]), 3)
+            self.assertIsNotNone(result["next_page_token"])
+
+    def test_run_rejects_budget_for_tool_without_pagination(self):
+        api = StripeAPI(secret_key="sk_test_123", context=None)
+
+        with self.assertRaises(ValidationError):
+            api.run("create_customer", name="Test User", max_items=5)
+
+    def test_run_many(self):
+        with mock.patch("stripe.CustomerService.create") as mock_function:
+            mock_function.side_effect = lambda params, options: (
+                stripe.Customer.construct_from(
+                    {"id": "cus_" + params["name"]}, "sk_test_123"
+                )
+            )
+
+            api = StripeAPI(secret_key="sk_test_123", context=None)
+            results = api.run_many(
+                [("create_customer", {"name": str(i)}) for i in range(20)],
+                max_concurrency=4,
+            )
+
+            self.assertEqual(
+                [json.loads(result)["id"] for result in results],
+                ["cus_%d" % i for i in range(20)],
+            )
+
+    def test_run_many_reports_errors_per_item(self):
+        with mock.patch("stripe.CustomerService.create") as mock_function:
+            mock_function.return_value = stripe.Customer.construct_from(
+                {"id": "cus_123"}, "sk_test_123"
+            )
+
+            api = StripeAPI(secret_key="sk_test_123", context=None)
+            results = api.run_many(
+                [
+                    ("create_customer", {"name": "Test User"}),
+                    ("delete_everything", {}),
+                ]
+            )
+
+            self.assertEqual(json.loads(results[0]), {"id": "cus_123"})
+            self.assertIsInstance(results[1], ValueError)
+
+    def test_run_many_rejects_invalid_concurrency(self):
+        api = StripeAPI(secret_key="sk_test_123", context=None)
+
+        with self.assertRaises(ValueError):
+            api.run_many([("retrieve_balance", {})], max_concurrency=0)
+
+    def test_bind(self):
+        with mock.patch("stripe.BalanceService.retrieve") as mock_function:
+            mock_function.return_value = {}
+
+            api = StripeAPI(
+                secret_key="sk_test_123", context={"account": "acct_123"}
+            )
+            bound = api.bind({"account": "acct_456"})
+            bound.run("retrieve_balance")
+
+            mock_function.assert_called_with(
+                {}, {"stripe_account": "acct_456"}
+            )
+            self.assertIs(bound._client, api._client)
+            self.assertEqual(api._context, {"account": "acct_123"})
+
+    def test_instances_do_not_share_keys(self):
+        registry = StripeClientRegistry()
+
+        first = StripeAPI("sk_test_123", context=None, registry=registry)
+        second = StripeAPI("sk_test_456", context=None, registry=registry)
+        third = StripeAPI("sk_test_123", context=None, registry=registry)
+
+        self.assertIsNot(first._client, second._client)
+        self.assertIs(first._client, third._client)
+        self.assertIsNone(stripe.api_key)
+
+
+class TestStripeClientRegistry(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        registry = StripeClientRegistry(max_clients=2)
+
+        first = registry.get("sk_test_1")
+        second = registry.get("sk_test_2")
+        self.assertIs(registry.get("sk_test_1"), first)
+
+        registry.get("sk_test_3")
+
+        self.assertEqual(len(registry), 2)
+        self.assertIs(registry.get("sk_test_1"), first)
+        self.assertIsNot(registry.get("sk_test_2"), second)
+
+
+class TestStripeAPIAsync(unittest.IsolatedAsyncioTestCase):
+    async def test_arun(self):
+        with mock.patch(
+            "stripe.CustomerService.create_async", new_callable=mock.AsyncMock
+        ) as mock_function:
+            mock_function.return_value = stripe.Customer.construct_from(
+                {"id": "cus_123"}, "sk_test_123"
+            )
+
+            api = StripeAPI(
+                secret_key="sk_test_123", context={"account": "acct_123"}
+            )
+            result = await api.arun("create_customer", name="Test User")
+
+            mock_function.assert_awaited_with(
+                {"name": "Test User"},
+                {"stripe_account": "acct_123", "idempotency_key": mock.ANY},
+            )
+            self.assertEqual(json.loads(result), {"id": "cus_123"})
+
+    async def test_arun_many(self):
+        with mock.patch(
+            "stripe.CustomerService.create_async", new_callable=mock.AsyncMock
+        ) as mock_function:
+            mock_function.side_effect = [
+                stripe.Customer.construct_from(
+                    {"id": "cus_123"}, "sk_test_123"
+                ),
+                stripe.InvalidRequestError("Bad", param="email"),
+            ]
+
+            api = StripeAPI(secret_key="sk_test_123", context=None)
+            results = await api.arun_many(
+                [
+                    ("create_customer", {"name": "First"}),
+                    ("create_customer", {"name": "Second"}),
+                ],
+                max_concurrency=1,
+            )
+
+            self.assertEqual(json.loads(results[0]), {"id": "cus_123"})
+            self.assertIsInstance(results[1], stripe.InvalidRequestError)
+
+    async def test_arun_many_rejects_invalid_concurrency(self):
+        api = StripeAPI(secret_key="sk_test_123", context=None)
+
+        with self.assertRaises(ValueError):
+            await api.arun_many([("retrieve_balance", {})], max_concurrency=0)
+
+    async def test_arun_invalid_method(self):
+        api = StripeAPI(secret_key="sk_test_123", context=None)
+
+        with self.assertRaises(ValueError):
+            await api.arun("delete_everything")
+
+    async def test_create_meter_event_async(self):
+        with mock.patch(
+            "stripe.billing.MeterEventService.create_async",
+            new_callable=mock.AsyncMock,
+        ) as mock_function:
+            api = StripeAPI(secret_key="sk_test_123", context=None)
+
+            await api.create_meter_event_async("tokens", "cus_123", "42")
+
+            mock_function.assert_awaited_with(
+                {
+                    "event_name": "tokens",
+                    "payload": {
+                        "stripe_customer_id": "cus_123",
+                        "value": "42",
+                    },
+                },
+                {},
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,258 @@
+import json
+import threading
+import unittest
+import stripe
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from stripe_agent_toolkit.api import StripeAPI
+from stripe_agent_toolkit.cache import ToolCache, TTLCache
+
+
+def _key(resource="products", args="{}", account=None):
+    return ("key", account, resource, "list_" + resource, args)
+
+
+class TestTTLCache(unittest.TestCase):
+    def test_hit_and_miss_counters(self):
+        cache = TTLCache()
+
+        self.assertIsNone(cache.get(_key()))
+        cache.set(_key(), "[]")
+        self.assertEqual(cache.get(_key()), "[]")
+
+        self.assertEqual(
+            cache.stats(),
+            {"products": {"hits": 1, "misses": 1, "evictions": 0}},
+        )
+
+    def test_expiry(self):
+        cache = TTLCache(ttls={"products": 10})
+
+        with mock.patch("time.monotonic", return_value=100):
+            cache.set(_key(), "[]")
+        with mock.patch("time.monotonic", return_value=109):
+            self.assertEqual(cache.get(_key()), "[]")
+        with mock.patch("time.monotonic", return_value=110):
+            self.assertIsNone(cache.get(_key()))
+
+        self.assertEqual(len(cache), 0)
+
+    def test_lru_eviction(self):
+        cache = TTLCache(max_bytes=10)
+
+        cache.set(_key(args="a"), "12345")
+        cache.set(_key(args="b"), "12345")
+        cache.get(_key(args="a"))
+        cache.set(_key(args="c"), "12345")
+
+        self.assertEqual(cache.get(_key(args="a")), "12345")
+        self.assertIsNone(cache.get(_key(args="b")))
+        self.assertEqual(cache.stats()["products"]["evictions"], 1)
+
+    def test_invalidate_affected_resources(self):
+        cache = TTLCache()
+        cache.set(_key("balance"), "{}")
+        cache.set(_key("payment_intents"), "[]")
+        cache.set(_key("products"), "[]")
+        cache.set(_key("balance", account="acct_123"), "{}")
+
+        cache.invalidate("key", None, "refunds")
+
+        self.assertIsNone(cache.get(_key("balance")))
+        self.assertIsNone(cache.get(_key("payment_intents")))
+        self.assertEqual(cache.get(_key("products")), "[]")
+        self.assertEqual(cache.get(_key("balance", account="acct_123")), "{}")
+
+    def test_set_skips_values_read_before_invalidation(self):
+        cache = TTLCache()
+        generation = cache.generation(_key("balance"))
+
+        cache.invalidate("key", None, "refunds")
+        cache.set(_key("balance"), "{}", generation)
+
+        self.assertIsNone(cache.get(_key("balance")))
+
+        cache.set(_key("balance"), "{}", cache.generation(_key("balance")))
+
+        self.assertEqual(cache.get(_key("balance")), "{}")
+
+    def test_tool_cache_is_abstract(self):
+        class PartialCache(ToolCache):
+            def get(self, key):
+                return None
+
+        with self.assertRaises(TypeError):
+            PartialCache()
+
+
+class TestStripeAPICache(unittest.TestCase):
+    def setUp(self):
+        self.cache = TTLCache()
+        self.api = StripeAPI(
+            secret_key="sk_test_123",
+            context={"account": "acct_123"},
+            configuration={"cache": self.cache},
+        )
+
+    def test_read_through(self):
+        with mock.patch("stripe.ProductService.list") as mock_function:
+            mock_function.return_value = stripe.ListObject.construct_from(
+                {"object": "list", "data": [{"id": "prod_123"}]},
+                "sk_test_123",
+            )
+
+            first = self.api.run("list_products", limit=1)
+            second = self.api.run("list_products", limit=1)
+            self.api.run("list_products", limit=2)
+
+            self.assertEqual(first, second)
+            self.assertEqual(json.loads(first), [{"id": "prod_123"}])
+            self.assertEqual(mock_function.call_count, 2)
+
+    def test_write_invalidates(self):
+        with mock.patch("stripe.ProductService.list") as mock_list, mock.patch(
+            "stripe.ProductService.create"
+        ) as mock_create:
+            mock_list.return_value = stripe.ListObject.construct_from(
+                {"object": "list", "data": []}, "sk_test_123"
+            )
+            mock_create.return_value = stripe.Product.construct_from(
+                {"id": "prod_123"}, "sk_test_123"
+            )
+
+            self.api.run("list_products")
+            self.api.run("create_product", name="Test Product")
+            self.api.run("list_products")
+
+            self.assertEqual(mock_list.call_count, 2)
+
+    def test_read_overlapping_a_write_is_not_cached(self):
+        with mock.patch("stripe.ProductService.list") as mock_list, mock.patch(
+            "stripe.ProductService.create"
+        ) as mock_create:
+            mock_create.return_value = stripe.Product.construct_from(
+                {"id": "prod_123"}, "sk_test_123"
+            )
+
+            def list_products(params, options):
+                # The write lands while the read is still in flight.
+                self.api.run("create_product", name="Test Product")
+                return stripe.ListObject.construct_from(
+                    {"object": "list", "data": []}, "sk_test_123"
+                )
+
+            mock_list.side_effect = list_products
+            self.api.run("list_products")
+            mock_list.side_effect = None
+            mock_list.return_value = stripe.ListObject.construct_from(
+                {"object": "list", "data": [{"id": "prod_123"}]},
+                "sk_test_123",
+            )
+
+            result = self.api.run("list_products")
+
+            self.assertEqual(json.loads(result), [{"id": "prod_123"}])
+            self.assertEqual(mock_list.call_count, 2)
+
+    def test_read_after_a_write_does_not_join_an_earlier_read(self):
+        started = threading.Event()
+        release = threading.Event()
+        stale = stripe.ListObject.construct_from(
+            {"object": "list", "data": []}, "sk_test_123"
+        )
+        fresh = stripe.ListObject.construct_from(
+            {"object": "list", "data": [{"id": "prod_123"}]}, "sk_test_123"
+        )
+
+        def list_products(params, options):
+            if not started.is_set():
+                started.set()
+                release.wait(5)
+                return stale
+            return fresh
+
+        with mock.patch(
+            "stripe.ProductService.list", side_effect=list_products
+        ), mock.patch(
+            "stripe.ProductService.create",
+            return_value=stripe.Product.construct_from(
+                {"id": "prod_123"}, "sk_test_123"
+            ),
+        ):
+            with ThreadPoolExecutor(1) as executor:
+                earlier = executor.submit(self.api.run, "list_products")
+                started.wait(5)
+                self.api.run("create_product", name="Test Product")
+                later = self.api.run("list_products")
+                release.set()
+
+                self.assertEqual(json.loads(earlier.result()), [])
+            self.assertEqual(json.loads(later), [{"id": "prod_123"}])
+            self.assertEqual(
+                json.loads(self.api.run("list_products")),
+                [{"id": "prod_123"}],
+            )
+
+    def test_negative_results_are_cached(self):
+        with mock.patch("stripe.PaymentIntentService.list") as mock_function:
+            mock_function.side_effect = stripe.InvalidRequestError(
+                "No such customer", "customer", code="resource_missing"
+            )
+
+            for _ in range(2):
+                with self.assertRaises(stripe.InvalidRequestError):
+                    self.api.run("list_payment_intents", customer="cus_404")
+
+            self.assertEqual(mock_function.call_count, 1)
+
+    def test_other_errors_are_not_cached(self):
+        with mock.patch("stripe.BalanceService.retrieve") as mock_function:
+            mock_function.side_effect = stripe.APIConnectionError("timeout")
+
+            for _ in range(2):
+                with self.assertRaises(stripe.APIConnectionError):
+                    self.api.run("retrieve_balance")
+
+            self.assertEqual(mock_function.call_count, 2)
+
+    def test_keys_do_not_share_entries(self):
+        other = StripeAPI(
+            secret_key="sk_test_456",
+            context={"account": "acct_123"},
+            configuration={"cache": self.cache},
+        )
+
+        with mock.patch("stripe.BalanceService.retrieve") as mock_function:
+            mock_function.return_value = stripe.Balance.construct_from(
+                {"available": []}, "sk_test_123"
+            )
+
+            self.api.run("retrieve_balance")
+            other.run("retrieve_balance")
+
+            self.assertEqual(mock_function.call_count, 2)
+
+
+class TestStripeAPICacheAsync(unittest.IsolatedAsyncioTestCase):
+    async def test_read_through(self):
+        api = StripeAPI(
+            secret_key="sk_test_123",
+            context=None,
+            configuration={"cache": TTLCache()},
+        )
+
+        with mock.patch(
+            "stripe.BalanceService.retrieve_async", new_callable=mock.AsyncMock
+        ) as mock_function:
+            mock_function.return_value = stripe.Balance.construct_from(
+                {"available": []}, "sk_test_123"
+            )
+
+            await api.arun("retrieve_balance")
+            await api.arun("retrieve_balance")
+
+            mock_function.assert_awaited_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
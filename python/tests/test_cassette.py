@@ -0,0 +1,144 @@
+import asyncio
+import json
+import os
+import stripe
+import tempfile
+import time
+import unittest
+import uuid
+from stripe_agent_toolkit.api import StripeAPI
+from stripe_agent_toolkit.cassette import Cassette, CassetteMiss
+from stripe_agent_toolkit.clients import StripeClientRegistry
+from stripe_agent_toolkit.metering import MeterEvent, MeterEventEmitter
+from stripe_agent_toolkit.testing import FakeStripe, FakeStripeServer
+
+
+class TestCassette(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "calls.cassette")
+
+    def test_replays_occurrences_in_order(self):
+        with Cassette(self.path, "record") as cassette:
+            for result in ("a", "b" * 1000, None):
+                cassette.call("key", lambda: result)
+            cassette.call("other", lambda: "c")
+
+        with Cassette(self.path, "replay") as cassette:
+            self.assertEqual(len(cassette), 4)
+            self.assertEqual(cassette.call("key", self.fail), "a")
+            self.assertEqual(cassette.call("key", self.fail), "b" * 1000)
+            self.assertIsNone(cassette.call("key", self.fail))
+            self.assertIsNone(cassette.call("key", self.fail))
+            self.assertEqual(cassette.call("other", self.fail), "c")
+            with self.assertRaises(CassetteMiss):
+                cassette.call("missing", self.fail)
+
+    def test_replays_stripe_errors(self):
+        def fail():
+            raise stripe.InvalidRequestError(
+                "No such price", "price", code="resource_missing"
+            )
+
+        with Cassette(self.path, "record") as cassette:
+            with self.assertRaises(stripe.InvalidRequestError):
+                cassette.call("key", fail)
+
+        with Cassette(self.path, "replay") as cassette:
+            with self.assertRaises(stripe.InvalidRequestError) as raised:
+                cassette.call("key", self.fail)
+
+        self.assertEqual(raised.exception.code, "resource_missing")
+        self.assertEqual(raised.exception.param, "price")
+
+    def test_not_a_cassette(self):
+        with open(self.path, "wb") as f:
+            f.write(b"not a cassette file")
+
+        with self.assertRaises(ValueError):
+            Cassette(self.path, "replay")
+
+
+class TestStripeAPICassette(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "calls.cassette")
+
+    def _api(self, cassette, api_base="http://127.0.0.1:9", **configuration):
+        return StripeAPI(
+            secret_key="sk_test_123",
+            context=None,
+            registry=StripeClientRegistry(),
+            configuration={
+                "api_base": api_base,
+                "cassette": cassette,
+                **configuration,
+            },
+        )
+
+    def _scenario(self, api):
+        before = api.run("list_products")
+        product = json.loads(api.run("create_product", name="Widget"))
+        after = asyncio.run(api.arun("list_products"))
+        api.create_meter_event("tokens", "cus_123", "10")
+        return before, product, after
+
+    def test_record_then_replay_without_network(self):
+        with FakeStripeServer(FakeStripe(seed=0)) as server:
+            with Cassette(self.path, "record") as cassette:
+                recorded = self._scenario(self._api(cassette, server.url))
+            requests = sum(server.fake.requests.values())
+
+        with Cassette(self.path, "replay") as cassette:
+            replayed = self._scenario(self._api(cassette))
+
+        self.assertEqual(requests, 4)
+        self.assertEqual(replayed, recorded)
+        self.assertEqual(json.loads(recorded[2])[0]["id"], recorded[1]["id"])
+
+    def test_replays_meter_events_stamped_on_each_run(self):
+        def scenario(cassette, api_base="http://127.0.0.1:9"):
+            emitter = MeterEventEmitter(self._api(cassette, api_base))
+            emitter.emit("tokens", "cus_123", 10)
+            emitter.close(5)
+            stream = self._api(cassette, api_base, meter_event_stream=True)
+            events = [
+                MeterEvent(
+                    "tokens",
+                    "cus_123",
+                    "5",
+                    str(uuid.uuid4()),
+                    int(time.time()),
+                )
+                for _ in range(2)
+            ]
+            return emitter.sent, stream.create_meter_events(events)
+
+        with FakeStripeServer(FakeStripe(seed=0)) as server:
+            with Cassette(self.path, "record") as cassette:
+                recorded = scenario(cassette, server.url)
+
+        with Cassette(self.path, "replay") as cassette:
+            replayed = scenario(cassette)
+
+        self.assertEqual(recorded, (1, [None, None]))
+        self.assertEqual(replayed, recorded)
+
+    def test_keyed_by_arguments(self):
+        with FakeStripeServer() as server:
+            with Cassette(self.path, "record") as cassette:
+                self._api(cassette, server.url).run(
+                    "create_customer", name="Jenny"
+                )
+
+        with Cassette(self.path, "replay") as cassette:
+            api = self._api(cassette)
+            api.run("create_customer", name="Jenny")
+            with self.assertRaises(CassetteMiss):
+                api.run("create_customer", name="Jenny Rosen")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,6 @@
 import unittest
 from stripe_agent_toolkit.configuration import is_tool_allowed
+from stripe_agent_toolkit.tools import configured_tools
 
 
 class TestConfigurations(unittest.TestCase):
@@ -53,6 +54,19 @@ class TestConfigurations(unittest.TestCase):
 
         self.assertFalse(is_tool_allowed(tool, configuration))
 
+    def test_page_token_only_offered_with_pagination(self):
+        actions = {"actions": {"products": {"read": True}}}
+
+        (tool,) = configured_tools(actions)
+
+        self.assertNotIn("page_token", tool["args_schema"].model_fields)
+        self.assertNotIn("page_token", tool["description"])
+
+        (tool,) = configured_tools({**actions, "pagination": {"max_items": 5}})
+
+        self.assertIn("page_token", tool["args_schema"].model_fields)
+        self.assertIn("page_token", tool["description"])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,74 @@
+import os
+import unittest
+from unittest import mock
+
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+from crewai import LLM, Agent, Crew, Task  # noqa: E402
+from stripe_agent_toolkit.crewai.toolkit import StripeAgentToolkit  # noqa: E402
+
+
+class TestBillingCallback(unittest.TestCase):
+    def setUp(self):
+        self.toolkit = StripeAgentToolkit("sk_test_123", {"actions": {}})
+        self.emit = mock.patch.object(
+            self.toolkit.meter_event_emitter, "emit"
+        ).start()
+        self.addCleanup(mock.patch.stopall)
+
+        # litellm answers without calling a provider.
+        llm = LLM(
+            model="gpt-4o-mini",
+            api_key="sk-test",
+            mock_response="Thought: done\nFinal Answer: 42",
+        )
+        agent = Agent(role="Analyst", goal="Answer", backstory="", llm=llm)
+        task = Task(description="Answer", expected_output="A number")
+        task.agent = agent
+        self.crew = Crew(agents=[agent], tasks=[task])
+
+    def test_records_the_token_usage_of_a_kickoff(self):
+        callback = self.toolkit.billing_callback(
+            type="token",
+            customer="cus_123",
+            meters={"input": "input_tokens", "output": "output_tokens"},
+        )
+
+        result = callback(self.crew.kickoff())
+
+        usage = result.token_usage
+        self.assertEqual(result.raw, "42")
+        self.assertEqual(
+            self.emit.call_args_list,
+            [
+                mock.call(
+                    "input_tokens",
+                    "cus_123",
+                    usage.prompt_tokens,
+                    account=None,
+                    secret_key="sk_test_123",
+                ),
+                mock.call(
+                    "output_tokens",
+                    "cus_123",
+                    usage.completion_tokens,
+                    account=None,
+                    secret_key="sk_test_123",
+                ),
+            ],
+        )
+
+    def test_records_each_task_as_an_outcome(self):
+        self.crew.task_callback = self.toolkit.billing_callback(
+            type="outcome", customer="cus_123", meter="tasks"
+        )
+
+        self.crew.kickoff()
+
+        self.emit.assert_called_once_with(
+            "tasks", "cus_123", account=None, secret_key="sk_test_123"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import json
+import unittest
+from pydantic import ValidationError
+from stripe_agent_toolkit.dispatch import build_handlers, get_handler
+from stripe_agent_toolkit.tools import tools
+
+
+class TestDispatch(unittest.TestCase):
+    def test_every_tool_has_a_handler(self):
+        for tool in tools:
+            handler = get_handler(tool["method"])
+
+            self.assertEqual(handler.method, tool["method"])
+            self.assertTrue(callable(handler.function))
+            self.assertTrue(callable(handler.async_function))
+
+    def test_invalid_method(self):
+        with self.assertRaises(ValueError):
+            get_handler("delete_everything")
+
+    def test_validator_keeps_only_set_arguments(self):
+        handler = get_handler("list_invoices")
+
+        self.assertEqual(
+            handler.validator({"customer": "cus_123", "limit": "10"}),
+            {"customer": "cus_123", "limit": 10},
+        )
+
+    def test_validator_rejects_missing_arguments(self):
+        handler = get_handler("create_customer")
+
+        with self.assertRaises(ValidationError):
+            handler.validator({"email": "test@example.com"})
+
+    def test_validator_rejects_unknown_arguments(self):
+        handler = get_handler("list_invoices")
+
+        with self.assertRaises(ValidationError):
+            handler.validator({"customer": "cus_123", "limmit": 10})
+
+    def test_serializer(self):
+        handler = get_handler("create_customer")
+
+        self.assertEqual(
+            json.loads(handler.serializer({"id": "cus_123"})),
+            {"id": "cus_123"},
+        )
+
+    def test_unknown_function(self):
+        with self.assertRaises(AttributeError):
+            build_handlers([{"method": "delete_everything"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -17,50 +17,62 @@ from stripe_agent_toolkit.functions import (
     create_refund,
     list_payment_intents,
     create_billing_portal_session,
+    create_customer_async,
+    list_products_async,
+    finalize_invoice_async,
+    retrieve_balance_async,
+    create_refund_async,
 )
 
 
 class TestStripeFunctions(unittest.TestCase):
+    def setUp(self):
+        self.client = stripe.StripeClient("sk_test_123")
+
     def test_create_customer(self):
-        with mock.patch("stripe.Customer.create") as mock_function:
+        with mock.patch("stripe.CustomerService.create") as mock_function:
             mock_customer = {"id": "cus_123"}
             mock_function.return_value = stripe.Customer.construct_from(
                 mock_customer, "sk_test_123"
             )
 
             result = create_customer(
-                context={}, name="Test User", email="test@example.com"
+                self.client,
+                context={},
+                name="Test User",
+                email="test@example.com",
             )
 
             mock_function.assert_called_with(
-                name="Test User", email="test@example.com"
+                {"name": "Test User", "email": "test@example.com"},
+                {},
             )
 
             self.assertEqual(result, {"id": mock_customer["id"]})
 
     def test_create_customer_with_context(self):
-        with mock.patch("stripe.Customer.create") as mock_function:
+        with mock.patch("stripe.CustomerService.create") as mock_function:
             mock_customer = {"id": "cus_123"}
             mock_function.return_value = stripe.Customer.construct_from(
                 mock_customer, "sk_test_123"
             )
 
             result = create_customer(
+                self.client,
                 context={"account": "acct_123"},
                 name="Test User",
                 email="test@example.com",
             )
 
             mock_function.assert_called_with(
-                name="Test User",
-                email="test@example.com",
-                stripe_account="acct_123",
+                {"name": "Test User", "email": "test@example.com"},
+                {"stripe_account": "acct_123"},
             )
 
             self.assertEqual(result, {"id": mock_customer["id"]})
 
     def test_list_customers(self):
-        with mock.patch("stripe.Customer.list") as mock_function:
+        with mock.patch("stripe.CustomerService.list") as mock_function:
             mock_customers = [{"id": "cus_123"}, {"id": "cus_456"}]
 
             mock_function.return_value = stripe.ListObject.construct_from(
@@ -90,14 +102,14 @@ class TestStripeFunctions(unittest.TestCase):
                 "sk_test_123",
             )
 
-            result = list_customers(context={})
+            result = list_customers(self.client, context={})
 
-            mock_function.assert_called_with()
+            mock_function.assert_called_with({}, {})
 
             self.assertEqual(result, mock_customers)
 
     def test_list_customers_with_context(self):
-        with mock.patch("stripe.Customer.list") as mock_function:
+        with mock.patch("stripe.CustomerService.list") as mock_function:
             mock_customers = [{"id": "cus_123"}, {"id": "cus_456"}]
 
             mock_function.return_value = stripe.ListObject.construct_from(
@@ -127,48 +139,54 @@ class TestStripeFunctions(unittest.TestCase):
                 "sk_test_123",
             )
 
-            result = list_customers(context={"account": "acct_123"})
+            result = list_customers(
+                self.client, context={"account": "acct_123"}
+            )
 
             mock_function.assert_called_with(
-                stripe_account="acct_123",
+                {},
+                {"stripe_account": "acct_123"},
             )
 
             self.assertEqual(result, mock_customers)
 
     def test_create_product(self):
-        with mock.patch("stripe.Product.create") as mock_function:
+        with mock.patch("stripe.ProductService.create") as mock_function:
             mock_product = {"id": "prod_123"}
             mock_function.return_value = stripe.Product.construct_from(
                 mock_product, "sk_test_123"
             )
 
-            result = create_product(context={}, name="Test Product")
-
-            mock_function.assert_called_with(
-                name="Test Product",
+            result = create_product(
+                self.client, context={}, name="Test Product"
             )
 
+            mock_function.assert_called_with({"name": "Test Product"}, {})
+
             self.assertEqual(result, {"id": mock_product["id"]})
 
     def test_create_product_with_context(self):
-        with mock.patch("stripe.Product.create") as mock_function:
+        with mock.patch("stripe.ProductService.create") as mock_function:
             mock_product = {"id": "prod_123"}
             mock_function.return_value = stripe.Product.construct_from(
                 mock_product, "sk_test_123"
             )
 
             result = create_product(
-                context={"account": "acct_123"}, name="Test Product"
+                self.client,
+                context={"account": "acct_123"},
+                name="Test Product",
             )
 
             mock_function.assert_called_with(
-                name="Test Product", stripe_account="acct_123"
+                {"name": "Test Product"},
+                {"stripe_account": "acct_123"},
             )
 
             self.assertEqual(result, {"id": mock_product["id"]})
 
     def test_list_products(self):
-        with mock.patch("stripe.Product.list") as mock_function:
+        with mock.patch("stripe.ProductService.list") as mock_function:
             mock_products = [
                 {"id": "prod_123", "name": "Product One"},
                 {"id": "prod_456", "name": "Product Two"},
@@ -199,20 +217,21 @@ class TestStripeFunctions(unittest.TestCase):
                 "sk_test_123",
             )
 
-            result = list_products(context={})
+            result = list_products(self.client, context={})
 
-            mock_function.assert_called_with()
+            mock_function.assert_called_with({}, {})
 
             self.assertEqual(result, mock_products)
 
     def test_create_price(self):
-        with mock.patch("stripe.Price.create") as mock_function:
+        with mock.patch("stripe.PriceService.create") as mock_function:
             mock_price = {"id": "price_123"}
             mock_function.return_value = stripe.Price.construct_from(
                 mock_price, "sk_test_123"
             )
 
             result = create_price(
+                self.client,
                 context={},
                 product="prod_123",
                 currency="usd",
@@ -220,21 +239,25 @@ class TestStripeFunctions(unittest.TestCase):
             )
 
             mock_function.assert_called_with(
-                product="prod_123",
-                currency="usd",
-                unit_amount=1000,
+                {
+                    "product": "prod_123",
+                    "currency": "usd",
+                    "unit_amount": 1000,
+                },
+                {},
             )
 
             self.assertEqual(result, {"id": mock_price["id"]})
 
     def test_create_price_with_context(self):
-        with mock.patch("stripe.Price.create") as mock_function:
+        with mock.patch("stripe.PriceService.create") as mock_function:
             mock_price = {"id": "price_123"}
             mock_function.return_value = stripe.Price.construct_from(
                 mock_price, "sk_test_123"
             )
 
             result = create_price(
+                self.client,
                 context={"account": "acct_123"},
                 product="prod_123",
                 currency="usd",
@@ -242,16 +265,18 @@ class TestStripeFunctions(unittest.TestCase):
             )
 
             mock_function.assert_called_with(
-                product="prod_123",
-                currency="usd",
-                unit_amount=1000,
-                stripe_account="acct_123",
+                {
+                    "product": "prod_123",
+                    "currency": "usd",
+                    "unit_amount": 1000,
+                },
+                {"stripe_account": "acct_123"},
             )
 
             self.assertEqual(result, {"id": mock_price["id"]})
 
     def test_list_prices(self):
-        with mock.patch("stripe.Price.list") as mock_function:
+        with mock.patch("stripe.PriceService.list") as mock_function:
             mock_prices = [
                 {"id": "price_123", "product": "prod_123"},
                 {"id": "price_456", "product": "prod_456"},
@@ -282,14 +307,14 @@ class TestStripeFunctions(unittest.TestCase):
                 "sk_test_123",
             )
 
-            result = list_prices({})
+            result = list_prices(self.client, {})
 
-            mock_function.assert_called_with()
+            mock_function.assert_called_with({}, {})
 
             self.assertEqual(result, mock_prices)
 
     def test_list_prices_with_context(self):
-        with mock.patch("stripe.Price.list") as mock_function:
+        with mock.patch("stripe.PriceService.list") as mock_function:
             mock_prices = [
                 {"id": "price_123", "product": "prod_123"},
                 {"id": "price_456", "product": "prod_456"},
@@ -320,49 +345,56 @@ class TestStripeFunctions(unittest.TestCase):
                 "sk_test_123",
             )
 
-            result = list_prices({"account": "acct_123"})
+            result = list_prices(self.client, {"account": "acct_123"})
 
-            mock_function.assert_called_with(stripe_account="acct_123")
+            mock_function.assert_called_with(
+                {},
+                {"stripe_account": "acct_123"},
+            )
 
             self.assertEqual(result, mock_prices)
 
     def test_create_payment_link(self):
-        with mock.patch("stripe.PaymentLink.create") as mock_function:
+        with mock.patch("stripe.PaymentLinkService.create") as mock_function:
             mock_payment_link = {"id": "pl_123", "url": "https://example.com"}
             mock_function.return_value = stripe.PaymentLink.construct_from(
                 mock_payment_link, "sk_test_123"
             )
 
             result = create_payment_link(
-                context={}, price="price_123", quantity=1
+                self.client, context={}, price="price_123", quantity=1
             )
 
             mock_function.assert_called_with(
-                line_items=[{"price": "price_123", "quantity": 1}],
+                {"line_items": [{"price": "price_123", "quantity": 1}]},
+                {},
             )
 
             self.assertEqual(result, mock_payment_link)
 
     def test_create_payment_link_with_context(self):
-        with mock.patch("stripe.PaymentLink.create") as mock_function:
+        with mock.patch("stripe.PaymentLinkService.create") as mock_function:
             mock_payment_link = {"id": "pl_123", "url": "https://example.com"}
             mock_function.return_value = stripe.PaymentLink.construct_from(
                 mock_payment_link, "sk_test_123"
             )
 
             result = create_payment_link(
-                context={"account": "acct_123"}, price="price_123", quantity=1
+                self.client,
+                context={"account": "acct_123"},
+                price="price_123",
+                quantity=1,
             )
 
             mock_function.assert_called_with(
-                line_items=[{"price": "price_123", "quantity": 1}],
-                stripe_account="acct_123",
+                {"line_items": [{"price": "price_123", "quantity": 1}]},
+                {"stripe_account": "acct_123"},
             )
 
             self.assertEqual(result, mock_payment_link)
 
     def test_list_invoices(self):
-        with mock.patch("stripe.Invoice.list") as mock_function:
+        with mock.patch("stripe.InvoiceService.list") as mock_function:
             mock_invoice = {
                 "id": "in_123",
                 "hosted_invoice_url": "https://example.com",
@@ -385,16 +417,18 @@ class TestStripeFunctions(unittest.TestCase):
                 mock_invoices, "sk_test_123"
             )
 
-            result = list_invoices(context={})
+            result = list_invoices(self.client, context={})
 
-            mock_function.assert_called_with()
+            mock_function.assert_called_with({}, {})
 
             self.assertEqual(
                 result,
                 [
                     {
                         "id": mock_invoice["id"],
-                        "hosted_invoice_url": mock_invoice["hosted_invoice_url"],
+                        "hosted_invoice_url": mock_invoice[
+                            "hosted_invoice_url"
+                        ],
                         "customer": mock_invoice["customer"],
                         "status": mock_invoice["status"],
                     }
@@ -402,7 +436,7 @@ class TestStripeFunctions(unittest.TestCase):
             )
 
     def test_list_invoices_with_customer(self):
-        with mock.patch("stripe.Invoice.list") as mock_function:
+        with mock.patch("stripe.InvoiceService.list") as mock_function:
             mock_invoice = {
                 "id": "in_123",
                 "hosted_invoice_url": "https://example.com",
@@ -425,18 +459,18 @@ class TestStripeFunctions(unittest.TestCase):
                 mock_invoices, "sk_test_123"
             )
 
-            result = list_invoices(context={}, customer="cus_123")
+            result = list_invoices(self.client, context={}, customer="cus_123")
 
-            mock_function.assert_called_with(
-                customer="cus_123",
-            )
+            mock_function.assert_called_with({"customer": "cus_123"}, {})
 
             self.assertEqual(
                 result,
                 [
                     {
                         "id": mock_invoice["id"],
-                        "hosted_invoice_url": mock_invoice["hosted_invoice_url"],
+                        "hosted_invoice_url": mock_invoice[
+                            "hosted_invoice_url"
+                        ],
                         "customer": mock_invoice["customer"],
                         "status": mock_invoice["status"],
                     }
@@ -444,7 +478,7 @@ class TestStripeFunctions(unittest.TestCase):
             )
 
     def test_list_invoices_with_customer_and_limit(self):
-        with mock.patch("stripe.Invoice.list") as mock_function:
+        with mock.patch("stripe.InvoiceService.list") as mock_function:
             mock_invoice = {
                 "id": "in_123",
                 "hosted_invoice_url": "https://example.com",
@@ -467,11 +501,13 @@ class TestStripeFunctions(unittest.TestCase):
                 mock_invoices, "sk_test_123"
             )
 
-            result = list_invoices(context={}, customer="cus_123", limit=100)
+            result = list_invoices(
+                self.client, context={}, customer="cus_123", limit=100
+            )
 
             mock_function.assert_called_with(
-                customer="cus_123",
-                limit=100,
+                {"customer": "cus_123", "limit": 100},
+                {},
             )
 
             self.assertEqual(
@@ -479,7 +515,9 @@ class TestStripeFunctions(unittest.TestCase):
                 [
                     {
                         "id": mock_invoice["id"],
-                        "hosted_invoice_url": mock_invoice["hosted_invoice_url"],
+                        "hosted_invoice_url": mock_invoice[
+                            "hosted_invoice_url"
+                        ],
                         "customer": mock_invoice["customer"],
                         "status": mock_invoice["status"],
                     }
@@ -487,7 +525,7 @@ class TestStripeFunctions(unittest.TestCase):
             )
 
     def test_list_invoices_with_context(self):
-        with mock.patch("stripe.Invoice.list") as mock_function:
+        with mock.patch("stripe.InvoiceService.list") as mock_function:
             mock_invoice = {
                 "id": "in_123",
                 "hosted_invoice_url": "https://example.com",
@@ -510,11 +548,15 @@ class TestStripeFunctions(unittest.TestCase):
                 mock_invoices, "sk_test_123"
             )
 
-            result = list_invoices(context={"account": "acct_123"}, customer="cus_123")
+            result = list_invoices(
+                self.client,
+                context={"account": "acct_123"},
+                customer="cus_123",
+            )
 
             mock_function.assert_called_with(
-                customer="cus_123",
-                stripe_account="acct_123",
+                {"customer": "cus_123"},
+                {"stripe_account": "acct_123"},
             )
 
             self.assertEqual(
@@ -522,7 +564,9 @@ class TestStripeFunctions(unittest.TestCase):
                 [
                     {
                         "id": mock_invoice["id"],
-                        "hosted_invoice_url": mock_invoice["hosted_invoice_url"],
+                        "hosted_invoice_url": mock_invoice[
+                            "hosted_invoice_url"
+                        ],
                         "customer": mock_invoice["customer"],
                         "status": mock_invoice["status"],
                     }
@@ -530,7 +574,7 @@ class TestStripeFunctions(unittest.TestCase):
             )
 
     def test_create_invoice(self):
-        with mock.patch("stripe.Invoice.create") as mock_function:
+        with mock.patch("stripe.InvoiceService.create") as mock_function:
             mock_invoice = {
                 "id": "in_123",
                 "hosted_invoice_url": "https://example.com",
@@ -542,12 +586,17 @@ class TestStripeFunctions(unittest.TestCase):
                 mock_invoice, "sk_test_123"
             )
 
-            result = create_invoice(context={}, customer="cus_123")
+            result = create_invoice(
+                self.client, context={}, customer="cus_123"
+            )
 
             mock_function.assert_called_with(
-                customer="cus_123",
-                collection_method="send_invoice",
-                days_until_due=30,
+                {
+                    "customer": "cus_123",
+                    "collection_method": "send_invoice",
+                    "days_until_due": 30,
+                },
+                {},
             )
 
             self.assertEqual(
@@ -561,7 +610,7 @@ class TestStripeFunctions(unittest.TestCase):
             )
 
     def test_create_invoice_with_context(self):
-        with mock.patch("stripe.Invoice.create") as mock_function:
+        with mock.patch("stripe.InvoiceService.create") as mock_function:
             mock_invoice = {
                 "id": "in_123",
                 "hosted_invoice_url": "https://example.com",
@@ -574,14 +623,18 @@ class TestStripeFunctions(unittest.TestCase):
             )
 
             result = create_invoice(
-                context={"account": "acct_123"}, customer="cus_123"
+                self.client,
+                context={"account": "acct_123"},
+                customer="cus_123",
             )
 
             mock_function.assert_called_with(
-                customer="cus_123",
-                collection_method="send_invoice",
-                days_until_due=30,
-                stripe_account="acct_123",
+                {
+                    "customer": "cus_123",
+                    "collection_method": "send_invoice",
+                    "days_until_due": 30,
+                },
+                {"stripe_account": "acct_123"},
             )
 
             self.assertEqual(
@@ -595,13 +648,14 @@ class TestStripeFunctions(unittest.TestCase):
             )
 
     def test_create_invoice_item(self):
-        with mock.patch("stripe.InvoiceItem.create") as mock_function:
+        with mock.patch("stripe.InvoiceItemService.create") as mock_function:
             mock_invoice_item = {"id": "ii_123", "invoice": "in_123"}
             mock_function.return_value = stripe.InvoiceItem.construct_from(
                 mock_invoice_item, "sk_test_123"
             )
 
             result = create_invoice_item(
+                self.client,
                 context={},
                 customer="cus_123",
                 price="price_123",
@@ -609,7 +663,12 @@ class TestStripeFunctions(unittest.TestCase):
             )
 
             mock_function.assert_called_with(
-                customer="cus_123", price="price_123", invoice="in_123"
+                {
+                    "customer": "cus_123",
+                    "price": "price_123",
+                    "invoice": "in_123",
+                },
+                {},
             )
 
             self.assertEqual(
@@ -621,13 +680,14 @@ class TestStripeFunctions(unittest.TestCase):
             )
 
     def test_create_invoice_item_with_context(self):
-        with mock.patch("stripe.InvoiceItem.create") as mock_function:
+        with mock.patch("stripe.InvoiceItemService.create") as mock_function:
             mock_invoice_item = {"id": "ii_123", "invoice": "in_123"}
             mock_function.return_value = stripe.InvoiceItem.construct_from(
                 mock_invoice_item, "sk_test_123"
             )
 
             result = create_invoice_item(
+                self.client,
                 context={"account": "acct_123"},
                 customer="cus_123",
                 price="price_123",
@@ -635,10 +695,12 @@ class TestStripeFunctions(unittest.TestCase):
             )
 
             mock_function.assert_called_with(
-                customer="cus_123",
-                price="price_123",
-                invoice="in_123",
-                stripe_account="acct_123",
+                {
+                    "customer": "cus_123",
+                    "price": "price_123",
+                    "invoice": "in_123",
+                },
+                {"stripe_account": "acct_123"},
             )
 
             self.assertEqual(
@@ -650,7 +712,9 @@ class TestStripeFunctions(unittest.TestCase):
             )
 
     def test_finalize_invoice(self):
-        with mock.patch("stripe.Invoice.finalize_invoice") as mock_function:
+        with mock.patch(
+            "stripe.InvoiceService.finalize_invoice"
+        ) as mock_function:
             mock_invoice = {
                 "id": "in_123",
                 "hosted_invoice_url": "https://example.com",
@@ -662,9 +726,11 @@ class TestStripeFunctions(unittest.TestCase):
                 mock_invoice, "sk_test_123"
             )
 
-            result = finalize_invoice(context={}, invoice="in_123")
+            result = finalize_invoice(
+                self.client, context={}, invoice="in_123"
+            )
 
-            mock_function.assert_called_with(invoice="in_123")
+            mock_function.assert_called_with("in_123", {}, {})
 
             self.assertEqual(
                 result,
@@ -677,7 +743,9 @@ class TestStripeFunctions(unittest.TestCase):
             )
 
     def test_finalize_invoice_with_context(self):
-        with mock.patch("stripe.Invoice.finalize_invoice") as mock_function:
+        with mock.patch(
+            "stripe.InvoiceService.finalize_invoice"
+        ) as mock_function:
             mock_invoice = {
                 "id": "in_123",
                 "hosted_invoice_url": "https://example.com",
@@ -690,11 +758,13 @@ class TestStripeFunctions(unittest.TestCase):
             )
 
             result = finalize_invoice(
-                context={"account": "acct_123"}, invoice="in_123"
+                self.client, context={"account": "acct_123"}, invoice="in_123"
             )
 
             mock_function.assert_called_with(
-                invoice="in_123", stripe_account="acct_123"
+                "in_123",
+                {},
+                {"stripe_account": "acct_123"},
             )
 
             self.assertEqual(
@@ -708,189 +778,349 @@ class TestStripeFunctions(unittest.TestCase):
             )
 
     def test_retrieve_balance(self):
-        with mock.patch("stripe.Balance.retrieve") as mock_function:
+        with mock.patch("stripe.BalanceService.retrieve") as mock_function:
             mock_balance = {"available": [{"amount": 1000, "currency": "usd"}]}
 
             mock_function.return_value = stripe.Balance.construct_from(
                 mock_balance, "sk_test_123"
             )
 
-            result = retrieve_balance(context={})
+            result = retrieve_balance(self.client, context={})
 
-            mock_function.assert_called_with()
+            mock_function.assert_called_with({}, {})
 
             self.assertEqual(result, mock_balance)
 
     def test_retrieve_balance_with_context(self):
-        with mock.patch("stripe.Balance.retrieve") as mock_function:
+        with mock.patch("stripe.BalanceService.retrieve") as mock_function:
             mock_balance = {"available": [{"amount": 1000, "currency": "usd"}]}
 
             mock_function.return_value = stripe.Balance.construct_from(
                 mock_balance, "sk_test_123"
             )
 
-            result = retrieve_balance(context={"account": "acct_123"})
+            result = retrieve_balance(
+                self.client, context={"account": "acct_123"}
+            )
 
-            mock_function.assert_called_with(stripe_account="acct_123")
+            mock_function.assert_called_with(
+                {},
+                {"stripe_account": "acct_123"},
+            )
 
             self.assertEqual(result, mock_balance)
 
     def test_create_refund(self):
-        with mock.patch("stripe.Refund.create") as mock_function:
+        with mock.patch("stripe.RefundService.create") as mock_function:
             mock_refund = {"id": "re_123"}
             mock_function.return_value = stripe.Refund.construct_from(
                 mock_refund, "sk_test_123"
             )
 
-            result = create_refund(context={}, payment_intent="pi_123")
+            result = create_refund(
+                self.client, context={}, payment_intent="pi_123"
+            )
 
-            mock_function.assert_called_with(payment_intent="pi_123")
+            mock_function.assert_called_with({"payment_intent": "pi_123"}, {})
 
             self.assertEqual(result, {"id": mock_refund["id"]})
 
     def test_create_partial_refund(self):
-        with mock.patch("stripe.Refund.create") as mock_function:
+        with mock.patch("stripe.RefundService.create") as mock_function:
             mock_refund = {"id": "re_123"}
             mock_function.return_value = stripe.Refund.construct_from(
                 mock_refund, "sk_test_123"
             )
 
             result = create_refund(
-                context={}, payment_intent="pi_123", amount=1000
+                self.client, context={}, payment_intent="pi_123", amount=1000
             )
 
             mock_function.assert_called_with(
-                payment_intent="pi_123", amount=1000
+                {"payment_intent": "pi_123", "amount": 1000},
+                {},
             )
 
             self.assertEqual(result, {"id": mock_refund["id"]})
 
     def test_create_refund_with_context(self):
-        with mock.patch("stripe.Refund.create") as mock_function:
+        with mock.patch("stripe.RefundService.create") as mock_function:
             mock_refund = {"id": "re_123"}
             mock_function.return_value = stripe.Refund.construct_from(
                 mock_refund, "sk_test_123"
             )
 
             result = create_refund(
+                self.client,
                 context={"account": "acct_123"},
                 payment_intent="pi_123",
                 amount=1000,
             )
 
             mock_function.assert_called_with(
-                payment_intent="pi_123", amount=1000, stripe_account="acct_123"
+                {"payment_intent": "pi_123", "amount": 1000},
+                {"stripe_account": "acct_123"},
             )
 
             self.assertEqual(result, {"id": mock_refund["id"]})
 
     def test_list_payment_intents(self):
-        with mock.patch("stripe.PaymentIntent.list") as mock_function:
+        with mock.patch("stripe.PaymentIntentService.list") as mock_function:
             mock_payment_intents = [{"id": "pi_123"}, {"id": "pi_456"}]
             mock_function.return_value = stripe.ListObject.construct_from(
                 {"data": mock_payment_intents}, "sk_test_123"
             )
 
-            result = list_payment_intents(context={})
+            result = list_payment_intents(self.client, context={})
 
-            mock_function.assert_called_with()
+            mock_function.assert_called_with({}, {})
 
             self.assertEqual(result, mock_payment_intents)
 
     def test_list_payment_intents_with_context(self):
-        with mock.patch("stripe.PaymentIntent.list") as mock_function:
+        with mock.patch("stripe.PaymentIntentService.list") as mock_function:
             mock_payment_intents = [{"id": "pi_123"}, {"id": "pi_456"}]
             mock_function.return_value = stripe.ListObject.construct_from(
                 {"data": mock_payment_intents}, "sk_test_123"
             )
 
-            result = list_payment_intents(context={"account": "acct_123"})
+            result = list_payment_intents(
+                self.client, context={"account": "acct_123"}
+            )
 
-            mock_function.assert_called_with(stripe_account="acct_123")
+            mock_function.assert_called_with(
+                {},
+                {"stripe_account": "acct_123"},
+            )
 
             self.assertEqual(result, mock_payment_intents)
 
-
     def test_create_billing_portal_session(self):
-        with mock.patch("stripe.billing_portal.Session.create") as mock_function:
+        with mock.patch(
+            "stripe.billing_portal.SessionService.create"
+        ) as mock_function:
             mock_billing_portal_session = {
                 "id": "bps_123",
                 "url": "https://example.com",
                 "customer": "cus_123",
                 "configuration": "bpc_123",
             }
-            mock_function.return_value = stripe.billing_portal.Session.construct_from(
-                mock_billing_portal_session, "sk_test_123"
+            mock_function.return_value = (
+                stripe.billing_portal.Session.construct_from(
+                    mock_billing_portal_session, "sk_test_123"
+                )
             )
 
-            result = create_billing_portal_session(context={}, customer="cus_123")
+            result = create_billing_portal_session(
+                self.client, context={}, customer="cus_123"
+            )
 
-            mock_function.assert_called_with(customer="cus_123")
+            mock_function.assert_called_with({"customer": "cus_123"}, {})
 
-            self.assertEqual(result, {
-                "id": mock_billing_portal_session["id"],
-                "url": mock_billing_portal_session["url"],
-                "customer": mock_billing_portal_session["customer"],
-            })
+            self.assertEqual(
+                result,
+                {
+                    "id": mock_billing_portal_session["id"],
+                    "url": mock_billing_portal_session["url"],
+                    "customer": mock_billing_portal_session["customer"],
+                },
+            )
 
     def test_create_billing_portal_session_with_return_url(self):
-        with mock.patch("stripe.billing_portal.Session.create") as mock_function:
+        with mock.patch(
+            "stripe.billing_portal.SessionService.create"
+        ) as mock_function:
             mock_billing_portal_session = {
                 "id": "bps_123",
                 "url": "https://example.com",
                 "customer": "cus_123",
                 "configuration": "bpc_123",
             }
-            mock_function.return_value = stripe.billing_portal.Session.construct_from(
-                mock_billing_portal_session, "sk_test_123"
+            mock_function.return_value = (
+                stripe.billing_portal.Session.construct_from(
+                    mock_billing_portal_session, "sk_test_123"
+                )
             )
 
             result = create_billing_portal_session(
+                self.client,
                 context={},
                 customer="cus_123",
-                return_url="http://example.com"
+                return_url="http://example.com",
             )
 
             mock_function.assert_called_with(
-                customer="cus_123",
-                return_url="http://example.com",
+                {"customer": "cus_123", "return_url": "http://example.com"},
+                {},
             )
 
-            self.assertEqual(result, {
-                "id": mock_billing_portal_session["id"],
-                "url": mock_billing_portal_session["url"],
-                "customer": mock_billing_portal_session["customer"],
-            })
+            self.assertEqual(
+                result,
+                {
+                    "id": mock_billing_portal_session["id"],
+                    "url": mock_billing_portal_session["url"],
+                    "customer": mock_billing_portal_session["customer"],
+                },
+            )
 
     def test_create_billing_portal_session_with_context(self):
-        with mock.patch("stripe.billing_portal.Session.create") as mock_function:
+        with mock.patch(
+            "stripe.billing_portal.SessionService.create"
+        ) as mock_function:
             mock_billing_portal_session = {
                 "id": "bps_123",
                 "url": "https://example.com",
                 "customer": "cus_123",
                 "configuration": "bpc_123",
             }
-            mock_function.return_value = stripe.billing_portal.Session.construct_from(
-                mock_billing_portal_session, "sk_test_123"
+            mock_function.return_value = (
+                stripe.billing_portal.Session.construct_from(
+                    mock_billing_portal_session, "sk_test_123"
+                )
             )
 
             result = create_billing_portal_session(
+                self.client,
                 context={"account": "acct_123"},
                 customer="cus_123",
-                return_url="http://example.com"
+                return_url="http://example.com",
             )
 
             mock_function.assert_called_with(
-                customer="cus_123",
-                return_url="http://example.com",
-                stripe_account="acct_123"
+                {"customer": "cus_123", "return_url": "http://example.com"},
+                {"stripe_account": "acct_123"},
+            )
+
+            self.assertEqual(
+                result,
+                {
+                    "id": mock_billing_portal_session["id"],
+                    "url": mock_billing_portal_session["url"],
+                    "customer": mock_billing_portal_session["customer"],
+                },
+            )
+
+
+class TestStripeAsyncFunctions(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.client = stripe.StripeClient("sk_test_123")
+
+    async def test_create_customer_async(self):
+        with mock.patch(
+            "stripe.CustomerService.create_async", new_callable=mock.AsyncMock
+        ) as mock_function:
+            mock_function.return_value = stripe.Customer.construct_from(
+                {"id": "cus_123"}, "sk_test_123"
+            )
+
+            result = await create_customer_async(
+                self.client,
+                context={"account": "acct_123"},
+                name="Test User",
+                email="test@example.com",
+            )
+
+            mock_function.assert_awaited_with(
+                {"name": "Test User", "email": "test@example.com"},
+                {"stripe_account": "acct_123"},
+            )
+
+            self.assertEqual(result, {"id": "cus_123"})
+
+    async def test_list_products_async(self):
+        with mock.patch(
+            "stripe.ProductService.list_async", new_callable=mock.AsyncMock
+        ) as mock_function:
+            mock_products = [
+                {"id": "prod_123", "name": "Product One"},
+                {"id": "prod_456", "name": "Product Two"},
+            ]
+            mock_function.return_value = stripe.ListObject.construct_from(
+                {
+                    "object": "list",
+                    "data": [
+                        stripe.Product.construct_from(product, "sk_test_123")
+                        for product in mock_products
+                    ],
+                    "has_more": False,
+                    "url": "/v1/products",
+                },
+                "sk_test_123",
             )
 
-            self.assertEqual(result, {
-                "id": mock_billing_portal_session["id"],
-                "url": mock_billing_portal_session["url"],
-                "customer": mock_billing_portal_session["customer"],
-            })
+            result = await list_products_async(
+                self.client, context={}, limit=2
+            )
+
+            mock_function.assert_awaited_with({"limit": 2}, {})
+
+            self.assertEqual(result, mock_products)
+
+    async def test_finalize_invoice_async(self):
+        with mock.patch(
+            "stripe.InvoiceService.finalize_invoice_async",
+            new_callable=mock.AsyncMock,
+        ) as mock_function:
+            mock_invoice = {
+                "id": "in_123",
+                "hosted_invoice_url": "https://example.com",
+                "customer": "cus_123",
+                "status": "open",
+            }
+            mock_function.return_value = stripe.Invoice.construct_from(
+                mock_invoice, "sk_test_123"
+            )
+
+            result = await finalize_invoice_async(
+                self.client, context={}, invoice="in_123"
+            )
+
+            mock_function.assert_awaited_with("in_123", {}, {})
+
+            self.assertEqual(result, mock_invoice)
+
+    async def test_retrieve_balance_async(self):
+        with mock.patch(
+            "stripe.BalanceService.retrieve_async", new_callable=mock.AsyncMock
+        ) as mock_function:
+            mock_balance = {"available": [{"amount": 1000, "currency": "usd"}]}
+            mock_function.return_value = stripe.Balance.construct_from(
+                mock_balance, "sk_test_123"
+            )
+
+            result = await retrieve_balance_async(
+                self.client, context={"account": "acct_123"}
+            )
+
+            mock_function.assert_awaited_with(
+                {},
+                {"stripe_account": "acct_123"},
+            )
+
+            self.assertEqual(result, mock_balance)
+
+    async def test_create_refund_async_with_context(self):
+        with mock.patch(
+            "stripe.RefundService.create_async", new_callable=mock.AsyncMock
+        ) as mock_function:
+            mock_refund = {"id": "re_123"}
+            mock_function.return_value = stripe.Refund.construct_from(
+                mock_refund, "sk_test_123"
+            )
+
+            result = await create_refund_async(
+                self.client,
+                context={"account": "acct_123"},
+                payment_intent="pi_123",
+            )
+
+            mock_function.assert_awaited_with(
+                {"payment_intent": "pi_123"},
+                {"stripe_account": "acct_123"},
+            )
+
+            self.assertEqual(result, mock_refund)
+
 
 if __name__ == "__main__":
     unittest.main()
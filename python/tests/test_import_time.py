@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Generous ceiling on the time spent in the toolkit's own modules, to catch
+# regressions such as eager imports without making the test flaky.
+MAX_OWN_IMPORT_MS = 150
+
+
+def _import_times(module: str) -> dict:
+    """Self times in microseconds from ``python -X importtime``."""
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(self_us)
+    return times
+
+
+class TestImportTime(unittest.TestCase):
+    def test_stripe_is_imported_on_first_use(self):
+        for module in (
+            "stripe_agent_toolkit.api",
+            "stripe_agent_toolkit.langchain.toolkit",
+        ):
+            imported = _import_times(module)
+
+            self.assertIn(module, imported)
+            self.assertNotIn("stripe", imported)
+
+    def test_schemas_and_functions_are_imported_on_first_use(self):
+        imported = _import_times("stripe_agent_toolkit.api")
+
+        self.assertNotIn("stripe_agent_toolkit.schema", imported)
+        self.assertNotIn("stripe_agent_toolkit.prompts", imported)
+        self.assertNotIn("stripe_agent_toolkit.functions", imported)
+
+    def test_own_import_time(self):
+        imported = _import_times("stripe_agent_toolkit.api")
+
+        own_us = sum(
+            self_us
+            for name, self_us in imported.items()
+            if name.split(".")[0] == "stripe_agent_toolkit"
+        )
+        self.assertLess(own_us / 1000, MAX_OWN_IMPORT_MS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+import stripe
+from unittest import mock
+from langchain_core.language_models.fake_chat_models import (
+    GenericFakeChatModel,
+)
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+from stripe_agent_toolkit.langchain.toolkit import StripeAgentToolkit
+
+
+class TestStripeAgentToolkit(unittest.TestCase):
+    def test_with_account(self):
+        toolkit = StripeAgentToolkit(
+            "sk_test_123",
+            {"actions": {"customers": {"create": True}}},
+        )
+
+        (tool,) = toolkit.with_account("acct_123").get_tools()
+
+        with mock.patch("stripe.CustomerService.create") as mock_function:
+            mock_function.return_value = stripe.Customer.construct_from(
+                {"id": "cus_123"}, "sk_test_123"
+            )
+
+            tool.invoke({"name": "Test User"})
+
+            self.assertEqual(
+                mock_function.call_args[0][1]["stripe_account"], "acct_123"
+            )
+        self.assertIs(tool.args_schema, toolkit.get_tools()[0].args_schema)
+        self.assertIs(
+            tool.stripe_api._client, toolkit.get_tools()[0].stripe_api._client
+        )
+
+
+class TestBillingCallbackHandler(unittest.TestCase):
+    def setUp(self):
+        self.toolkit = StripeAgentToolkit("sk_test_123", {"actions": {}})
+        self.emit = mock.patch.object(
+            self.toolkit.meter_event_emitter, "emit"
+        ).start()
+        self.addCleanup(mock.patch.stopall)
+
+        def messages():
+            while True:
+                yield AIMessage(
+                    content="Hello",
+                    usage_metadata={
+                        "input_tokens": 10,
+                        "output_tokens": 3,
+                        "total_tokens": 13,
+                    },
+                )
+
+        self.model = GenericFakeChatModel(messages=messages())
+
+    def test_sums_token_usage_per_run(self):
+        callback = self.toolkit.billing_callback(
+            type="token",
+            customer="cus_123",
+            meters={"input": "input_tokens", "output": "output_tokens"},
+        )
+        chain = RunnableLambda(
+            lambda text: [self.model.invoke(text) for _ in range(2)]
+        )
+
+        chain.invoke("Hi", config={"callbacks": [callback]})
+
+        self.assertEqual(
+            self.emit.call_args_list,
+            [
+                mock.call(
+                    "input_tokens",
+                    "cus_123",
+                    20,
+                    account=None,
+                    secret_key="sk_test_123",
+                ),
+                mock.call(
+                    "output_tokens",
+                    "cus_123",
+                    6,
+                    account=None,
+                    secret_key="sk_test_123",
+                ),
+            ],
+        )
+
+    def test_records_outcomes(self):
+        callback = self.toolkit.billing_callback(
+            type="outcome", customer="cus_123", meter="runs"
+        )
+        chain = RunnableLambda(lambda text: self.model.invoke(text))
+
+        chain.invoke("Hi", config={"callbacks": [callback]})
+        self.model.invoke("Hi", config={"callbacks": [callback]})
+
+        call = mock.call(
+            "runs", "cus_123", account=None, secret_key="sk_test_123"
+        )
+        self.assertEqual(self.emit.call_args_list, [call, call])
+
+    def test_failed_runs_are_not_outcomes(self):
+        callback = self.toolkit.billing_callback(
+            type="outcome", customer="cus_123", meter="runs"
+        )
+
+        def fail(text):
+            raise ValueError(text)
+
+        with self.assertRaises(ValueError):
+            RunnableLambda(fail).invoke("Hi", config={"callbacks": [callback]})
+
+        self.emit.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,483 @@
+import asyncio
+import gc
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import unittest
+import weakref
+from unittest import mock
+from stripe_agent_toolkit.api import StripeAPI
+from stripe_agent_toolkit.clients import StripeClientRegistry
+from stripe_agent_toolkit.metering import (
+    BillingMeter,
+    MeterEvent,
+    MeterEventEmitter,
+    UsageAggregator,
+    deliver,
+)
+from stripe_agent_toolkit.retries import RetryPolicy, is_retryable
+from stripe_agent_toolkit.routing import route
+from stripe_agent_toolkit.testing import FakeStripe, FakeStripeServer
+
+
+class TestMeterEventEmitter(unittest.TestCase):
+    def setUp(self):
+        self.stripe = mock.Mock(uses_meter_event_stream=False, account=None)
+        self.emitter = MeterEventEmitter(
+            self.stripe,
+            flush_interval=60,
+            retry=RetryPolicy(base_delay=0, max_delay=0),
+        )
+        self.addCleanup(self.emitter.close, 5)
+
+    def test_emit_does_not_wait_on_stripe(self):
+        release = threading.Event()
+        self.stripe.create_meter_event.side_effect = (
+            lambda *args, **kwargs: release.wait(5)
+        )
+
+        started = time.monotonic()
+        self.emitter.emit("tokens", "cus_123", 42)
+        self.assertLess(time.monotonic() - started, 0.5)
+
+        release.set()
+        self.assertTrue(self.emitter.flush(5))
+        args, kwargs = self.stripe.create_meter_event.call_args
+        self.assertEqual(args, ("tokens", "cus_123", "42"))
+        self.assertTrue(kwargs["identifier"].startswith("stripe-agent"))
+        self.assertIsInstance(kwargs["timestamp"], int)
+
+    def test_sends_full_batches_without_waiting(self):
+        self.emitter.max_batch = 2
+        sent = threading.Event()
+        self.stripe.create_meter_event.side_effect = (
+            lambda *args, **kwargs: sent.set()
+        )
+
+        self.emitter.emit("tokens", "cus_123", 1)
+        self.assertFalse(sent.wait(0.2))
+        self.emitter.emit("tokens", "cus_123", 2)
+
+        self.assertTrue(sent.wait(5))
+
+    def test_sends_after_flush_interval(self):
+        self.emitter.flush_interval = 0.05
+        sent = threading.Event()
+        self.stripe.create_meter_event.side_effect = (
+            lambda *args, **kwargs: sent.set()
+        )
+
+        self.emitter.emit("tokens", "cus_123", 1)
+
+        self.assertTrue(sent.wait(5))
+
+    def test_retries_with_the_same_identifier(self):
+        import stripe
+
+        self.stripe.create_meter_event.side_effect = [
+            stripe.APIError("Server error", http_status=500),
+            None,
+        ]
+
+        self.emitter.emit("tokens", "cus_123", 1)
+        self.emitter.flush(5)
+
+        first, second = self.stripe.create_meter_event.call_args_list
+        self.assertEqual(first[1]["identifier"], second[1]["identifier"])
+        self.assertEqual((self.emitter.sent, self.emitter.failed), (1, 0))
+
+    def test_drops_when_full(self):
+        self.emitter.max_queue = 1
+        release = threading.Event()
+        self.stripe.create_meter_event.side_effect = (
+            lambda *args, **kwargs: release.wait(5)
+        )
+
+        self.assertTrue(self.emitter.emit("tokens", "cus_123", 1))
+        self.assertFalse(self.emitter.emit("tokens", "cus_123", 2))
+        release.set()
+
+        self.assertEqual(self.emitter.dropped, 1)
+
+    def test_close_drains_queue(self):
+        for i in range(5):
+            self.emitter.emit("tokens", "cus_123", i)
+
+        self.assertTrue(self.emitter.close(5))
+
+        self.assertEqual(self.stripe.create_meter_event.call_count, 5)
+        self.assertFalse(self.emitter.emit("tokens", "cus_123", 5))
+
+    def test_stops_when_idle(self):
+        self.emitter.idle_timeout = 0.05
+        self.emitter.emit("tokens", "cus_123", 1)
+        thread = self.emitter._thread
+        self.emitter.flush(5)
+        thread.join(5)
+        self.assertIsNone(self.emitter._thread)
+
+        self.emitter.emit("tokens", "cus_123", 2)
+        self.assertTrue(self.emitter.flush(5))
+        self.assertEqual(self.stripe.create_meter_event.call_count, 2)
+
+    def test_idle_emitters_can_be_collected(self):
+        emitter = MeterEventEmitter(self.stripe, idle_timeout=0.05)
+        emitter.emit("tokens", "cus_123", 1)
+        thread = emitter._thread
+        emitter.flush(5)
+        thread.join(5)
+
+        reference = weakref.ref(emitter)
+        del emitter
+        gc.collect()
+
+        self.assertIsNone(reference())
+
+    def test_exit_is_not_held_up_by_stripe(self):
+        # Stripe accepts connections but never answers.
+        server = socket.socket()
+        self.addCleanup(server.close)
+        server.bind(("127.0.0.1", 0))
+        server.listen()
+        script = (
+            "from stripe_agent_toolkit.api import StripeAPI\n"
+            "from stripe_agent_toolkit.metering import MeterEventEmitter\n"
+            "api = StripeAPI('sk_test_123', None,"
+            " configuration={'api_base': 'http://127.0.0.1:%d'})\n"
+            "emitter = MeterEventEmitter(api, exit_timeout=0.5)\n"
+            "emitter.emit('tokens', 'cus_123', 1)\n"
+        ) % server.getsockname()[1]
+
+        started = time.monotonic()
+        subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            check=True,
+            timeout=30,
+        )
+
+        self.assertLess(time.monotonic() - started, 15)
+
+    def test_sends_batches_on_the_stream(self):
+        self.stripe.uses_meter_event_stream = True
+        self.stripe.create_meter_events.return_value = [None] * 3
+
+        for i in range(3):
+            self.emitter.emit("tokens", "cus_123", i)
+        self.emitter.flush(5)
+
+        (call,) = self.stripe.create_meter_events.call_args_list
+        self.assertEqual(
+            [event.value for event in call[0][0]], ["0", "1", "2"]
+        )
+        self.assertEqual(self.emitter.sent, 3)
+
+    def test_sends_events_for_their_account(self):
+        self.stripe.bind.return_value.uses_meter_event_stream = False
+
+        self.emitter.emit("tokens", "cus_123", 1, account="acct_123")
+        self.emitter.flush(5)
+
+        self.stripe.bind.assert_called_once_with({"account": "acct_123"})
+        self.stripe.bind.return_value.create_meter_event.assert_called_once()
+        self.stripe.create_meter_event.assert_not_called()
+
+
+class TestMeterEventAccounts(unittest.TestCase):
+    def test_events_follow_views_and_routes(self):
+        server = FakeStripeServer(FakeStripe(seed=0)).start()
+        self.addCleanup(server.stop)
+        api = StripeAPI(
+            secret_key="sk_test_123",
+            context=None,
+            registry=StripeClientRegistry(),
+            configuration={"api_base": server.url},
+        )
+        emitter = MeterEventEmitter(api)
+        self.addCleanup(emitter.close, 5)
+
+        view = api.bind({"account": "acct_123"})
+        BillingMeter(
+            emitter, "outcome", "cus_123", "runs", stripe=view
+        ).record()
+        with route({"account": "acct_9"}):
+            emitter.emit("runs", "cus_123")
+        emitter.flush(5)
+
+        for account, count in (("acct_123", 1), ("acct_9", 1), (None, 0)):
+            self.assertEqual(
+                len(server.fake.objects("meter_events", account)), count
+            )
+
+    def test_events_are_sent_with_the_key_of_their_route(self):
+        server = FakeStripeServer(FakeStripe(seed=0)).start()
+        self.addCleanup(server.stop)
+        registry = StripeClientRegistry()
+        api = StripeAPI(
+            secret_key="sk_test_platform",
+            context=None,
+            registry=registry,
+            configuration={"api_base": server.url},
+        )
+        emitter = MeterEventEmitter(api)
+        self.addCleanup(emitter.close, 5)
+
+        with mock.patch.object(
+            registry, "get", wraps=registry.get
+        ) as get_client:
+            with route({"account": "acct_T"}, secret_key="sk_test_tenant"):
+                emitter.emit("runs", "cus_123")
+            emitter.flush(5)
+
+        self.assertEqual(
+            [call[0][0] for call in get_client.call_args_list],
+            ["sk_test_tenant"],
+        )
+        self.assertEqual(len(server.fake.objects("meter_events", "acct_T")), 1)
+
+
+class TestMeterEventStream(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeStripeServer(FakeStripe(seed=0)).start()
+        self.addCleanup(self.server.stop)
+        self.api = StripeAPI(
+            secret_key="sk_test_123",
+            context=None,
+            registry=StripeClientRegistry(),
+            configuration={
+                "api_base": self.server.url,
+                "meter_event_stream": True,
+            },
+        )
+
+    def _events(self, count):
+        return [
+            MeterEvent("tokens", "cus_123", str(i), "event_%d" % i, 1700000000)
+            for i in range(count)
+        ]
+
+    def test_sends_many_events_per_request(self):
+        self.api.create_meter_events(self._events(150))
+        self.api.create_meter_events(self._events(1))
+
+        requests = self.server.fake.requests
+        self.assertEqual(requests["POST /v2/billing/meter_event_session"], 1)
+        self.assertEqual(requests["POST /v2/billing/meter_event_stream"], 3)
+        events = self.server.fake.objects("meter_events")
+        self.assertEqual(len(events), 150)
+        self.assertEqual(events[0]["timestamp"], "2023-11-14T22:13:20Z")
+
+    def test_refreshes_expired_sessions(self):
+        self.api.create_meter_events(self._events(1))
+        self.server.fake.expire_sessions()
+
+        self.api.create_meter_events(self._events(1))
+
+        requests = self.server.fake.requests
+        self.assertEqual(requests["POST /v2/billing/meter_event_session"], 2)
+        self.assertEqual(self.server.fake.statuses[401], 1)
+
+    def test_falls_back_to_v1(self):
+        self.server.fake.meter_event_stream = False
+
+        self.api.create_meter_events(self._events(2))
+
+        self.assertFalse(self.api.uses_meter_event_stream)
+        self.assertEqual(
+            self.server.fake.requests["POST /v1/billing/meter_events"], 2
+        )
+        self.assertEqual(len(self.server.fake.objects("meter_events")), 2)
+
+    def test_async(self):
+        asyncio.run(self.api.create_meter_events_async(self._events(2)))
+
+        self.assertEqual(len(self.server.fake.objects("meter_events")), 2)
+
+    def test_reports_each_event(self):
+        events = self._events(3)
+        events[1] = events[1]._replace(customer="")
+
+        outcomes = self.api.create_meter_events(events)
+
+        self.assertEqual(
+            [error is None for error in outcomes], [True, False, True]
+        )
+        self.assertEqual(len(self.server.fake.objects("meter_events")), 2)
+        self.assertTrue(self.api.uses_meter_event_stream)
+
+    def test_duplicates_are_delivered(self):
+        self.server.fake.meter_event_stream = False
+        self.api.create_meter_events(self._events(2))
+
+        outcomes = self.api.create_meter_events(self._events(3))
+
+        self.assertEqual(outcomes, [None, None, None])
+        self.assertEqual(len(self.server.fake.objects("meter_events")), 3)
+
+    def test_transient_errors_fail_the_rest(self):
+        self.server.fake.fail_next(500, count=10)
+
+        outcomes = self.api.create_meter_events(self._events(150))
+
+        self.assertEqual(len(outcomes), 150)
+        self.assertTrue(all(is_retryable(error) for error in outcomes))
+        self.assertTrue(self.api.uses_meter_event_stream)
+
+    def test_deliver_retries_transient_errors(self):
+        self.server.fake.fail_next(500)
+        events = self._events(2) + [
+            event._replace(account="acct_123") for event in self._events(1)
+        ]
+
+        outcomes = deliver(
+            self.api, events, RetryPolicy(base_delay=0, max_delay=0)
+        )
+
+        self.assertEqual(outcomes, [None, None, None])
+        self.assertEqual(len(self.server.fake.objects("meter_events")), 2)
+        self.assertEqual(
+            len(self.server.fake.objects("meter_events", "acct_123")), 1
+        )
+
+
+class TestUsageAggregator(unittest.TestCase):
+    def setUp(self):
+        self.emitter = mock.Mock()
+        self.emitter.stripe.account = None
+        self.emitter.stripe.secret_key = "sk_test_123"
+        self.aggregator = UsageAggregator(
+            self.emitter, window=3600, source="worker-1"
+        )
+        self.addCleanup(self.aggregator.close, 5)
+
+    def test_sums_usage_per_customer_and_meter(self):
+        self.aggregator.emit("input_tokens", "cus_123", 10)
+        self.aggregator.emit("input_tokens", "cus_123", "15")
+        self.aggregator.emit("output_tokens", "cus_123", 7)
+        self.aggregator.emit("runs", "cus_456")
+        self.aggregator.emit("runs", "cus_456")
+
+        self.aggregator.flush(5)
+
+        events = {
+            call[0]: call[1] for call in self.emitter.emit.call_args_list
+        }
+        self.assertEqual(
+            set(events),
+            {
+                ("input_tokens", "cus_123", 25),
+                ("output_tokens", "cus_123", 7),
+                ("runs", "cus_456", 2),
+            },
+        )
+        kwargs = events[("input_tokens", "cus_123", 25)]
+        self.assertEqual(kwargs["timestamp"] % 3600, 0)
+        self.assertEqual(
+            kwargs["identifier"],
+            self.aggregator.identifier(
+                "input_tokens", "cus_123", kwargs["timestamp"], 0
+            ),
+        )
+        self.emitter.flush.assert_called_once()
+
+    def test_identifiers_are_deterministic_and_unique(self):
+        other = UsageAggregator(self.emitter, window=3600, source="worker-1")
+
+        self.assertEqual(
+            self.aggregator.identifier("tokens", "cus_123", 0, 0),
+            other.identifier("tokens", "cus_123", 0, 0),
+        )
+        self.assertNotEqual(
+            self.aggregator.identifier("tokens", "cus_123", 0, 0),
+            self.aggregator.identifier("tokens", "cus_123", 0, 1),
+        )
+        self.assertNotEqual(
+            self.aggregator.identifier("tokens", "cus_123", 0, 0),
+            self.aggregator.identifier("tokens", "cus_123", 0, 0, "acct_1"),
+        )
+
+    def test_sums_usage_per_account(self):
+        self.aggregator.emit("tokens", "cus_123", 1)
+        self.aggregator.emit("tokens", "cus_123", 2, account="acct_123")
+        self.aggregator.emit("tokens", "cus_123", 3, account="acct_123")
+        # Defaults to the account of the emitter, under the current route.
+        self.emitter.stripe.account = "acct_9"
+        self.aggregator.emit("tokens", "cus_123", 4)
+
+        self.aggregator.flush(5)
+
+        self.assertEqual(
+            sorted(
+                (call[1]["account"] or "", call[0][2])
+                for call in self.emitter.emit.call_args_list
+            ),
+            [("", 1), ("acct_123", 5), ("acct_9", 4)],
+        )
+
+    def test_sums_usage_per_key(self):
+        self.aggregator.emit("tokens", "cus_123", 1)
+        self.aggregator.emit("tokens", "cus_123", 2, secret_key="sk_tenant")
+
+        self.aggregator.flush(5)
+
+        own, tenant = sorted(
+            self.emitter.emit.call_args_list, key=lambda call: call[0][2]
+        )
+        self.assertEqual(own[1]["secret_key"], "sk_test_123")
+        self.assertEqual(tenant[1]["secret_key"], "sk_tenant")
+        self.assertNotEqual(own[1]["identifier"], tenant[1]["identifier"])
+
+    def test_flushing_an_open_window_twice(self):
+        self.aggregator.emit("tokens", "cus_123", 1)
+        self.aggregator.flush(5)
+        self.aggregator.emit("tokens", "cus_123", 2)
+        self.aggregator.flush(5)
+
+        first, second = self.emitter.emit.call_args_list
+        self.assertEqual((first[0][2], second[0][2]), (1, 2))
+        self.assertNotEqual(first[1]["identifier"], second[1]["identifier"])
+
+    def test_forwards_windows_when_they_end(self):
+        self.aggregator.window = 0.1
+        forwarded = threading.Event()
+        self.emitter.emit.side_effect = lambda *a, **k: forwarded.set()
+
+        self.aggregator.emit("tokens", "cus_123", 1)
+
+        self.assertTrue(forwarded.wait(5))
+
+
+class TestBillingMeter(unittest.TestCase):
+    def test_token(self):
+        emitter = mock.Mock()
+        meter = BillingMeter(
+            emitter,
+            "token",
+            "cus_123",
+            meters={"input": "input_tokens", "output": "output_tokens"},
+        )
+
+        meter.record(10, 20)
+        meter.record(None, None)
+
+        self.assertEqual(
+            emitter.emit.call_args_list,
+            [
+                mock.call("input_tokens", "cus_123", 10),
+                mock.call("output_tokens", "cus_123", 20),
+            ],
+        )
+
+    def test_outcome(self):
+        emitter = mock.Mock()
+
+        BillingMeter(emitter, "outcome", "cus_123", meter="runs").record()
+
+        emitter.emit.assert_called_once_with("runs", "cus_123")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from stripe_agent_toolkit.openai.toolkit import StripeAgentToolkit
+from stripe_agent_toolkit.routing import route
+
+
+class TestStripeAgentToolkit(unittest.TestCase):
+    def setUp(self):
+        self.configuration = {"actions": {"customers": {"create": True}}}
+
+    def test_tool_schema(self):
+        toolkit = StripeAgentToolkit("sk_test_123", self.configuration)
+        (tool,) = toolkit.get_tools()
+
+        self.assertEqual(
+            tool.params_json_schema,
+            {
+                "type": "object",
+                "additionalProperties": False,
+                "properties": {
+                    "name": {
+                        "description": "The name of the customer.",
+                        "type": "string",
+                    },
+                    "email": {
+                        "anyOf": [{"type": "string"}, {"type": "null"}],
+                        "description": "The email of the customer.",
+                    },
+                },
+                "required": ["name"],
+            },
+        )
+
+    def test_toolkits_share_tool_schemas(self):
+        first = StripeAgentToolkit("sk_test_123", self.configuration)
+        second = StripeAgentToolkit("sk_test_456", self.configuration)
+
+        self.assertIs(
+            first.get_tools()[0].params_json_schema,
+            second.get_tools()[0].params_json_schema,
+        )
+
+    def test_with_account(self):
+        toolkit = StripeAgentToolkit("sk_test_123", self.configuration)
+
+        view = toolkit.with_account("acct_123")
+
+        self.assertEqual(view._stripe_api._context, {"account": "acct_123"})
+        self.assertEqual(toolkit._stripe_api._context, {})
+        self.assertIs(view._stripe_api._client, toolkit._stripe_api._client)
+        self.assertIs(
+            view.get_tools()[0].params_json_schema,
+            toolkit.get_tools()[0].params_json_schema,
+        )
+
+
+class TestBillingHooks(unittest.TestCase):
+    def test_on_end_emits_token_usage(self):
+        toolkit = StripeAgentToolkit("sk_test_123", {"actions": {}})
+        hooks = toolkit.billing_hook(
+            type="token",
+            customer="cus_123",
+            meters={"input": "input_tokens", "output": "output_tokens"},
+        )
+        context = SimpleNamespace(
+            usage=SimpleNamespace(input_tokens=10, output_tokens=20)
+        )
+
+        with mock.patch.object(
+            toolkit.meter_event_emitter, "emit"
+        ) as mock_emit:
+            asyncio.run(hooks.on_end(context, None, None))
+
+        self.assertIs(hooks.emitter, toolkit.meter_event_emitter)
+        mock_emit.assert_has_calls(
+            [
+                mock.call(
+                    "input_tokens",
+                    "cus_123",
+                    10,
+                    account=None,
+                    secret_key="sk_test_123",
+                ),
+                mock.call(
+                    "output_tokens",
+                    "cus_123",
+                    20,
+                    account=None,
+                    secret_key="sk_test_123",
+                ),
+            ]
+        )
+
+    def test_views_emit_for_their_account(self):
+        toolkit = StripeAgentToolkit("sk_test_123", {"actions": {}})
+        hooks = toolkit.with_account("acct_123").billing_hook(
+            type="outcome", customer="cus_123", meter="runs"
+        )
+        context = SimpleNamespace(
+            usage=SimpleNamespace(input_tokens=10, output_tokens=20)
+        )
+
+        with mock.patch.object(
+            toolkit.meter_event_emitter, "emit"
+        ) as mock_emit:
+            asyncio.run(hooks.on_end(context, None, None))
+            with route({"account": "acct_9"}, secret_key="sk_tenant"):
+                asyncio.run(hooks.on_end(context, None, None))
+
+        self.assertEqual(
+            mock_emit.call_args_list,
+            [
+                mock.call(
+                    "runs",
+                    "cus_123",
+                    account="acct_123",
+                    secret_key="sk_test_123",
+                ),
+                mock.call(
+                    "runs", "cus_123", account="acct_9", secret_key="sk_tenant"
+                ),
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
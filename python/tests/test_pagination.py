@@ -0,0 +1,183 @@
+import unittest
+import stripe
+from unittest import mock
+from stripe_agent_toolkit.pagination import (
+    decode_page_token,
+    encode_page_token,
+    iter_list,
+    paginate,
+    paginate_async,
+    projected,
+)
+
+
+def _list_page(ids, has_more):
+    return stripe.ListObject.construct_from(
+        {
+            "object": "list",
+            "data": [{"id": id, "object": "product"} for id in ids],
+            "has_more": has_more,
+            "url": "/v1/products",
+        },
+        "sk_test_123",
+    )
+
+
+class TestPagination(unittest.TestCase):
+    def test_page_token_round_trip(self):
+        token = encode_page_token("prod_123")
+
+        self.assertNotIn("prod_123", token)
+        self.assertEqual(decode_page_token(token), "prod_123")
+
+    def test_invalid_page_token(self):
+        with self.assertRaises(ValueError):
+            decode_page_token("not a token")
+
+    def test_iter_list_follows_cursors(self):
+        list_page = mock.Mock(
+            side_effect=[
+                _list_page(["prod_1", "prod_2"], True),
+                _list_page(["prod_3"], False),
+            ]
+        )
+
+        objects = [
+            (obj.id, has_more)
+            for obj, has_more in iter_list(list_page, {"limit": 2}, {})
+        ]
+
+        self.assertEqual(
+            objects,
+            [("prod_1", True), ("prod_2", True), ("prod_3", False)],
+        )
+        list_page.assert_called_with(
+            {"limit": 2, "starting_after": "prod_2"}, {}
+        )
+
+    def test_paginate_stops_at_item_budget(self):
+        list_page = mock.Mock(
+            side_effect=[
+                _list_page(["prod_1", "prod_2"], True),
+                _list_page(["prod_3"], True),
+            ]
+        )
+
+        result = paginate(list_page, {}, {}, max_items=3)
+
+        self.assertEqual(
+            [obj["id"] for obj in result["data"]],
+            ["prod_1", "prod_2", "prod_3"],
+        )
+        self.assertEqual(
+            decode_page_token(result["next_page_token"]), "prod_3"
+        )
+        # The last page only asks for the objects that remain.
+        self.assertEqual(
+            list_page.call_args_list,
+            [
+                mock.call({"limit": 3}, {}),
+                mock.call({"limit": 1, "starting_after": "prod_2"}, {}),
+            ],
+        )
+
+    def test_limit_caps_item_budget(self):
+        list_page = mock.Mock(
+            return_value=_list_page(["prod_1", "prod_2", "prod_3"], True)
+        )
+
+        result = paginate(list_page, {"limit": 3}, {}, max_items=20)
+
+        list_page.assert_called_once_with({"limit": 3}, {})
+        self.assertEqual(len(result["data"]), 3)
+        self.assertEqual(
+            decode_page_token(result["next_page_token"]), "prod_3"
+        )
+
+    def test_paginate_does_not_fetch_past_budget(self):
+        list_page = mock.Mock(return_value=_list_page(["prod_1"], True))
+
+        result = paginate(list_page, {}, {}, max_items=1)
+
+        list_page.assert_called_once_with({"limit": 1}, {})
+        self.assertEqual(
+            decode_page_token(result["next_page_token"]), "prod_1"
+        )
+
+    def test_paginate_stops_at_byte_budget(self):
+        list_page = mock.Mock(
+            return_value=_list_page(["prod_1", "prod_2", "prod_3"], False)
+        )
+
+        result = paginate(
+            list_page, {}, {}, max_bytes=70, transform=lambda obj: obj.id
+        )
+
+        self.assertEqual(result["data"], ["prod_1", "prod_2", "prod_3"])
+        self.assertIsNone(result["next_page_token"])
+
+        result = paginate(
+            list_page, {}, {}, max_bytes=20, transform=lambda obj: obj.id
+        )
+
+        self.assertEqual(result["data"], ["prod_1", "prod_2"])
+        self.assertEqual(
+            decode_page_token(result["next_page_token"]), "prod_2"
+        )
+
+    def test_paginate_measures_byte_budget_on_projected_objects(self):
+        page = _list_page(["prod_1", "prod_2", "prod_3"], False)
+        for obj in page.data:
+            obj["description"] = "x" * 100
+        list_page = mock.Mock(return_value=page)
+
+        result = paginate(list_page, {}, {}, max_bytes=50)
+
+        self.assertEqual(len(result["data"]), 1)
+
+        with projected(["id"]):
+            result = paginate(list_page, {}, {}, max_bytes=50)
+
+        self.assertEqual(len(result["data"]), 3)
+        self.assertIsNone(result["next_page_token"])
+
+    def test_paginate_resumes_from_page_token(self):
+        list_page = mock.Mock(return_value=_list_page(["prod_3"], False))
+
+        result = paginate(
+            list_page,
+            {"limit": 10},
+            {"stripe_account": "acct_123"},
+            page_token=encode_page_token("prod_2"),
+        )
+
+        list_page.assert_called_once_with(
+            {"limit": 10, "starting_after": "prod_2"},
+            {"stripe_account": "acct_123"},
+        )
+        self.assertEqual(
+            result["data"], [{"id": "prod_3", "object": "product"}]
+        )
+        self.assertIsNone(result["next_page_token"])
+
+
+class TestPaginationAsync(unittest.IsolatedAsyncioTestCase):
+    async def test_paginate_async(self):
+        list_page = mock.AsyncMock(
+            side_effect=[
+                _list_page(["prod_1", "prod_2"], True),
+                _list_page(["prod_3"], False),
+            ]
+        )
+
+        result = await paginate_async(list_page, {}, {}, max_items=5)
+
+        self.assertEqual(
+            [obj["id"] for obj in result["data"]],
+            ["prod_1", "prod_2", "prod_3"],
+        )
+        self.assertIsNone(result["next_page_token"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import json
+import unittest
+import stripe
+from unittest import mock
+from stripe_agent_toolkit.api import StripeAPI
+from stripe_agent_toolkit.projection import project
+
+
+class TestProject(unittest.TestCase):
+    def test_object(self):
+        obj = stripe.Price.construct_from(
+            {"id": "price_123", "unit_amount": 100, "livemode": False},
+            "sk_test_123",
+        )
+
+        self.assertEqual(
+            project(obj, ["id", "unit_amount", "currency"]),
+            {"id": "price_123", "unit_amount": 100},
+        )
+
+    def test_list_and_paginated_window(self):
+        objects = [{"id": "prod_123", "name": "Shirt", "images": []}]
+
+        self.assertEqual(project(objects, ["id"]), [{"id": "prod_123"}])
+        self.assertEqual(
+            project({"data": objects, "next_page_token": "abc"}, ["id"]),
+            {"data": [{"id": "prod_123"}], "next_page_token": "abc"},
+        )
+
+    def test_none_keeps_everything(self):
+        obj = {"id": "prod_123", "images": []}
+
+        self.assertIs(project(obj, None), obj)
+
+
+class TestStripeAPIProjection(unittest.TestCase):
+    def setUp(self):
+        self.product = stripe.Product.construct_from(
+            {
+                "id": "prod_123",
+                "object": "product",
+                "name": "Shirt",
+                "images": ["https://example.com/shirt.png"],
+                "metadata": {},
+            },
+            "sk_test_123",
+        )
+
+    def test_default_projection(self):
+        with mock.patch("stripe.ProductService.create") as mock_function:
+            mock_function.return_value = self.product
+
+            api = StripeAPI(secret_key="sk_test_123", context=None)
+            result = api.run("create_product", name="Shirt")
+
+            self.assertEqual(
+                json.loads(result), {"id": "prod_123", "name": "Shirt"}
+            )
+
+    def test_configured_projection(self):
+        with mock.patch("stripe.ProductService.create") as mock_function:
+            mock_function.return_value = self.product
+
+            api = StripeAPI(
+                secret_key="sk_test_123",
+                context=None,
+                configuration={
+                    "projections": {"create_product": ["id", "images"]}
+                },
+            )
+            result = api.run("create_product", name="Shirt")
+
+            self.assertEqual(
+                json.loads(result),
+                {
+                    "id": "prod_123",
+                    "images": ["https://example.com/shirt.png"],
+                },
+            )
+
+    def test_projection_disabled(self):
+        with mock.patch("stripe.ProductService.create") as mock_function:
+            mock_function.return_value = self.product
+
+            api = StripeAPI(
+                secret_key="sk_test_123",
+                context=None,
+                configuration={"projections": {"create_product": None}},
+            )
+            result = api.run("create_product", name="Shirt")
+
+            self.assertEqual(json.loads(result), self.product)
+
+
+if __name__ == "__main__":
+    unittest.main()
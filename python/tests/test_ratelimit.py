@@ -0,0 +1,143 @@
+import asyncio
+import threading
+import unittest
+import stripe
+from unittest import mock
+from stripe_agent_toolkit.api import StripeAPI
+from stripe_agent_toolkit.ratelimit import (
+    AdaptiveBucket,
+    RateLimiter,
+    retry_after,
+)
+
+
+class TestAdaptiveBucket(unittest.TestCase):
+    def test_tokens_refill_at_rate(self):
+        with mock.patch("time.monotonic", return_value=100):
+            bucket = AdaptiveBucket(rate=2, burst=1)
+
+            self.assertEqual(bucket._reserve(), 0)
+            bucket.release()
+            self.assertAlmostEqual(bucket._reserve(), 0.5)
+
+        with mock.patch("time.monotonic", return_value=100.5):
+            self.assertEqual(bucket._reserve(), 0)
+
+    def test_concurrency_limit(self):
+        bucket = AdaptiveBucket(rate=100, max_concurrency=1)
+
+        self.assertEqual(bucket._reserve(), 0)
+        self.assertIsNone(bucket._reserve())
+        bucket.release()
+        self.assertEqual(bucket._reserve(), 0)
+
+    def test_throttling_shrinks_and_success_recovers(self):
+        bucket = AdaptiveBucket(rate=20, max_concurrency=8)
+
+        bucket.acquire()
+        bucket.release(throttled=True)
+
+        self.assertEqual(bucket.rate, 10)
+        self.assertEqual(bucket.concurrency, 4)
+
+        for _ in range(10):
+            bucket.acquire()
+            bucket.release()
+
+        self.assertEqual(bucket.rate, 20)
+        self.assertGreater(bucket.concurrency, 4)
+
+    def test_retry_after_blocks_the_bucket(self):
+        with mock.patch("time.monotonic", return_value=100):
+            bucket = AdaptiveBucket(rate=100)
+            bucket._reserve()
+            bucket.release(throttled=True, retry_after=3)
+
+            self.assertEqual(bucket._reserve(), 3)
+
+    def test_retry_after_header(self):
+        error = stripe.RateLimitError(
+            "Too many requests", headers={"Retry-After": "2"}
+        )
+
+        self.assertEqual(retry_after(error), 2)
+        self.assertIsNone(retry_after(stripe.RateLimitError("Too many")))
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_buckets_per_account_and_kind(self):
+        limiter = RateLimiter(read_rate=50, write_rate=10)
+
+        read = limiter.bucket("key", "acct_123", "read")
+
+        self.assertIs(limiter.bucket("key", "acct_123", "read"), read)
+        self.assertIsNot(limiter.bucket("key", "acct_456", "read"), read)
+        self.assertEqual(read.max_rate, 50)
+        self.assertEqual(limiter.bucket("key", "acct_123", "write").rate, 10)
+
+    def test_stripe_api_adapts_to_429(self):
+        limiter = RateLimiter(read_rate=40)
+        api = StripeAPI(
+            secret_key="sk_test_123",
+            context={"account": "acct_123"},
+            configuration={
+                "rate_limiter": limiter,
+                "retry": {"max_attempts": 1},
+            },
+        )
+
+        with mock.patch("stripe.BalanceService.retrieve") as mock_function:
+            mock_function.side_effect = stripe.RateLimitError(
+                "Too many requests"
+            )
+
+            with self.assertRaises(stripe.RateLimitError):
+                api.run("retrieve_balance")
+
+        bucket = limiter.bucket(api._key_id, "acct_123", "read")
+        self.assertEqual(bucket.rate, 20)
+        self.assertEqual(bucket.in_flight, 0)
+
+
+class TestRateLimiterAsync(unittest.IsolatedAsyncioTestCase):
+    async def test_acquire_async_waits_for_a_slot(self):
+        bucket = AdaptiveBucket(rate=100, max_concurrency=1)
+        await bucket.acquire_async()
+
+        waiter = asyncio.ensure_future(bucket.acquire_async())
+        await asyncio.sleep(0.05)
+        self.assertFalse(waiter.done())
+
+        bucket.release()
+        await asyncio.wait_for(waiter, 1)
+
+        self.assertEqual(bucket.in_flight, 1)
+
+    async def test_release_wakes_async_waiters_from_threads(self):
+        bucket = AdaptiveBucket(rate=100, max_concurrency=1)
+        await bucket.acquire_async()
+
+        waiter = asyncio.ensure_future(bucket.acquire_async())
+        await asyncio.sleep(0)
+        threading.Thread(target=bucket.release).start()
+        await asyncio.wait_for(waiter, 1)
+
+        self.assertEqual(bucket.in_flight, 1)
+
+    async def test_cancelled_waiter_passes_the_slot_on(self):
+        bucket = AdaptiveBucket(rate=100, max_concurrency=1)
+        await bucket.acquire_async()
+
+        first = asyncio.ensure_future(bucket.acquire_async())
+        second = asyncio.ensure_future(bucket.acquire_async())
+        await asyncio.sleep(0)
+        bucket.release()
+        first.cancel()
+        await asyncio.wait_for(second, 1)
+
+        self.assertTrue(first.cancelled())
+        self.assertEqual(bucket.in_flight, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
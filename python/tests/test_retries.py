@@ -0,0 +1,142 @@
+import unittest
+import stripe
+from unittest import mock
+from stripe_agent_toolkit.api import StripeAPI
+from stripe_agent_toolkit.retries import RetryPolicy, is_retryable
+
+
+def _error(cls=stripe.APIError, status=None, headers=None, **kwargs):
+    return cls("Failed", http_status=status, headers=headers, **kwargs)
+
+
+class TestIsRetryable(unittest.TestCase):
+    def test_transient_errors(self):
+        self.assertTrue(is_retryable(_error(status=500)))
+        self.assertTrue(is_retryable(_error(status=409)))
+        self.assertTrue(is_retryable(_error(stripe.RateLimitError, 429)))
+        self.assertTrue(
+            is_retryable(stripe.APIConnectionError("Reset", should_retry=True))
+        )
+
+    def test_permanent_errors(self):
+        self.assertFalse(is_retryable(_error(status=400)))
+        self.assertFalse(is_retryable(stripe.APIConnectionError("Reset")))
+
+    def test_should_retry_header_wins(self):
+        self.assertFalse(
+            is_retryable(
+                _error(status=500, headers={"Stripe-Should-Retry": "false"})
+            )
+        )
+        self.assertTrue(
+            is_retryable(
+                _error(
+                    stripe.InvalidRequestError,
+                    400,
+                    headers={"stripe-should-retry": "true"},
+                    param=None,
+                )
+            )
+        )
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_retries_until_success(self):
+        fn = mock.Mock(side_effect=[_error(status=503), "ok"])
+
+        with mock.patch("time.sleep") as sleep:
+            result = RetryPolicy(base_delay=1).call(fn)
+
+        self.assertEqual(result, "ok")
+        self.assertEqual(fn.call_count, 2)
+        delay = sleep.call_args[0][0]
+        self.assertTrue(0 <= delay <= 1)
+
+    def test_gives_up_after_max_attempts(self):
+        fn = mock.Mock(side_effect=_error(status=503))
+
+        with mock.patch("time.sleep"):
+            with self.assertRaises(stripe.APIError):
+                RetryPolicy(max_attempts=3).call(fn)
+
+        self.assertEqual(fn.call_count, 3)
+
+    def test_does_not_retry_permanent_errors(self):
+        fn = mock.Mock(side_effect=_error(status=400))
+
+        with self.assertRaises(stripe.APIError):
+            RetryPolicy().call(fn)
+
+        self.assertEqual(fn.call_count, 1)
+
+    def test_honours_retry_after(self):
+        error = _error(stripe.RateLimitError, 429, {"Retry-After": "2"})
+        fn = mock.Mock(side_effect=[error, "ok"])
+
+        with mock.patch("time.sleep") as sleep:
+            RetryPolicy(base_delay=0.1).call(fn)
+
+        sleep.assert_called_once_with(2.0)
+
+    def test_gives_up_past_deadline(self):
+        error = _error(stripe.RateLimitError, 429, {"Retry-After": "5"})
+        fn = mock.Mock(side_effect=error)
+
+        with mock.patch("time.sleep") as sleep:
+            with self.assertRaises(stripe.RateLimitError):
+                RetryPolicy(deadline=1).call(fn)
+
+        self.assertEqual(fn.call_count, 1)
+        sleep.assert_not_called()
+
+
+class TestStripeAPIRetries(unittest.TestCase):
+    def test_write_retries_reuse_idempotency_key(self):
+        with mock.patch("stripe.CustomerService.create") as mock_function:
+            customer = stripe.Customer.construct_from(
+                {"id": "cus_123"}, "sk_test_123"
+            )
+            mock_function.side_effect = [
+                stripe.APIConnectionError("Reset", should_retry=True),
+                customer,
+                customer,
+            ]
+
+            api = StripeAPI(secret_key="sk_test_123", context=None)
+            with mock.patch("time.sleep"):
+                api.run("create_customer", name="Test User")
+
+            first, second = mock_function.call_args_list
+            key = first[0][1]["idempotency_key"]
+            self.assertTrue(key.startswith("stripe-agent-toolkit-"))
+            self.assertEqual(second[0][1]["idempotency_key"], key)
+
+            api.run("create_customer", name="Test User")
+
+            self.assertNotEqual(
+                mock_function.call_args[0][1]["idempotency_key"], key
+            )
+
+    def test_reads_have_no_idempotency_key(self):
+        with mock.patch("stripe.BalanceService.retrieve") as mock_function:
+            mock_function.return_value = {}
+
+            api = StripeAPI(secret_key="sk_test_123", context=None)
+            api.run("retrieve_balance")
+
+            mock_function.assert_called_with({}, {})
+
+
+class TestRetryPolicyAsync(unittest.IsolatedAsyncioTestCase):
+    async def test_retries_until_success(self):
+        fn = mock.AsyncMock(side_effect=[_error(status=500), "ok"])
+
+        with mock.patch("asyncio.sleep", new_callable=mock.AsyncMock):
+            result = await RetryPolicy().call_async(fn)
+
+        self.assertEqual(result, "ok")
+        self.assertEqual(fn.await_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
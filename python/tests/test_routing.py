@@ -0,0 +1,91 @@
+import asyncio
+import unittest
+from unittest import mock
+from stripe_agent_toolkit.api import StripeAPI
+from stripe_agent_toolkit.clients import StripeClientRegistry
+from stripe_agent_toolkit.routing import current_route, route
+
+
+class TestRoute(unittest.TestCase):
+    def test_routes_nest_and_reset(self):
+        self.assertIsNone(current_route())
+
+        with route({"account": "acct_123"}, secret_key="sk_test_123"):
+            with route({"account": "acct_456"}) as inner:
+                self.assertEqual(inner.context, {"account": "acct_456"})
+                self.assertEqual(inner.secret_key, "sk_test_123")
+            self.assertEqual(current_route().context, {"account": "acct_123"})
+
+        self.assertIsNone(current_route())
+
+
+class TestStripeAPIRouting(unittest.TestCase):
+    def test_run_follows_route(self):
+        with mock.patch("stripe.BalanceService.retrieve") as mock_function:
+            mock_function.return_value = {}
+
+            api = StripeAPI(secret_key="sk_test_123", context=None)
+            with route({"account": "acct_123"}):
+                api.run("retrieve_balance")
+
+            mock_function.assert_called_with(
+                {}, {"stripe_account": "acct_123"}
+            )
+
+            api.run("retrieve_balance")
+
+            mock_function.assert_called_with({}, {})
+
+    def test_route_secret_key(self):
+        registry = StripeClientRegistry()
+        api = StripeAPI("sk_test_123", context=None, registry=registry)
+
+        with route(secret_key="sk_test_456"):
+            routed = api._routed()
+
+        self.assertIs(routed._client, registry.get("sk_test_456"))
+        self.assertNotEqual(routed._key_id, api._key_id)
+        self.assertIs(api._client, registry.get("sk_test_123"))
+
+    def test_run_many_follows_route(self):
+        with mock.patch("stripe.BalanceService.retrieve") as mock_function:
+            mock_function.return_value = {}
+
+            api = StripeAPI(secret_key="sk_test_123", context=None)
+            with route({"account": "acct_123"}):
+                api.run_many([("retrieve_balance", {})] * 2)
+
+            for call in mock_function.call_args_list:
+                self.assertEqual(call[0][1], {"stripe_account": "acct_123"})
+
+
+class TestStripeAPIRoutingAsync(unittest.IsolatedAsyncioTestCase):
+    async def test_interleaved_tasks_do_not_cross_talk(self):
+        async def retrieve(params, options):
+            await asyncio.sleep(0)
+            return {"account": options.get("stripe_account")}
+
+        api = StripeAPI(
+            secret_key="sk_test_123",
+            context=None,
+            configuration={"projections": {"retrieve_balance": None}},
+        )
+
+        async def run_for(account):
+            with route({"account": account}):
+                return await api.arun("retrieve_balance")
+
+        with mock.patch(
+            "stripe.BalanceService.retrieve_async", side_effect=retrieve
+        ):
+            results = await asyncio.gather(
+                *(run_for("acct_%d" % i) for i in range(10))
+            )
+
+        self.assertEqual(
+            results, ['{"account": "acct_%d"}' % i for i in range(10)]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
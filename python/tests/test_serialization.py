@@ -0,0 +1,256 @@
+import json
+import unittest
+import stripe
+from unittest import mock
+from stripe._stripe_response import StripeResponse
+from stripe_agent_toolkit.api import StripeAPI
+from stripe_agent_toolkit.serialization import (
+    EMPTY_TABLE,
+    dumps,
+    serialize,
+    serialize_raw,
+)
+
+PRODUCTS = json.dumps(
+    {
+        "object": "list",
+        "data": [
+            {
+                "id": "prod_123",
+                "object": "product",
+                "name": "Shirt",
+                "images": [],
+            }
+        ],
+        "has_more": False,
+        "url": "/v1/products",
+    }
+)
+
+
+def _response(body: str) -> StripeResponse:
+    return StripeResponse(body, 200, {})
+
+
+class TestSerializeRaw(unittest.TestCase):
+    def test_passes_body_through_without_projection(self):
+        body = json.dumps({"object": "balance", "available": []})
+
+        self.assertIs(serialize_raw(_response(body), None), body)
+
+    def test_lists_without_projection_keep_their_shape(self):
+        result = serialize_raw(_response(PRODUCTS), None)
+
+        self.assertEqual(json.loads(result), json.loads(PRODUCTS)["data"])
+
+    def test_projects_list_objects(self):
+        result = serialize_raw(_response(PRODUCTS), ["id", "name"])
+
+        self.assertEqual(
+            json.loads(result), [{"id": "prod_123", "name": "Shirt"}]
+        )
+
+    def test_projects_single_object(self):
+        body = json.dumps({"object": "balance", "available": [], "x": 1})
+
+        result = serialize_raw(_response(body), ["available"])
+
+        self.assertEqual(json.loads(result), {"available": []})
+
+    def test_dumps_is_compact(self):
+        self.assertEqual(dumps({"id": "prod_123"}), '{"id":"prod_123"}')
+
+
+class TestListFormats(unittest.TestCase):
+    def setUp(self):
+        self.rows = [
+            {"id": "prod_123", "name": "Shirt, blue", "active": True},
+            {"id": "prod_456", "name": "Hat", "metadata": {"size": "M"}},
+        ]
+
+    def test_table(self):
+        self.assertEqual(
+            serialize(self.rows, "table"),
+            "id,name,active,metadata\n"
+            'prod_123,"Shirt, blue",true,\n'
+            'prod_456,Hat,,"{""size"":""M""}"\n',
+        )
+
+    def test_table_window(self):
+        result = serialize(
+            {"data": self.rows[:1], "next_page_token": "abc"}, "table"
+        )
+
+        self.assertTrue(result.endswith("next_page_token: abc\n"))
+
+    def test_columns(self):
+        self.assertEqual(
+            json.loads(serialize(self.rows, "columns")),
+            {
+                "id": ["prod_123", "prod_456"],
+                "name": ["Shirt, blue", "Hat"],
+                "active": [True, None],
+                "metadata": [None, {"size": "M"}],
+            },
+        )
+
+    def test_columns_window(self):
+        result = json.loads(
+            serialize(
+                {"data": self.rows[:1], "next_page_token": None}, "columns"
+            )
+        )
+
+        self.assertEqual(result["data"]["id"], ["prod_123"])
+        self.assertIsNone(result["next_page_token"])
+
+    def test_non_lists_stay_json(self):
+        self.assertEqual(
+            json.loads(serialize({"id": "prod_123"}, "table")),
+            {"id": "prod_123"},
+        )
+
+    def test_empty_table(self):
+        self.assertEqual(
+            serialize([], "table", fields=["id", "name"]), "id,name\n"
+        )
+        self.assertEqual(serialize([], "table"), EMPTY_TABLE)
+
+    def test_empty_columns(self):
+        self.assertEqual(
+            json.loads(serialize([], "columns", fields=["id", "name"])),
+            {"id": [], "name": []},
+        )
+
+    def test_invalid_format(self):
+        with self.assertRaises(ValueError):
+            serialize(self.rows, "xml")
+
+
+class TestStripeAPIListFormat(unittest.TestCase):
+    def test_list_tools_use_list_format(self):
+        api = StripeAPI(
+            secret_key="sk_test_123",
+            context=None,
+            configuration={"list_format": "table"},
+        )
+
+        with mock.patch("stripe.ProductService.list") as mock_function:
+            mock_function.return_value = stripe.ListObject.construct_from(
+                json.loads(PRODUCTS), "sk_test_123"
+            )
+
+            result = api.run("list_products")
+
+        self.assertEqual(result, "id,name\nprod_123,Shirt\n")
+
+    def test_empty_list_keeps_the_header(self):
+        api = StripeAPI(
+            secret_key="sk_test_123",
+            context=None,
+            configuration={
+                "list_format": "table",
+                "projections": {"list_products": ["id", "name"]},
+            },
+        )
+
+        with mock.patch("stripe.ProductService.list") as mock_function:
+            mock_function.return_value = stripe.ListObject.construct_from(
+                {"object": "list", "data": []}, "sk_test_123"
+            )
+
+            result = api.run("list_products")
+
+        self.assertEqual(result, "id,name\n")
+
+    def test_other_tools_stay_json(self):
+        api = StripeAPI(
+            secret_key="sk_test_123",
+            context=None,
+            configuration={"list_format": "table"},
+        )
+
+        with mock.patch("stripe.BalanceService.retrieve") as mock_function:
+            mock_function.return_value = {"available": [], "pending": []}
+
+            result = api.run("retrieve_balance")
+
+        self.assertEqual(json.loads(result), {"available": [], "pending": []})
+
+
+class TestStripeAPIRawSerialization(unittest.TestCase):
+    def test_raw_list_matches_objects_output(self):
+        api = StripeAPI(
+            secret_key="sk_test_123",
+            context={"account": "acct_123"},
+            configuration={"serialization": "raw"},
+        )
+
+        with mock.patch.object(
+            stripe.StripeClient, "raw_request"
+        ) as mock_function:
+            mock_function.return_value = _response(PRODUCTS)
+
+            result = api.run("list_products", limit=1)
+
+            mock_function.assert_called_with(
+                "get", "/v1/products", limit=1, stripe_account="acct_123"
+            )
+
+        with mock.patch("stripe.ProductService.list") as mock_function:
+            mock_function.return_value = stripe.ListObject.construct_from(
+                json.loads(PRODUCTS), "sk_test_123"
+            )
+
+            expected = StripeAPI(secret_key="sk_test_123", context=None).run(
+                "list_products", limit=1
+            )
+
+        self.assertEqual(json.loads(result), json.loads(expected))
+
+    def test_pagination_uses_decoded_pages(self):
+        api = StripeAPI(
+            secret_key="sk_test_123",
+            context=None,
+            configuration={
+                "serialization": "raw",
+                "pagination": {"max_items": 1},
+            },
+        )
+
+        with mock.patch("stripe.ProductService.list") as mock_function:
+            mock_function.return_value = stripe.ListObject.construct_from(
+                json.loads(PRODUCTS), "sk_test_123"
+            )
+
+            result = json.loads(api.run("list_products"))
+
+        self.assertEqual(result["data"], [{"id": "prod_123", "name": "Shirt"}])
+
+
+class TestStripeAPIRawSerializationAsync(unittest.IsolatedAsyncioTestCase):
+    async def test_raw_balance_passthrough(self):
+        body = json.dumps({"object": "balance", "available": []})
+        api = StripeAPI(
+            secret_key="sk_test_123",
+            context=None,
+            configuration={
+                "serialization": "raw",
+                "projections": {"retrieve_balance": None},
+            },
+        )
+
+        with mock.patch.object(
+            stripe.StripeClient,
+            "raw_request_async",
+            new_callable=mock.AsyncMock,
+        ) as mock_function:
+            mock_function.return_value = _response(body)
+
+            result = await api.arun("retrieve_balance")
+
+        self.assertEqual(result, body)
+
+
+if __name__ == "__main__":
+    unittest.main()
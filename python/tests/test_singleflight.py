@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import time
+import unittest
+import stripe
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from stripe_agent_toolkit.api import StripeAPI
+from stripe_agent_toolkit.singleflight import SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_one_execution(self):
+        single_flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def fn():
+            calls.append(1)
+            started.set()
+            release.wait()
+            return "result"
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            leader = executor.submit(single_flight.do, "key", fn)
+            started.wait()
+            followers = [
+                executor.submit(single_flight.do, "key", fn) for _ in range(3)
+            ]
+            while single_flight.coalesced < 3:
+                time.sleep(0.001)
+            release.set()
+
+            results = [leader.result()] + [f.result() for f in followers]
+
+        self.assertEqual(results, ["result"] * 4)
+        self.assertEqual(len(calls), 1)
+
+    def test_errors_are_shared(self):
+        single_flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+
+        def fn():
+            started.set()
+            release.wait()
+            raise ValueError("boom")
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            leader = executor.submit(single_flight.do, "key", fn)
+            started.wait()
+            follower = executor.submit(single_flight.do, "key", fn)
+            while single_flight.coalesced < 1:
+                time.sleep(0.001)
+            release.set()
+
+            with self.assertRaises(ValueError):
+                leader.result()
+            with self.assertRaises(ValueError):
+                follower.result()
+
+    def test_sequential_calls_are_not_coalesced(self):
+        single_flight = SingleFlight()
+
+        self.assertEqual(single_flight.do("key", lambda: 1), 1)
+        self.assertEqual(single_flight.do("key", lambda: 2), 2)
+        self.assertEqual(single_flight.coalesced, 0)
+
+
+class TestSingleFlightAsync(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_calls_share_one_execution(self):
+        single_flight = SingleFlight()
+        calls = []
+
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(
+            *[single_flight.do_async("key", fn) for _ in range(5)]
+        )
+
+        self.assertEqual(results, ["result"] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(single_flight.coalesced, 4)
+
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        single_flight = SingleFlight()
+
+        async def fn():
+            await asyncio.sleep(0.01)
+            return "result"
+
+        first = asyncio.ensure_future(single_flight.do_async("key", fn))
+        second = asyncio.ensure_future(single_flight.do_async("key", fn))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        self.assertEqual(await second, "result")
+
+    async def test_stripe_api_coalesces_reads(self):
+        api = StripeAPI(secret_key="sk_test_123", context=None)
+
+        async def retrieve(*args, **kwargs):
+            await asyncio.sleep(0.01)
+            return stripe.Balance.construct_from(
+                {"available": []}, "sk_test_123"
+            )
+
+        with mock.patch(
+            "stripe.BalanceService.retrieve_async", side_effect=retrieve
+        ) as mock_function:
+            results = await asyncio.gather(
+                *[api.arun("retrieve_balance") for _ in range(5)]
+            )
+
+            self.assertEqual(len(set(results)), 1)
+            self.assertEqual(mock_function.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+import os
+import tempfile
+import unittest
+from stripe_agent_toolkit.api import StripeAPI
+from stripe_agent_toolkit.clients import StripeClientRegistry
+from stripe_agent_toolkit.retries import RetryPolicy
+from stripe_agent_toolkit.routing import route
+from stripe_agent_toolkit.spool import MeterEventSpool
+from stripe_agent_toolkit.testing import FakeStripe, FakeStripeServer
+
+
+class TestMeterEventSpool(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "meter_events.db")
+        self.server = FakeStripeServer(FakeStripe(seed=0)).start()
+        self.addCleanup(self.server.stop)
+
+    def _spool(self, api_base=None, **configuration):
+        api = StripeAPI(
+            secret_key="sk_test_123",
+            context=None,
+            registry=StripeClientRegistry(),
+            configuration={
+                "api_base": api_base or self.server.url,
+                **configuration,
+            },
+        )
+        spool = MeterEventSpool(
+            api,
+            self.path,
+            poll_interval=0.05,
+            retry=RetryPolicy(max_attempts=1),
+        )
+        self.addCleanup(spool.close, 5)
+        return spool
+
+    def test_ships_spooled_events(self):
+        spool = self._spool()
+
+        for i in range(3):
+            spool.emit("tokens", "cus_123", i, identifier="event_%d" % i)
+
+        self.assertTrue(spool.flush(5))
+        self.assertEqual(len(spool), 0)
+        self.assertEqual(spool.sent, 3)
+        events = self.server.fake.objects("meter_events")
+        self.assertEqual(
+            [event["identifier"] for event in events],
+            ["event_0", "event_1", "event_2"],
+        )
+
+    def test_ships_on_the_stream(self):
+        # Spooled while Stripe is unreachable, so they ship as one batch.
+        unreachable = self._spool(api_base="http://127.0.0.1:9")
+        for i in range(3):
+            unreachable.emit("tokens", "cus_123", i)
+        unreachable.close(0.5)
+
+        spool = self._spool(meter_event_stream=True)
+        self.assertTrue(spool.flush(5))
+
+        self.assertEqual(
+            self.server.fake.requests["POST /v2/billing/meter_event_stream"],
+            1,
+        )
+        self.assertEqual(len(self.server.fake.objects("meter_events")), 3)
+
+    def test_keeps_events_until_stripe_is_reachable(self):
+        unreachable = self._spool(api_base="http://127.0.0.1:9")
+        unreachable.emit("tokens", "cus_123", 1)
+
+        self.assertFalse(unreachable.close(0.5))
+        self.assertEqual(self.server.fake.objects("meter_events"), [])
+
+        spool = self._spool()
+
+        self.assertTrue(spool.flush(5))
+        self.assertEqual(len(self.server.fake.objects("meter_events")), 1)
+
+    def test_drops_rejected_events(self):
+        spool = self._spool()
+
+        spool.emit("tokens", "", 1)
+        spool.emit("tokens", "cus_123", 1)
+
+        self.assertTrue(spool.flush(5))
+        self.assertEqual((spool.sent, spool.failed), (1, 1))
+
+    def test_keeps_the_events_of_a_batch_stripe_accepts(self):
+        unreachable = self._spool(api_base="http://127.0.0.1:9")
+        for i in range(7):
+            unreachable.emit("tokens", "" if i == 1 else "cus_123", i)
+        unreachable.close(0.5)
+
+        spool = self._spool(meter_event_stream=True)
+
+        self.assertTrue(spool.flush(5))
+        self.assertEqual((spool.sent, spool.failed), (6, 1))
+        self.assertEqual(len(spool), 0)
+        self.assertEqual(len(self.server.fake.objects("meter_events")), 6)
+
+    def test_events_stripe_already_has_are_shipped(self):
+        spool = self._spool()
+        spool.emit("tokens", "cus_123", 1, identifier="event_1")
+        spool.flush(5)
+
+        # As when the process crashed after Stripe took the event but
+        # before it was deleted from the spool.
+        spool.emit("tokens", "cus_123", 1, identifier="event_1")
+        self.assertTrue(spool.flush(5))
+
+        self.assertEqual((spool.sent, spool.failed), (2, 0))
+        self.assertEqual(len(spool), 0)
+
+    def test_ships_with_the_key_of_the_route(self):
+        spool = self._spool()
+
+        with route({"account": "acct_T"}, secret_key="sk_test_tenant"):
+            spool.emit("tokens", "cus_123", 1)
+
+        self.assertTrue(spool.flush(5))
+        self.assertEqual(
+            len(self.server.fake.objects("meter_events", "acct_T")), 1
+        )
+        with open(self.path, "rb") as database:
+            self.assertNotIn(b"sk_test_tenant", database.read())
+        spool.close(5)
+
+        # Another process only ships them once it knows the key.
+        unreachable = self._spool(api_base="http://127.0.0.1:9")
+        with route({"account": "acct_T"}, secret_key="sk_test_tenant"):
+            unreachable.emit("tokens", "cus_123", 2)
+        unreachable.close(0.5)
+        spool = self._spool()
+        self.assertTrue(spool.flush(5))
+        self.assertEqual(len(spool), 1)
+        with route(secret_key="sk_test_tenant"):
+            spool.emit("tokens", "cus_123", 3, account="acct_T")
+        self.assertTrue(spool.flush(5))
+        self.assertEqual(len(spool), 0)
+
+    def test_duplicate_identifiers_are_spooled_once(self):
+        spool = self._spool()
+
+        spool.emit("tokens", "cus_123", 1, identifier="event_1")
+        spool.emit("tokens", "cus_123", 1, identifier="event_1")
+        spool.flush(5)
+
+        self.assertEqual(spool.sent, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
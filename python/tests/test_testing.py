@@ -0,0 +1,198 @@
+import json
+import unittest
+from stripe_agent_toolkit.api import StripeAPI
+from stripe_agent_toolkit.clients import StripeClientRegistry
+from stripe_agent_toolkit.testing import (
+    FakeStripe,
+    FakeStripeServer,
+    decode_form,
+)
+
+AUTHORIZATION = {"Authorization": "Bearer sk_test_123"}
+
+
+class TestDecodeForm(unittest.TestCase):
+    def test_nested_objects_and_lists(self):
+        self.assertEqual(
+            decode_form(
+                "line_items[0][price]=price_123&line_items[0][quantity]=2"
+                "&payload[stripe_customer_id]=cus_123&name=Jenny"
+            ),
+            {
+                "line_items": [{"price": "price_123", "quantity": "2"}],
+                "payload": {"stripe_customer_id": "cus_123"},
+                "name": "Jenny",
+            },
+        )
+
+
+class TestFakeStripe(unittest.TestCase):
+    def test_list_paginates_newest_first(self):
+        fake = FakeStripe(seed=0)
+        ids = [fake.create("products", name="P%d" % i)["id"] for i in range(3)]
+
+        status, page, _ = fake.handle(
+            "GET", "/v1/products", {"limit": "2"}, AUTHORIZATION
+        )
+
+        self.assertEqual(status, 200)
+        self.assertEqual([p["id"] for p in page["data"]], ids[:0:-1])
+        self.assertTrue(page["has_more"])
+
+        _, page, _ = fake.handle(
+            "GET",
+            "/v1/products",
+            {"limit": "2", "starting_after": ids[1]},
+            AUTHORIZATION,
+        )
+
+        self.assertEqual([p["id"] for p in page["data"]], ids[:1])
+        self.assertFalse(page["has_more"])
+
+    def test_missing_resource(self):
+        fake = FakeStripe()
+
+        status, body, _ = fake.handle(
+            "POST", "/v1/prices", {"product": "prod_123"}, AUTHORIZATION
+        )
+
+        self.assertEqual(status, 404)
+        self.assertEqual(body["error"]["code"], "resource_missing")
+
+    def test_requires_secret_key(self):
+        status, body, _ = FakeStripe().handle("GET", "/v1/balance", {}, {})
+
+        self.assertEqual(status, 401)
+        self.assertEqual(body["error"]["type"], "authentication_error")
+
+    def test_idempotency_key_replays_response(self):
+        fake = FakeStripe()
+        headers = {**AUTHORIZATION, "Idempotency-Key": "key_123"}
+
+        _, first, _ = fake.handle(
+            "POST", "/v1/customers", {"name": "Jenny"}, headers
+        )
+        _, second, response_headers = fake.handle(
+            "POST", "/v1/customers", {"name": "Jenny"}, headers
+        )
+
+        self.assertEqual(first, second)
+        self.assertEqual(response_headers["Idempotent-Replayed"], "true")
+        self.assertEqual(len(fake.objects("customers")), 1)
+
+    def test_accounts_are_isolated(self):
+        fake = FakeStripe()
+        fake.create("customers", account="acct_123", name="Jenny")
+
+        self.assertEqual(fake.objects("customers"), [])
+        self.assertEqual(len(fake.objects("customers", "acct_123")), 1)
+
+    def test_injected_rate_limit(self):
+        fake = FakeStripe(rate_limit_rate=1.0, retry_after=2)
+
+        status, body, headers = fake.handle(
+            "GET", "/v1/balance", {}, AUTHORIZATION
+        )
+
+        self.assertEqual(status, 429)
+        self.assertEqual(body["error"]["code"], "rate_limit")
+        self.assertEqual(headers["Retry-After"], "2")
+        self.assertEqual(fake.statuses[429], 1)
+
+
+class TestFakeStripeServer(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeStripeServer(FakeStripe(seed=0)).start()
+        self.addCleanup(self.server.stop)
+        self.api = StripeAPI(
+            secret_key="sk_test_123",
+            context=None,
+            registry=StripeClientRegistry(),
+            configuration={
+                "api_base": self.server.url,
+                "retry": {"base_delay": 0, "max_delay": 0},
+            },
+        )
+
+    def test_invoice_flow(self):
+        customer = json.loads(
+            self.api.run("create_customer", name="Jenny Rosen")
+        )
+        product = json.loads(self.api.run("create_product", name="Widget"))
+        price = json.loads(
+            self.api.run(
+                "create_price",
+                product=product["id"],
+                unit_amount=500,
+                currency="usd",
+            )
+        )
+        invoice = json.loads(
+            self.api.run(
+                "create_invoice", customer=customer["id"], days_until_due=30
+            )
+        )
+        self.api.run(
+            "create_invoice_item",
+            customer=customer["id"],
+            price=price["id"],
+            invoice=invoice["id"],
+        )
+        finalized = json.loads(
+            self.api.run("finalize_invoice", invoice=invoice["id"])
+        )
+
+        self.assertEqual(finalized["status"], "open")
+        invoices = json.loads(
+            self.api.run("list_invoices", customer=customer["id"])
+        )
+        self.assertEqual(invoices[0]["amount_due"], 500)
+        self.assertEqual(
+            self.server.fake.requests["POST /v1/invoices/{id}/finalize"], 1
+        )
+
+    def test_refund_updates_balance(self):
+        payment_intent = self.server.fake.create(
+            "payment_intents", amount=1000, currency="usd"
+        )
+
+        self.api.run(
+            "create_refund", payment_intent=payment_intent["id"], amount=300
+        )
+        balance = json.loads(self.api.run("retrieve_balance"))
+
+        self.assertEqual(
+            balance["available"], [{"amount": 700, "currency": "usd"}]
+        )
+
+    def test_meter_event(self):
+        self.api.create_meter_event("tokens", "cus_123", "10")
+
+        (event,) = self.server.fake.objects("meter_events")
+        self.assertEqual(event["event_name"], "tokens")
+        self.assertEqual(event["payload"]["value"], "10")
+
+    def test_retries_injected_failures(self):
+        self.server.fake.fail_next(429)
+        self.server.fake.fail_next(500)
+
+        customer = json.loads(self.api.run("create_customer", name="Jenny"))
+
+        self.assertTrue(customer["id"].startswith("cus_"))
+        self.assertEqual(self.server.fake.statuses[429], 1)
+        self.assertEqual(self.server.fake.statuses[500], 1)
+        self.assertEqual(len(self.server.fake.objects("customers")), 1)
+
+    def test_stripe_account_header(self):
+        self.api.bind({"account": "acct_123"}).run(
+            "create_customer", name="Jenny"
+        )
+
+        self.assertEqual(self.server.fake.objects("customers"), [])
+        self.assertEqual(
+            len(self.server.fake.objects("customers", "acct_123")), 1
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()